@@ -57,6 +57,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
 
     'allauth',             
     'allauth.account',   
@@ -130,6 +131,44 @@ DATABASES = {
     }
 }
 
+# Cache (ต่อ process) — "cert_preview" แยกไว้ให้ preview ใบประกาศ จำกัดจำนวนรายการ (เกินแล้ว cull ทิ้ง)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "lms-default",
+    },
+    "cert_preview": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "lms-cert-preview",
+        "TIMEOUT": int(os.getenv("CERT_PREVIEW_CACHE_SECONDS", "86400")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CERT_PREVIEW_CACHE_ENTRIES", "200"))},
+    },
+    # รายการคอร์ส (lms_app/catalog_cache.py) — ตัวนับ version ต้องแชร์กันทุก worker
+    # ไม่ตั้ง CATALOG_CACHE_REDIS_URL = ปิด cache (dummy) แทน locmem ที่ stale ข้าม worker
+    "catalog": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["CATALOG_CACHE_REDIS_URL"],
+            "KEY_PREFIX": "lms",
+        }
+        if os.getenv("CATALOG_CACHE_REDIS_URL")
+        else {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    ),
+    # ชุด id ใบประกาศที่ถูกเพิกถอน (lms_app/cert_verify.py) — การล้างต้องเห็นทุก worker
+    # ไม่มี Redis = locmem ต่อ process: process อื่นเห็นการเพิกถอนช้าสุด CERT_VERIFY_REVOKED_CACHE_SECONDS
+    "cert_verify": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CERT_VERIFY_REDIS_URL") or os.environ["CATALOG_CACHE_REDIS_URL"],
+            "KEY_PREFIX": "lms",
+        }
+        if os.getenv("CERT_VERIFY_REDIS_URL") or os.getenv("CATALOG_CACHE_REDIS_URL")
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "lms-cert-verify"}
+    ),
+}
+# อายุของผลลัพธ์ CourseViewSet.list ใน cache "catalog" (0 = ปิด; ใช้ได้เฉพาะเมื่อมี Redis ข้างบน)
+CATALOG_CACHE_SECONDS = int(os.getenv("CATALOG_CACHE_SECONDS", "300"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -205,9 +244,17 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "20/hour",  # ตัวอย่าง: จำกัดรวมทั้งระบบ
+        # หน้าตรวจสอบใบประกาศสาธารณะ (QR) — ใช้ ScopedRateThrottle แยกจาก anon
+        "cert_verify": os.getenv("CERT_VERIFY_RATE", "600/min"),
+        # รูป PNG ของใบประกาศ (สาธารณะ; render เมื่อขาดเฉพาะเจ้าของ/ผู้สอน/staff)
+        "cert_image": os.getenv("CERT_IMAGE_RATE", "120/min"),
     },
 }
 
+# cursor pagination (lms_app/pagination.py): ขนาดหน้าเริ่มต้น และเพดานของ ?page_size=
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "20"))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "100"))
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
@@ -332,6 +379,39 @@ SITE_NAME = os.environ.get("SITE_NAME", "LMS")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 CERT_RENDER_TOKEN = "your-long-random-token"
 
+# คิว render ใบประกาศ (manage.py run_certificate_jobs)
+CERT_RENDER_MAX_ATTEMPTS = int(os.getenv("CERT_RENDER_MAX_ATTEMPTS", "3"))
+CERT_RENDER_STALE_SECONDS = int(os.getenv("CERT_RENDER_STALE_SECONDS", "600"))  # งานค้าง rendering นานเกินนี้ให้จองใหม่
+CERT_RENDER_RETRY_SECONDS = int(os.getenv("CERT_RENDER_RETRY_SECONDS", "30"))  # รอก่อนลองใหม่หลังล้ม (เท่าตัวทุกครั้ง)
+CERT_RENDER_PROCESSES = int(os.getenv("CERT_RENDER_PROCESSES", "0"))  # 0 = ใช้จำนวน core ทั้งหมด (cert_batch.py)
+CERT_IMAGES_PRERENDER = os.getenv("CERT_IMAGES_PRERENDER", "True") == "True"  # worker สร้าง PNG (cert_images) ต่อจาก PDF
+CERT_RENDER_WARM_UP = os.getenv("CERT_RENDER_WARM_UP", "True") == "True"  # โหลดฟอนต์/CSS ใน process เว็บ (lms/wsgi.py) และ run_certificate_jobs
+CERT_EXPORT_FINGERPRINT_CACHE_SECONDS = int(os.getenv("CERT_EXPORT_FINGERPRINT_CACHE_SECONDS", "3600"))  # fingerprint PDF รวม (cert_export.py)
+
+# คิวลบคอร์ส (manage.py run_course_deletions)
+COURSE_DELETION_BATCH_SIZE = int(os.getenv("COURSE_DELETION_BATCH_SIZE", "500"))  # แถวต่อ transaction
+COURSE_DELETION_MAX_ATTEMPTS = int(os.getenv("COURSE_DELETION_MAX_ATTEMPTS", "3"))
+COURSE_DELETION_STALE_SECONDS = int(os.getenv("COURSE_DELETION_STALE_SECONDS", "600"))  # job ไม่ขยับนานเกินนี้ให้จองใหม่
+
+# ลำดับบท (chapter_rank.py) — manage.py rebalance_chapter_ranks เกลี่ยคอร์สที่มี rank ยาวตั้งแต่ค่านี้
+CHAPTER_RANK_REBALANCE_LENGTH = int(os.getenv("CHAPTER_RANK_REBALANCE_LENGTH", "24"))
+
+# ลำดับ backend สำหรับ render PDF (cert_backends.py) — ตัวแรกที่สำเร็จชนะ: reportlab / weasyprint / next
+CERT_RENDER_BACKENDS = [
+    b.strip() for b in os.getenv("CERT_RENDER_BACKENDS", "reportlab").split(",") if b.strip()
+]
+FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", FRONTEND_URL)  # backend "next" เรียก {FRONTEND_BASE_URL}/api/render-cert
+CERT_RENDER_NEXT_TIMEOUT = (3.05, float(os.getenv("CERT_RENDER_NEXT_TIMEOUT", "30")))  # (connect, read) วินาที
+CERT_RENDER_NEXT_POOL_SIZE = int(os.getenv("CERT_RENDER_NEXT_POOL_SIZE", "10"))
+CERT_RENDER_NEXT_RETRIES = int(os.getenv("CERT_RENDER_NEXT_RETRIES", "2"))
+
+# รหัสตรวจสอบใบประกาศแบบลงลายเซ็น (lms_app/cert_verify.py) — ว่าง = ใช้ SECRET_KEY
+# เปลี่ยนค่านี้แล้วรหัสที่ออกไปก่อนหน้าจะตรวจไม่ผ่าน
+CERT_VERIFY_SECRET = os.getenv("CERT_VERIFY_SECRET", "")
+# อายุ cache ของชุด id ที่ถูกเพิกถอน (cache "cert_verify" ข้างบน) — ถูกล้างทันทีเมื่อแก้ revoked_at ผ่าน ORM
+# ไม่มี Redis = ค่านี้คือเวลาที่ worker อื่นอาจยังตอบ 200 ให้ใบที่เพิ่งเพิกถอน
+CERT_VERIFY_REVOKED_CACHE_SECONDS = int(os.getenv("CERT_VERIFY_REVOKED_CACHE_SECONDS", "60"))
+
 # ระยะเวลาที่ token reset password จะหมดอายุ (วินาที) → 1800s = 30 นาที
 PASSWORD_RESET_TIMEOUT = int(os.getenv("PASSWORD_RESET_TIMEOUT", "1800"))
 
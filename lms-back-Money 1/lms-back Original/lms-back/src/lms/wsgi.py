@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lms.settings')
 
 application = get_wsgi_application()
+
+# ฟอนต์/CSS ใบประกาศ: โหลดใน master ก่อน fork (gunicorn --preload) -> worker ใช้ร่วมกันแบบ copy-on-write
+from lms_app.cert_backends import warm_up_renderers  # noqa: E402
+
+warm_up_renderers()
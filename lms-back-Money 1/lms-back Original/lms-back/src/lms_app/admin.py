@@ -5,9 +5,11 @@ from django.contrib.auth.admin import UserAdmin
 from .models import (
     University, User, UniversityMember, InstructorInvitation,
     Quiz, QuizQuestion, QuizChoice,
-    ImportantDocument, Certificate, CertificateTemplate,
+    ImportantDocument, Certificate, CertificateTemplate, CertificateRenderJob,
     Course, Category, Curriculum,   # ← เพิ่ม import
+    CourseStats, CourseDeletionJob, CertificateExport,
 )
+from .course_deletion import schedule_course_deletion
 
 # ----- University -----
 @admin.register(University)
@@ -103,19 +105,61 @@ class CertificateTemplateAdmin(admin.ModelAdmin):
 
 @admin.register(Certificate)
 class CertificateAdmin(admin.ModelAdmin):
-    list_display = ("serial_no", "student", "course", "issued_at", "render_status")
+    list_display = ("serial_no", "student", "course", "issued_at", "render_status", "render_attempts", "revoked_at")
     search_fields = ("serial_no", "verification_code", "student__email", "student__full_name", "course__title")
-    list_filter = ("render_status",)
-    readonly_fields = ("created_at", "issued_at")
+    list_filter = ("render_status", ("revoked_at", admin.EmptyFieldListFilter))
+    readonly_fields = ("created_at", "issued_at", "render_job", "render_attempts", "render_started_at", "render_fingerprint")
     autocomplete_fields = ("student", "course", "template", "created_by")
 
+@admin.register(CertificateRenderJob)
+class CertificateRenderJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "course", "status", "total", "skipped", "created_by", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("id", "course__title")
+    readonly_fields = ("created_at", "updated_at", "finished_at")
+
+@admin.register(CertificateExport)
+class CertificateExportAdmin(admin.ModelAdmin):
+    list_display = ("id", "course", "status", "pages", "attempts", "created_by", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("id", "course__title")
+    readonly_fields = ("fingerprint", "pages", "attempts", "error", "created_at", "updated_at",
+                       "started_at", "finished_at")
+
+@admin.register(CourseStats)
+class CourseStatsAdmin(admin.ModelAdmin):
+    list_display = ("course", "enrollment_count", "completion_count", "review_count", "rating_sum", "updated_at")
+    search_fields = ("course__title",)
+    readonly_fields = ("course", "enrollment_count", "completion_count", "review_count", "rating_sum", "updated_at")
+
+@admin.register(CourseDeletionJob)
+class CourseDeletionJobAdmin(admin.ModelAdmin):
+    list_display = ("course_title", "course_id", "status", "step", "deleted_rows",
+                    "files_deleted", "files_failed", "attempts", "created_by", "updated_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("id", "course_id", "course_title")
+    readonly_fields = ("course_id", "course_title", "created_by", "step", "deleted_rows", "files_deleted",
+                       "files_failed", "attempts", "error", "created_at", "updated_at", "started_at", "finished_at")
+
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ("title", "instructor", "university", "status", "created_at")
+    list_display = ("title", "instructor", "university", "status", "created_at", "deleted_at")
     search_fields = ("title", "id", "instructor__email", "instructor__full_name", "university__name")
-    list_filter = ("status", "university", "is_paid")
+    list_filter = ("status", "university", "is_paid", ("deleted_at", admin.EmptyFieldListFilter))
     autocomplete_fields = ("instructor", "university", "category", "curriculum")
 
+    def get_queryset(self, request):
+        # เห็นคอร์สที่รอลบด้วย (Course.objects ซ่อนไว้)
+        return Course.all_objects.get_queryset()
+
+    # ลบจากแอดมินก็ผ่านคิว (ไม่ลบทั้งต้นใน request)
+    def delete_model(self, request, obj):
+        schedule_course_deletion(obj, request.user)
+
+    def delete_queryset(self, request, queryset):
+        for course in queryset:
+            schedule_course_deletion(course, request.user)
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ("name", "slug")
@@ -4,3 +4,51 @@ from django.apps import AppConfig
 class LmsAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lms_app'
+
+    def ready(self):
+        self._connect_signals()
+
+    def _connect_signals(self):
+        from django.db.models.signals import post_delete, post_init, post_save
+
+        from . import catalog_cache, course_stats
+        from .cert_verify import invalidate_revoked_cache
+        from .course_search import update_search_vector_on_save
+        from .models import Category, Certificate, Course, CourseChapter, Curriculum, Enrollment, Review, User
+
+        # ชุด id ที่ถูกเพิกถอน (cert_verify.revoked_ids) ต้องล้างเมื่อ revoked_at เปลี่ยน
+        post_save.connect(invalidate_revoked_cache, sender=Certificate,
+                          dispatch_uid="cert_verify_revoked_save")
+        post_delete.connect(invalidate_revoked_cache, sender=Certificate,
+                            dispatch_uid="cert_verify_revoked_delete")
+        post_save.connect(update_search_vector_on_save, sender=Course,
+                          dispatch_uid="course_search_vector_save")
+
+        # ตัวนับ version ของ cache รายการคอร์ส (catalog_cache.py)
+        post_init.connect(catalog_cache.remember_course_university, sender=Course,
+                          dispatch_uid="catalog_course_init")
+        post_init.connect(catalog_cache.remember_user_name, sender=User, dispatch_uid="catalog_user_init")
+        post_save.connect(catalog_cache.user_changed, sender=User, dispatch_uid="catalog_user_save")
+        for model, receiver in (
+            (Course, catalog_cache.course_changed),
+            (CourseChapter, catalog_cache.chapter_changed),
+            (Category, catalog_cache.category_changed),
+            (Curriculum, catalog_cache.category_changed),
+            (Enrollment, catalog_cache.enrollment_changed),
+            (Review, catalog_cache.review_changed),
+        ):
+            name = model.__name__.lower()
+            post_save.connect(receiver, sender=model, dispatch_uid=f"catalog_{name}_save")
+            post_delete.connect(receiver, sender=model, dispatch_uid=f"catalog_{name}_delete")
+
+        # ตัวนับ CourseStats (course_stats.py)
+        post_save.connect(course_stats.course_created, sender=Course, dispatch_uid="stats_course_save")
+        for model, remember, saved, deleted in (
+            (Enrollment, course_stats.remember_enrollment, course_stats.enrollment_saved,
+             course_stats.enrollment_deleted),
+            (Review, course_stats.remember_review, course_stats.review_saved, course_stats.review_deleted),
+        ):
+            name = model.__name__.lower()
+            post_init.connect(remember, sender=model, dispatch_uid=f"stats_{name}_init")
+            post_save.connect(saved, sender=model, dispatch_uid=f"stats_{name}_save")
+            post_delete.connect(deleted, sender=model, dispatch_uid=f"stats_{name}_delete")
@@ -0,0 +1,207 @@
+# lms_app/catalog_cache.py
+"""
+cache แบบ read-through ของ CourseViewSet.list (cache alias "catalog")
+
+key = hash(ตัวนับ version ที่เกี่ยวข้อง + query params ที่ normalize แล้ว + host + media type)
+- ตัวนับ version: "global" (Category / Curriculum / ชื่อผู้สอน), "all" (คอร์สใดก็ได้เปลี่ยน),
+  "uni:<id>" (คอร์สของมหาวิทยาลัยนั้น) และ "user:<id>" (การลงทะเบียนของผู้ใช้นั้น)
+- แก้ข้อมูล = incr ตัวนับ (O(1)) -> key เดิมไม่ถูกอ่านอีกและหมดอายุไปเอง ไม่ต้องไล่ลบ key
+- รายการที่กรองแล้ว (มหาวิทยาลัย / สถานะ / ผู้สอน / ค้นหา) ใช้ร่วมกันทุกผู้ใช้
+  เฉพาะรายการ default "คอร์สของฉัน" ที่ผูกกับ user id
+- เก็บ {"etag", "data"}: cache hit ตอบ 304/200 ได้โดยไม่แตะ DB เลย
+- ?title__iexact= (ตรวจชื่อซ้ำ) ไม่ cache
+
+ต้องเป็น cache ที่แชร์ข้ามโปรเซส (CATALOG_CACHE_REDIS_URL) — locmem/dummy ถือว่าปิด
+เพราะการ bump ใน worker หนึ่ง (หรือ job worker) ไม่ถึงโปรเซสอื่น
+
+การแก้ผ่าน QuerySet.update()/bulk_create ไม่ส่ง signal -> เห็นผลเมื่อ CATALOG_CACHE_SECONDS หมด
+"""
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+CACHE_ALIAS = "catalog"
+VERSION_PREFIX = "catalog:v:"
+LIST_PREFIX = "catalog:list:"
+UNCACHED_PARAMS = ("title__iexact",)
+# cache ต่อโปรเซส: ตัวนับ version ไม่แชร์กัน -> ไม่ใช้
+LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _seed() -> int:
+    # ค่าเริ่มใหม่เมื่อตัวนับหาย (ถูก evict) ต้องไม่ซ้ำค่าเก่า -> ใช้เวลาเป็นมิลลิวินาที
+    return int(time.time() * 1000)
+
+
+def timeout() -> int:
+    return getattr(settings, "CATALOG_CACHE_SECONDS", 300)
+
+
+def enabled() -> bool:
+    return timeout() > 0 and not isinstance(_cache(), LOCAL_BACKENDS)
+
+
+# ---------- versions ----------
+def get_versions(scopes) -> list:
+    cache = _cache()
+    keys = [VERSION_PREFIX + s for s in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _seed(), None)
+            found[key] = cache.get(key)
+    return [found[k] for k in keys]
+
+
+def _bump_now(scopes):
+    cache = _cache()
+    for scope in scopes:
+        key = VERSION_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _seed(), None)
+
+
+def bump(*scopes):
+    """เพิ่มตัวนับหลัง commit (ไม่ให้ request อื่น cache ข้อมูลเก่าภายใต้ version ใหม่)"""
+    scopes = [s for s in dict.fromkeys(scopes) if s]
+    if scopes and enabled():
+        transaction.on_commit(lambda: _bump_now(scopes))
+
+
+def university_scope(university_id) -> str:
+    if not university_id:
+        return ""
+    try:
+        # ค่าจาก query string อาจไม่มีขีด — ให้ตรงกับ UUID ของ instance
+        university_id = uuid.UUID(str(university_id))
+    except ValueError:
+        pass
+    return f"uni:{university_id}"
+
+
+# ---------- list key ----------
+def list_cache_key(request, my_courses: bool):
+    """
+    key ของผลลัพธ์ list นี้ หรือ None ถ้าไม่ควร cache (ไม่แตะ DB)
+    my_courses: รายการ default "คอร์สของฉัน" (CourseViewSet.is_my_courses) -> ผูกกับผู้ใช้
+    """
+    if not enabled():
+        return None
+    params = request.query_params
+    if any(params.get(p) for p in UNCACHED_PARAMS):
+        return None
+
+    user = request.user
+    items = sorted((k, v) for k in params for v in params.getlist(k))
+    items = [(k, str(user.pk) if (k == "instructor" and v == "me") else v) for k, v in items]
+
+    uni = params.get("university_id") or params.get("university")
+    scopes = ["global", university_scope(uni) or "all"]
+    owner = None
+    if my_courses:
+        owner = str(user.pk)
+        scopes += ["all", f"user:{owner}"]
+    scopes = list(dict.fromkeys(scopes))
+
+    raw = json.dumps(
+        [
+            get_versions(scopes), scopes, owner, request.build_absolute_uri("/"),
+            getattr(request, "accepted_media_type", ""), items,
+        ],
+        separators=(",", ":"),
+    )
+    return LIST_PREFIX + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def get_list(key):
+    """(etag, data) ที่เก็บไว้ หรือ None"""
+    entry = _cache().get(key)
+    return (entry["etag"], entry["data"]) if entry else None
+
+
+def set_list(key, etag, data):
+    _cache().set(key, {"etag": etag, "data": data}, timeout())
+
+
+# ---------- signal receivers (ต่อใน LmsAppConfig.ready) ----------
+def remember_course_university(sender, instance, **kwargs):
+    # post_init: จำมหาวิทยาลัยเดิมไว้ เผื่อคอร์สถูกย้าย (ต้องล้างทั้งเก่าและใหม่)
+    instance._catalog_university_id = instance.__dict__.get("university_id")
+
+
+def course_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump(
+        "all",
+        university_scope(instance.university_id),
+        university_scope(getattr(instance, "_catalog_university_id", None)),
+    )
+    instance._catalog_university_id = instance.university_id
+
+
+def _bump_course(course_id):
+    from .models import Course
+
+    university_id = (
+        Course.objects.filter(pk=course_id).values_list("university_id", flat=True).first()
+    )
+    bump("all", university_scope(university_id))
+
+
+def chapter_changed(sender, instance, raw=False, **kwargs):
+    if not raw and enabled():
+        _bump_course(instance.course_id)
+
+
+def category_changed(sender, instance, raw=False, **kwargs):
+    # Category / Curriculum: ชื่อแสดงบนการ์ดของทุกรายการ
+    if raw:
+        return
+    bump("global")
+
+
+def _stats_changed(instance, origin) -> None:
+    # ตัวนับบนการ์ด (CourseStats) เปลี่ยนตาม; ลบพร้อมคอร์ส -> course_changed bump ไปแล้ว
+    from .course_stats import _from_course_cascade
+
+    if not _from_course_cascade(origin):
+        _bump_course(instance.course_id)
+
+
+def enrollment_changed(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or not enabled():
+        return
+    bump(f"user:{instance.student_id}")
+    _stats_changed(instance, origin)
+
+
+def review_changed(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and enabled():
+        _stats_changed(instance, origin)
+
+
+def remember_user_name(sender, instance, **kwargs):
+    instance._catalog_full_name = instance.__dict__.get("full_name")
+
+
+def user_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # instructor_name บนการ์ด — login (update_fields=["last_login"]) ไม่นับ
+    if raw or (update_fields is not None and "full_name" not in update_fields):
+        return
+    if instance.full_name != getattr(instance, "_catalog_full_name", None):
+        bump("global")
+    instance._catalog_full_name = instance.full_name
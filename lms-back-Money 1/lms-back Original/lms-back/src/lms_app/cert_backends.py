@@ -0,0 +1,175 @@
+# lms_app/cert_backends.py
+"""
+ตัว render PDF ใบประกาศแบบเลือกได้ต่อ deployment
+
+  CERT_RENDER_BACKENDS = ["reportlab", "next"]   # ลองตามลำดับ ตัวแรกที่สำเร็จชนะ
+
+  - reportlab  : วาดใน process (cert_pdf_renderer) — ไม่พึ่ง service อื่น
+  - weasyprint : HTML template -> PDF (renderers.pdf_renderer) — ต้องติดตั้ง pango/weasyprint
+  - next       : ขอ PDF จาก Next.js (/api/render-cert) ผ่าน requests.Session ที่ pool connection ไว้
+
+ถ้าตัวหน้า error จะ log แล้วลองตัวถัดไป ออกใบจำนวนมากจึงไม่ล้มเพราะ service ที่สองล่ม
+"""
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKENDS = ("reportlab",)
+
+
+class RenderBackendError(Exception):
+    """ทุก backend ในลำดับ render ไม่สำเร็จ"""
+
+
+class UnknownBackendError(RenderBackendError):
+    """CERT_RENDER_BACKENDS มีชื่อที่ไม่อยู่ใน BACKENDS"""
+
+
+class ReportlabBackend:
+    name = "reportlab"
+
+    def render(self, data: dict, cert_id: str = None) -> bytes:
+        from .cert_pdf_renderer import register_fonts, render_certificate_bytes
+        register_fonts()
+        return render_certificate_bytes(data)
+
+    def warm_up(self):
+        from .cert_pdf_renderer import register_fonts
+        register_fonts()
+
+
+class WeasyPrintBackend:
+    name = "weasyprint"
+
+    def render(self, data: dict, cert_id: str = None) -> bytes:
+        # import ตอนใช้: เครื่องที่ไม่มี pango ยังใช้ backend อื่นได้
+        from .renderers.pdf_renderer import render_certificate_pdf
+        return render_certificate_pdf(data)
+
+    def render_many(self, payloads) -> list:
+        """หลายใบใน HTML เอกสารเดียว (layout รอบเดียว) แล้วแยกเป็น PDF รายคน — cert_batch เรียกต่อ chunk"""
+        from .renderers.pdf_renderer import render_certificates_pdf
+        return render_certificates_pdf(list(payloads), split=True)
+
+    def warm_up(self):
+        from .renderers.base import get_stylesheet
+        get_stylesheet()
+
+
+class NextBackend:
+    """
+    render ผ่านหน้า /api/render-cert ของ frontend
+    ใช้ Session เดียวต่อ process (keep-alive + connection pool) และ timeout สั้นกว่าเดิม
+    """
+    name = "next"
+
+    def __init__(self):
+        self._session = None
+        self._lock = threading.Lock()
+
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    pool = getattr(settings, "CERT_RENDER_NEXT_POOL_SIZE", 10)
+                    retry = Retry(
+                        total=getattr(settings, "CERT_RENDER_NEXT_RETRIES", 2),
+                        backoff_factor=0.5,
+                        status_forcelist=(502, 503, 504),
+                        allowed_methods=frozenset(["GET"]),
+                    )
+                    s = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retry)
+                    s.mount("http://", adapter)
+                    s.mount("https://", adapter)
+                    self._session = s
+        return self._session
+
+    def url(self) -> str:
+        return getattr(settings, "FRONTEND_BASE_URL", "http://localhost:3000").rstrip("/") + "/api/render-cert"
+
+    def render(self, data: dict, cert_id: str = None) -> bytes:
+        if not cert_id:
+            raise RenderBackendError("next backend ต้องใช้ certificate id")
+        timeout = getattr(settings, "CERT_RENDER_NEXT_TIMEOUT", (3.05, 30))
+        r = self.session().get(
+            self.url(),
+            params={"certId": cert_id, "token": getattr(settings, "CERT_RENDER_TOKEN", "")},
+            timeout=timeout,
+        )
+        r.raise_for_status()
+        if not r.content.startswith(b"%PDF"):
+            raise RenderBackendError(f"next backend ไม่ได้ส่ง PDF กลับมา ({r.headers.get('Content-Type')})")
+        return r.content
+
+    def reset(self):
+        """ปิด connection pool (เช่นหลังเปลี่ยน FRONTEND_BASE_URL ใน test)"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (ReportlabBackend(), WeasyPrintBackend(), NextBackend())
+}
+
+
+def get_backends(names=None) -> list:
+    names = names or getattr(settings, "CERT_RENDER_BACKENDS", None) or DEFAULT_BACKENDS
+    if isinstance(names, str):
+        names = [n.strip() for n in names.split(",") if n.strip()]
+
+    unknown = [n for n in names if n not in BACKENDS]
+    if unknown:
+        raise UnknownBackendError(
+            f"ไม่รู้จัก CERT_RENDER_BACKENDS: {', '.join(unknown)} (มี {', '.join(BACKENDS)})"
+        )
+    return [BACKENDS[n] for n in names]
+
+
+def warm_up_renderers(backends=None):
+    """
+    โหลดฟอนต์/CSS ของ backend ที่ตั้งไว้ครั้งเดียวต่อ process (CERT_RENDER_WARM_UP)
+    เรียกเฉพาะ process ที่ render จริง: lms/wsgi.py (master ของ gunicorn --preload ก่อน fork)
+    และ run_certificate_jobs — ไม่ใช่ AppConfig.ready() ที่ทุกคำสั่ง manage.py ต้องผ่าน
+    ล้มแค่ log ไว้ (ใบแรกจะโหลดเองตอน render)
+    """
+    if not getattr(settings, "CERT_RENDER_WARM_UP", True):
+        return
+    try:
+        selected = get_backends(backends)
+    except UnknownBackendError as e:
+        logger.warning("Certificate renderer warm-up skipped: %s", e)
+        return
+    for backend in selected:
+        warm_up = getattr(backend, "warm_up", None)
+        if warm_up is None:
+            continue
+        try:
+            warm_up()
+        except Exception as e:
+            logger.warning("Certificate backend %s warm-up skipped: %s", backend.name, e)
+
+
+def render_pdf(data: dict, cert_id: str = None, backends=None):
+    """
+    render ตามลำดับ backend; คืน (pdf_bytes, ชื่อ backend ที่ใช้)
+    ทุกตัวล้ม -> RenderBackendError รวมข้อความ error ของแต่ละตัว
+    """
+    errors = []
+    # ชื่อผิดใน settings ให้ error ทันที ไม่ใช่กลืนเป็น fallback
+    for backend in get_backends(backends):
+        try:
+            return backend.render(data, cert_id=cert_id), backend.name
+        except Exception as e:
+            logger.warning("Certificate backend %s failed (%s): %s", backend.name, cert_id, e)
+            errors.append(f"{backend.name}: {e.__class__.__name__}: {e}")
+    raise RenderBackendError("; ".join(errors))
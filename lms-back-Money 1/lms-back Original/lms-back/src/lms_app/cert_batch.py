@@ -0,0 +1,132 @@
+# lms_app/cert_batch.py
+"""
+render ใบประกาศทีละหลายใบด้วย ProcessPoolExecutor
+
+การ render เป็นงาน CPU ล้วนและรันได้ทีละ core ต่อ process
+จึงแบ่ง payload เป็น chunk กระจายไปหลาย process (throughput ใกล้เคียงจำนวน core)
+- แต่ละ process ลงทะเบียนฟอนต์ครั้งเดียวตอนเริ่ม (initializer)
+- backend ตัวแรกใน CERT_RENDER_BACKENDS มี render_many (weasyprint) -> ทั้ง chunk layout รอบเดียว
+  ล้มทั้ง chunk -> ทำทีละใบผ่าน render_pdf (ไล่ fallback ตามลำดับ backend)
+- ผลลัพธ์เรียงตามลำดับ payload เสมอ
+- payload ที่พังจะได้ BatchResult.error แทน ไม่ทำให้ทั้ง batch ล้ม
+"""
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    index: int
+    content: Optional[bytes] = None
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.content is not None
+
+
+def default_workers() -> int:
+    n = getattr(settings, "CERT_RENDER_PROCESSES", 0) or 0
+    return n if n > 0 else (os.cpu_count() or 1)
+
+
+def _init_worker():
+    from .cert_pdf_renderer import register_fonts
+    register_fonts()
+
+
+def _render_one(data: dict):
+    # ผ่าน registry (CERT_RENDER_BACKENDS) — payload อาจมี certificate_id ให้ backend "next" ใช้
+    from .cert_backends import render_pdf
+    data = dict(data)
+    cert_id = data.pop("certificate_id", None)
+    try:
+        content, _ = render_pdf(data, cert_id=cert_id)
+        return content, ""
+    except Exception as e:
+        return None, f"{e.__class__.__name__}: {e}"
+
+
+def _batch_backend():
+    """backend ตัวแรกที่ตั้งไว้ ถ้ามันรับทีละหลายใบได้ (render_many) ไม่งั้น None"""
+    from .cert_backends import get_backends
+    try:
+        primary = get_backends()[0]
+    except Exception:
+        # ชื่อ backend ผิด: ให้ _render_one รายงาน error รายใบ
+        return None
+    return primary if hasattr(primary, "render_many") else None
+
+
+def _render_chunk(payloads: list) -> list:
+    """[(content, error), ...] ตามลำดับ payloads"""
+    backend = _batch_backend() if len(payloads) > 1 else None
+    if backend is not None:
+        try:
+            contents = backend.render_many(
+                [{k: v for k, v in p.items() if k != "certificate_id"} for p in payloads]
+            )
+            return [(content, "") for content in contents]
+        except Exception as e:
+            logger.warning("Certificate backend %s batch failed, rendering one by one: %s", backend.name, e)
+    return [_render_one(p) for p in payloads]
+
+
+def make_executor(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """pool สำหรับใช้ซ้ำหลาย batch (เช่นใน worker ที่รันยาว ๆ)"""
+    return ProcessPoolExecutor(
+        max_workers=max_workers or default_workers(),
+        initializer=_init_worker,
+    )
+
+
+def render_batch(
+    payloads: Iterable[dict],
+    executor: Optional[ProcessPoolExecutor] = None,
+    max_workers: Optional[int] = None,
+) -> List[BatchResult]:
+    """
+    render payload ทั้งหมดแล้วคืน BatchResult ตามลำดับเดิม
+    - ส่ง executor มาเพื่อใช้ pool เดิมซ้ำ; ถ้าไม่ส่งจะสร้าง pool ชั่วคราวให้
+    - max_workers=1 หรือมีแค่ใบเดียว -> render ใน process ปัจจุบัน
+    """
+    payloads = list(payloads)
+    if not payloads:
+        return []
+
+    workers = max_workers or default_workers()
+    if executor is None and (workers <= 1 or len(payloads) == 1):
+        _init_worker()
+        return [BatchResult(i, *r) for i, r in enumerate(_render_chunk(payloads))]
+
+    own_executor = executor is None
+    if own_executor:
+        executor = make_executor(workers)
+
+    # แบ่ง chunk ให้แต่ละ process ได้งานหลายรอบ (กระจายโหลดดีกว่าก้อนเดียว)
+    size = max(1, math.ceil(len(payloads) / (workers * 4)))
+    chunks = [payloads[i:i + size] for i in range(0, len(payloads), size)]
+
+    results: List[BatchResult] = []
+    try:
+        for chunk_results in executor.map(_render_chunk, chunks):
+            for content, error in chunk_results:
+                results.append(BatchResult(len(results), content, error))
+    except BrokenProcessPool as e:
+        # process ลูกตาย (เช่น OOM) -> ใบที่เหลือถือว่าล้มเหลว ไม่โยน error ทั้ง batch
+        for i in range(len(results), len(payloads)):
+            results.append(BatchResult(i, None, f"BrokenProcessPool: {e}"))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return results
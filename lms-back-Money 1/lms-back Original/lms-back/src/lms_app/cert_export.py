@@ -0,0 +1,302 @@
+# lms_app/cert_export.py
+"""
+export ใบประกาศทั้งคอร์ส
+
+  - iter_zip()          -> ZIP ของไฟล์ PDF ที่ render แล้ว + manifest.csv (stream ใน request)
+                           zipfile เขียนลง buffer ที่ seek ไม่ได้ -> ใช้ data descriptor แล้วส่งทีละ chunk
+  - iter_manifest_csv() -> manifest อย่างเดียว (serial_no, verification_code, ...) (stream ใน request)
+  - PDF รวม             -> ต้อง render ทุกหน้าใหม่ จึงไม่ทำใน request:
+                           request_combined_pdf() สร้าง/หา CertificateExport ตาม fingerprint ของข้อมูล
+                           worker (run_certificate_jobs) claim_export() + build_combined_pdf() เขียนไฟล์
+                           แล้ว request ถัดไปส่งไฟล์ที่เสร็จแล้ว (utils.file_response.serve_file)
+
+ZIP/CSV อ่าน Certificate ผ่าน .iterator() และส่งทีละ chunk -> หน่วยความจำคงที่แม้มีหลายพันใบ
+PDF รวม: reportlab เก็บ object ของทุกหน้าไว้จนถึง save() -> หน่วยความจำของ worker โตตามจำนวนหน้า
+(พื้นหลังเป็น form XObject ร่วมกัน (cert_templates.layers) หน้าละไม่กี่ร้อย byte) ไม่กระทบ process เว็บ
+"""
+import csv
+import hashlib
+import io
+import logging
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from reportlab.lib.pagesizes import landscape, A4
+from reportlab.pdfgen import canvas
+
+from .cert_jobs import MAX_RENDER_ATTEMPTS, STALE_AFTER, certificate_render_data, retry_due
+from .cert_pdf_renderer import RENDERER_VERSION
+from .models import Certificate, CertificateExport
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+QUERY_CHUNK = 500
+FINGERPRINT_CACHE_SECONDS = getattr(settings, "CERT_EXPORT_FINGERPRINT_CACHE_SECONDS", 3600)
+
+MANIFEST_FIELDS = ["serial_no", "verification_code", "student_name", "course_name", "completion_date", "file"]
+
+
+def export_queryset(course):
+    return (
+        Certificate.objects.filter(course=course)
+        .select_related("template")
+        .order_by("serial_no")
+    )
+
+
+def _arcname(cert) -> str:
+    return f"certificates/{cert.serial_no}.pdf"
+
+
+def _manifest_row(cert, arcname: str = "") -> list:
+    return [
+        cert.serial_no,
+        cert.verification_code,
+        cert.student_name,
+        cert.course_name,
+        cert.completion_date.isoformat() if cert.completion_date else "",
+        arcname,
+    ]
+
+
+class _Pipe:
+    """
+    file-like ที่เขียนได้อย่างเดียว: เก็บ bytes ไว้จนกว่า generator จะ drain() ออกไปส่ง
+    ไม่มี seek/tell -> zipfile จะเขียนแบบ streaming เอง
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def write(self, data):
+        self._buf += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+# ---------- manifest ----------
+def iter_manifest_csv(course):
+    """CSV ทีละแถว (มี BOM ให้ Excel อ่านภาษาไทยถูก)"""
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def flush_row(row):
+        writer.writerow(row)
+        data = out.getvalue()
+        out.seek(0)
+        out.truncate(0)
+        return data.encode("utf-8")
+
+    yield "﻿".encode("utf-8") + flush_row(MANIFEST_FIELDS)
+    for cert in export_queryset(course).iterator(chunk_size=QUERY_CHUNK):
+        yield flush_row(_manifest_row(cert, _arcname(cert) if cert.file else ""))
+
+
+# ---------- ZIP ----------
+def iter_zip(course):
+    """
+    ZIP ของไฟล์ PDF ที่เก็บไว้แล้ว (ใบที่ยังไม่มีไฟล์จะอยู่ใน manifest แต่ช่อง file ว่าง)
+    PDF บีบอัดแล้ว จึงใช้ ZIP_STORED ประหยัด CPU
+    """
+    pipe = _Pipe()
+    manifest = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", encoding="utf-8", newline="")
+    writer = csv.writer(manifest)
+    writer.writerow(MANIFEST_FIELDS)
+
+    with zipfile.ZipFile(pipe, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for cert in export_queryset(course).iterator(chunk_size=QUERY_CHUNK):
+            arcname = ""
+            if cert.file:
+                try:
+                    src = cert.file.open("rb")
+                except (FileNotFoundError, OSError):
+                    src = None
+                if src is not None:
+                    arcname = _arcname(cert)
+                    with src, zf.open(arcname, mode="w") as dst:
+                        for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                            dst.write(chunk)
+                            yield pipe.drain()
+            writer.writerow(_manifest_row(cert, arcname))
+            yield pipe.drain()
+
+        manifest.seek(0)
+        with zf.open("manifest.csv", mode="w") as dst:
+            dst.write("﻿".encode("utf-8"))
+            for chunk in iter(lambda: manifest.read(CHUNK_SIZE), ""):
+                dst.write(chunk.encode("utf-8"))
+                yield pipe.drain()
+        manifest.close()
+
+    # central directory ถูกเขียนตอนปิด ZipFile
+    yield pipe.drain()
+
+
+# ---------- PDF รวม (request side) ----------
+# คอลัมน์ที่มีผลต่อหน้า PDF (ตรงกับ certificate_render_data) + ลำดับหน้า
+_FINGERPRINT_FIELDS = (
+    "pk", "serial_no", "student_name", "course_name", "instructor_name", "completion_date",
+    "template__style", "template__primary_color", "template__secondary_color",
+)
+
+
+def _combined_version(course) -> str:
+    """
+    version ของข้อมูลทั้งคอร์สด้วย aggregate query เดียว
+    (RENDERER_VERSION + จำนวนใบ + updated_at ล่าสุดของใบและ template)
+    ใบเพิ่ม/ลบ -> จำนวนเปลี่ยน, ข้อมูลบนหน้าใบเปลี่ยน -> Certificate.updated_at / template.updated_at ขยับ
+    """
+    agg = Certificate.objects.filter(course=course).aggregate(
+        n=Count("pk"), cert=Max("updated_at"), tpl=Max("template__updated_at")
+    )
+    raw = f"{RENDERER_VERSION}:{agg['n']}:{agg['cert']}:{agg['tpl']}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def combined_fingerprint(course) -> str:
+    """
+    sha256 ของข้อมูลทุกใบในคอร์ส (อ่านแค่คอลัมน์ข้อความ ไม่ render) + RENDERER_VERSION
+    หน้า export poll ซ้ำทุกไม่กี่วินาที -> cache ค่าไว้ตาม _combined_version (key เปลี่ยนเองเมื่อข้อมูลเปลี่ยน
+    ไม่ต้องล้าง) ไล่อ่านทุกใบเฉพาะครั้งแรกของแต่ละ version
+    """
+    key = f"cert-export-fp:{course.pk}:{_combined_version(course)}"
+    fingerprint = cache.get(key)
+    if fingerprint is not None:
+        return fingerprint
+
+    digest = hashlib.sha256(RENDERER_VERSION.encode("utf-8"))
+    rows = export_queryset(course).values_list(*_FINGERPRINT_FIELDS)
+    for row in rows.iterator(chunk_size=QUERY_CHUNK):
+        digest.update(repr(row).encode("utf-8"))
+    fingerprint = digest.hexdigest()
+    cache.set(key, fingerprint, FINGERPRINT_CACHE_SECONDS)
+    return fingerprint
+
+
+def request_combined_pdf(course, actor=None) -> CertificateExport:
+    """
+    CertificateExport ของข้อมูลปัจจุบัน: มีไฟล์แล้ว (done) / รอ worker อยู่ / สร้างงานใหม่
+    งานที่ failed ครบ CERT_RENDER_MAX_ATTEMPTS แล้วถือว่าจบ -> สร้างงานใหม่ให้
+    """
+    fingerprint = combined_fingerprint(course)
+    export = (
+        CertificateExport.objects.filter(course=course, fingerprint=fingerprint)
+        .exclude(status="failed", attempts__gte=MAX_RENDER_ATTEMPTS)
+        .first()
+    )
+    if export is not None:
+        return export
+    return CertificateExport.objects.create(
+        course=course,
+        fingerprint=fingerprint,
+        created_by=actor if getattr(actor, "is_authenticated", False) else None,
+    )
+
+
+# ---------- PDF รวม (worker side) ----------
+def _claimable(now):
+    return (
+        Q(status="queued")
+        | Q(status="running", updated_at__lt=now - STALE_AFTER)
+        | (Q(status="failed") & retry_due(now, "attempts", "updated_at"))
+    )
+
+
+def claim_export():
+    """จองงาน PDF รวมถัดไปที่ worker อื่นยังไม่ได้ทำ (SKIP LOCKED); ไม่มี -> None"""
+    now = timezone.now()
+    with transaction.atomic():
+        export = (
+            CertificateExport.objects.select_for_update(skip_locked=True)
+            .filter(_claimable(now))
+            .order_by("created_at")
+            .first()
+        )
+        if export is None:
+            return None
+        export.status = "running"
+        export.started_at = export.started_at or now
+        export.attempts += 1
+        export.error = ""
+        export.save(update_fields=["status", "started_at", "attempts", "error", "updated_at"])
+    return export
+
+
+def write_combined_pdf(course, out) -> int:
+    """วาดทุกใบของคอร์สลง out (file-like) ใบละหน้า เรียงตาม serial_no; คืนจำนวนหน้า"""
+    from .cert_pdf_renderer import register_fonts
+    from .cert_templates.layers import draw_page
+
+    register_fonts()
+    c = canvas.Canvas(out, pagesize=landscape(A4))
+    pages = 0
+    for cert in export_queryset(course).iterator(chunk_size=QUERY_CHUNK):
+        draw_page(c, certificate_render_data(cert))
+        c.showPage()
+        pages += 1
+    if not pages:
+        # PDF ต้องมีอย่างน้อย 1 หน้า
+        c.showPage()
+    c.save()
+    return pages
+
+
+def _delete_older_exports(export) -> None:
+    """
+    ลบ export รุ่นก่อนของคอร์สที่จบแล้วเท่านั้น (done / failed ครบ MAX_RENDER_ATTEMPTS)
+    งาน queued/running หรือ failed ที่ยังรอ retry อาจมี worker ถืออยู่/มี request รอ -> ไม่แตะ
+    """
+    older = (
+        CertificateExport.objects.filter(course_id=export.course_id, created_at__lte=export.created_at)
+        .exclude(pk=export.pk)
+        .filter(Q(status="done") | Q(status="failed", attempts__gte=MAX_RENDER_ATTEMPTS))
+    )
+    for old in older:
+        if old.file:
+            old.file.delete(save=False)
+        old.delete()
+
+
+def build_combined_pdf(export) -> bool:
+    """render PDF รวมลงไฟล์ชั่วคราวบนดิสก์ แล้วเก็บเข้า export.file; คืน True ถ้าสำเร็จ"""
+    try:
+        with tempfile.TemporaryFile() as tmp:
+            pages = write_combined_pdf(export.course, tmp)
+            tmp.seek(0)
+            export.file.save(f"certificates_{export.course_id}_{export.pk}.pdf", File(tmp), save=False)
+    except Exception as exc:
+        logger.exception("Combined certificate PDF %s failed", export.pk)
+        CertificateExport.objects.filter(pk=export.pk).update(
+            status="failed", error=str(exc)[:2000], updated_at=timezone.now()
+        )
+        return False
+
+    now = timezone.now()
+    export.status = "done"
+    export.pages = pages
+    export.finished_at = now
+    export.save(update_fields=["file", "status", "pages", "finished_at", "updated_at"])
+    # ไฟล์รุ่นก่อนของคอร์สนี้ไม่มีใครขอแล้ว (fingerprint เก่า)
+    _delete_older_exports(export)
+    return True
+
+
+# format ที่ stream ตรงจาก request (pdf ไปทาง request_combined_pdf)
+EXPORT_FORMATS = {
+    "zip": (iter_zip, "application/zip", "zip"),
+    "csv": (iter_manifest_csv, "text/csv; charset=utf-8", "csv"),
+}
@@ -0,0 +1,214 @@
+# lms_app/cert_images.py
+"""
+รูป PNG ของใบประกาศ (thumbnail / social share / print) แบบสร้างเมื่อมีคนขอครั้งแรก
+
+- วาดด้วยเทมเพลต reportlab ชุดเดียวกับ PDF ผ่าน PillowCanvas (รองรับคำสั่ง canvas ที่เทมเพลตใช้)
+  ราสเตอร์ครั้งเดียวที่ความละเอียด print แล้วย่อเป็นขนาดอื่นด้วย Pillow
+- เก็บใน storage ข้างไฟล์ PDF: certificates/images/<cert_id>/<fingerprint>/<variant>.png
+  fingerprint มาจากข้อมูลที่ใช้วาด (cert_jobs.render_fingerprint) ข้อมูลเปลี่ยน = path ใหม่
+  ชุดเก่าของใบเดียวกันถูกลบตอนสร้างชุดใหม่
+- ปกติ worker สร้างให้ต่อจาก PDF (CERT_IMAGES_PRERENDER) -> request สาธารณะแค่หาไฟล์ที่มีอยู่
+  (existing_variant); ราสเตอร์ใน request เฉพาะผู้ที่ can_render (เจ้าของใบ/ผู้สอน/staff)
+"""
+import threading
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import landscape, A4
+
+from .cert_jobs import certificate_render_data, render_fingerprint
+from .cert_pdf_renderer import FONT_FILES
+from .cert_templates.layers import draw_flat
+
+PRINT_DPI = 300
+IMAGE_ROOT = "certificates/images"
+
+# variant -> (กว้าง, สูง) ; สูง None = ตามสัดส่วน, ระบุทั้งคู่ = วางกลางบนพื้นขาวขนาดนั้น (เช่น og:image 1.91:1)
+VARIANTS = {
+    "thumb": (480, None),
+    "social": (1200, 630),
+    "print": (None, None),  # ขนาดจริงที่ PRINT_DPI
+}
+
+FONTS_DIR = Path(__file__).resolve().parent / "fonts"
+
+_LOCK_STRIPES = 32
+_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+
+@lru_cache(maxsize=32)
+def _font(name: str, px: int):
+    try:
+        return ImageFont.truetype(str(FONTS_DIR / FONT_FILES.get(name, FONT_FILES["Sarabun"])), px)
+    except OSError:
+        return ImageFont.load_default(px)
+
+
+def _rgb(color) -> tuple:
+    r, g, b = color.rgb()
+    return (round(r * 255), round(g * 255), round(b * 255))
+
+
+class PillowCanvas:
+    """
+    canvas แบบ reportlab (พิกัด point, จุดเริ่มมุมซ้ายล่าง) ที่วาดลง PIL.Image
+    รองรับเฉพาะคำสั่งที่ cert_templates ใช้
+    """
+
+    def __init__(self, pagesize=landscape(A4), dpi: int = PRINT_DPI):
+        self.width, self.height = pagesize
+        self.scale = dpi / 72.0
+        self.image = Image.new("RGB", (round(self.width * self.scale), round(self.height * self.scale)), "white")
+        self.draw = ImageDraw.Draw(self.image)
+        self._fill = (0, 0, 0)
+        self._stroke = (0, 0, 0)
+        self._line_width = 1.0
+        self._font = ("Sarabun", 12)
+
+    def _xy(self, x, y) -> tuple:
+        return (x * self.scale, (self.height - y) * self.scale)
+
+    def _lw(self) -> int:
+        return max(1, round(self._line_width * self.scale))
+
+    def setFillColor(self, color):
+        self._fill = _rgb(color)
+
+    def setStrokeColor(self, color):
+        self._stroke = _rgb(color)
+
+    def setLineWidth(self, width):
+        self._line_width = width
+
+    def setFont(self, name, size, leading=None):
+        self._font = (name, size)
+
+    def rect(self, x, y, width, height, stroke=1, fill=0):
+        x0, y1 = self._xy(x, y)
+        x1, y0 = self._xy(x + width, y + height)
+        if fill:
+            self.draw.rectangle([x0, y0, x1, y1], fill=self._fill)
+        if stroke:
+            # reportlab วาดเส้นคร่อมขอบ ส่วน PIL วาดเข้าด้านใน -> ขยายกรอบครึ่งหนึ่งของความหนา
+            lw = self._lw()
+            half = lw / 2
+            self.draw.rectangle([x0 - half, y0 - half, x1 + half, y1 + half], outline=self._stroke, width=lw)
+
+    def line(self, x1, y1, x2, y2):
+        self.draw.line([self._xy(x1, y1), self._xy(x2, y2)], fill=self._stroke, width=self._lw())
+
+    def _text(self, x, y, text, anchor):
+        name, size = self._font
+        self.draw.text(self._xy(x, y), text or "", font=_font(name, round(size * self.scale)),
+                       fill=self._fill, anchor=anchor)
+
+    def drawString(self, x, y, text, *args, **kwargs):
+        self._text(x, y, text, "ls")
+
+    def drawCentredString(self, x, y, text, *args, **kwargs):
+        self._text(x, y, text, "ms")
+
+    def drawRightString(self, x, y, text, *args, **kwargs):
+        self._text(x, y, text, "rs")
+
+
+# ---------- variants ----------
+def content_fingerprint(cert) -> str:
+    return render_fingerprint(certificate_render_data(cert))
+
+
+def variant_path(cert, variant: str, fingerprint: str = None) -> str:
+    fingerprint = fingerprint or content_fingerprint(cert)
+    return f"{IMAGE_ROOT}/{cert.id}/{fingerprint[:16]}/{variant}.png"
+
+
+def _resize(image, size) -> Image.Image:
+    width, height = size
+    if width is None:
+        return image
+    if height is None:
+        return image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+    fitted = image.copy()
+    fitted.thumbnail((width, height), Image.LANCZOS)
+    board = Image.new("RGB", (width, height), "white")
+    board.paste(fitted, ((width - fitted.width) // 2, (height - fitted.height) // 2))
+    return board
+
+
+def _png(image) -> bytes:
+    buf = BytesIO()
+    image.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def purge_images(cert_id, keep: str = "") -> int:
+    """ลบรูปทุกชุดของใบนี้ ยกเว้นชุด keep; คืนจำนวนไฟล์ที่ลบ"""
+    folder = f"{IMAGE_ROOT}/{cert_id}"
+    try:
+        dirs, _ = default_storage.listdir(folder)
+    except (FileNotFoundError, NotImplementedError):
+        return 0
+    deleted = 0
+    for d in dirs:
+        if d == keep:
+            continue
+        _, files = default_storage.listdir(f"{folder}/{d}")
+        for f in files:
+            default_storage.delete(f"{folder}/{d}/{f}")
+            deleted += 1
+    return deleted
+
+
+def generate_variants(cert) -> dict:
+    """ราสเตอร์ครั้งเดียว แล้วบันทึกทุก variant; คืน {variant: storage name}"""
+    data = certificate_render_data(cert)
+    fingerprint = render_fingerprint(data)
+
+    pc = PillowCanvas()
+    draw_flat(pc, data)
+
+    names = {}
+    for variant, size in VARIANTS.items():
+        name = variant_path(cert, variant, fingerprint)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        names[variant] = default_storage.save(name, ContentFile(_png(_resize(pc.image, size))))
+
+    purge_images(cert.id, keep=fingerprint[:16])
+    return names
+
+
+def existing_variant(cert, variant: str):
+    """storage name ของ variant ถ้ามีไฟล์ของ fingerprint ปัจจุบันแล้ว ไม่งั้น None (ไม่ราสเตอร์)"""
+    if variant not in VARIANTS:
+        raise KeyError(variant)
+    name = variant_path(cert, variant)
+    return name if default_storage.exists(name) else None
+
+
+def can_render(user, cert) -> bool:
+    """ใครสั่งราสเตอร์ใน request ได้ (ต้อง select_related("course") มาแล้ว)"""
+    if not getattr(user, "is_authenticated", False):
+        return False
+    return user.is_staff or user.id in (cert.student_id, cert.course.instructor_id)
+
+
+def get_variant(cert, variant: str) -> str:
+    """storage name ของ variant (สร้างทุก variant ให้ถ้ายังไม่มีของ fingerprint ปัจจุบัน)"""
+    if variant not in VARIANTS:
+        raise KeyError(variant)
+
+    fingerprint = content_fingerprint(cert)
+    name = variant_path(cert, variant, fingerprint)
+    if default_storage.exists(name):
+        return name
+
+    with _locks[cert.id.int % _LOCK_STRIPES]:
+        if default_storage.exists(name):
+            return name
+        return generate_variants(cert)[variant]
@@ -0,0 +1,456 @@
+# lms_app/cert_jobs.py
+"""
+คิวงาน render ใบประกาศแบบเก็บใน DB (ไม่ render ใน HTTP request)
+
+ขั้นตอน:
+  1) enqueue_course_certificates()  -> สร้าง/อัปเดต Certificate เป็น pending แล้วผูกกับ CertificateRenderJob
+  2) claim_certificates()           -> worker จองงานด้วย SELECT ... FOR UPDATE SKIP LOCKED
+                                       (หลาย worker ช่วยกันเคลียร์ job เดียวกันได้โดยไม่ชนกัน)
+  3) render_certificates()          -> render PDF หลายใบขนานกัน (cert_batch) + แนบไฟล์ + อัปเดต render_status / render_error
+  4) refresh_job()                  -> สรุปสถานะ job จากสถานะของ Certificate ในงาน
+
+งานที่ failed จะถูกจองใหม่ได้จนกว่า render_attempts จะครบ CERT_RENDER_MAX_ATTEMPTS
+โดยเว้นช่วงก่อนลองใหม่ (retry_backoff: CERT_RENDER_RETRY_SECONDS แล้วเพิ่มเท่าตัวทุกครั้งที่ล้ม)
+งานที่ค้าง rendering นานเกิน CERT_RENDER_STALE_SECONDS (worker ตาย) ก็จะถูกจองใหม่เช่นกัน
+"""
+import hashlib
+import json
+import logging
+import operator
+import random
+import string
+from datetime import timedelta
+from functools import reduce
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .cert_batch import render_batch
+from .cert_pdf_renderer import RENDERER_VERSION
+from .cert_verify import code_for
+from .models import (
+    Certificate,
+    CertificateRenderJob,
+    CertificateTemplate,
+    Enrollment,
+    EnrollmentStatus,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_RENDER_ATTEMPTS = getattr(settings, "CERT_RENDER_MAX_ATTEMPTS", 3)
+STALE_AFTER = timedelta(seconds=getattr(settings, "CERT_RENDER_STALE_SECONDS", 600))
+RETRY_AFTER = timedelta(seconds=getattr(settings, "CERT_RENDER_RETRY_SECONDS", 30))
+
+
+# ---------- helpers ----------
+def _gen_serial_no() -> str:
+    today = timezone.now().strftime("%Y%m%d")
+    suffix = "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    return f"CERT-{today}-{suffix}"
+
+
+def template_options(course, tpl=None) -> dict:
+    """ค่าที่ได้จากเทมเพลตของคอร์ส (มี default เมื่อยังไม่ได้ตั้งเทมเพลต)"""
+    return {
+        "style": tpl.style if tpl else "classic",
+        "primary_color": tpl.primary_color if tpl else "#881337",
+        "secondary_color": tpl.secondary_color if tpl else "#1f2937",
+        "course_title": (tpl.course_title_override if (tpl and tpl.course_title_override) else course.title),
+        "issuer": (tpl.issuer_name if tpl else (
+            course.instructor.full_name if getattr(course, "instructor", None) else ""
+        )),
+    }
+
+
+def certificate_render_data(cert) -> dict:
+    """แปลง Certificate -> dict ที่ cert_pdf_renderer.render_certificate_pdf ใช้"""
+    tpl = cert.template
+    return {
+        "student_name": cert.student_name,
+        "course_name": cert.course_name,
+        "instructor_name": cert.instructor_name,
+        "completion_date": cert.completion_date.strftime("%d/%m/%Y"),
+        "primary_color": tpl.primary_color if tpl else "#881337",
+        "secondary_color": tpl.secondary_color if tpl else "#1f2937",
+        "style": tpl.style if tpl else "classic",
+    }
+
+
+def render_fingerprint(data: dict) -> str:
+    """sha256 ของ input ที่มีผลต่อหน้าตา PDF (style / สี / ชื่อ / วันที่) + RENDERER_VERSION"""
+    payload = json.dumps(
+        {"renderer": RENDERER_VERSION, **data},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_up_to_date(cert) -> bool:
+    """ไฟล์ที่มีอยู่ render จากข้อมูลชุดปัจจุบันแล้วหรือยัง"""
+    return (
+        cert.render_status == "done"
+        and bool(cert.file)
+        and cert.render_fingerprint == render_fingerprint(certificate_render_data(cert))
+    )
+
+
+# ---------- bulk helpers ----------
+BULK_BATCH_SIZE = 500
+# รอบสุ่ม serial ใหม่ให้ใบที่ insert ไม่ได้เพราะ serial ชนกับ request อื่นที่ insert ไปก่อน
+INSERT_ATTEMPTS = 3
+
+
+def allocate_unique(field: str, generate, n: int) -> list:
+    """
+    สุ่มค่าที่ไม่ซ้ำกันเอง และไม่ชนค่าที่มีใน DB แล้ว จำนวน n ค่า
+    ตรวจกับ DB ทีละชุด (ปกติ 1 query; สุ่มซ้ำเฉพาะตัวที่ชน)
+    """
+    values = set()
+    while len(values) < n:
+        batch = {generate() for _ in range(n - len(values))} - values
+        taken = set(
+            Certificate.objects.filter(**{f"{field}__in": batch}).values_list(field, flat=True)
+        )
+        values |= batch - taken
+    return list(values)
+
+
+def _insert_certificates(certs) -> list:
+    """
+    bulk_create แบบ ON CONFLICT DO NOTHING แล้วเลือกกลับเฉพาะแถวที่ insert ได้จริง
+    (id เป็น uuid ที่สร้างฝั่ง Python -> แถวที่ชน unique ใด ๆ จะไม่มี id นี้ใน DB)
+    """
+    Certificate.objects.bulk_create(certs, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+    inserted = set()
+    for i in range(0, len(certs), BULK_BATCH_SIZE):
+        ids = [c.pk for c in certs[i:i + BULK_BATCH_SIZE]]
+        inserted.update(Certificate.objects.filter(pk__in=ids).values_list("pk", flat=True))
+    return [c for c in certs if c.pk in inserted]
+
+
+def _new_certificates(course, students, tpl, opts, actor, job) -> list:
+    """
+    สร้าง Certificate ของ students ทั้งหมดด้วย bulk_create (serial/code จองไว้ล่วงหน้า)
+    ทนต่อ request ที่ออกใบพร้อมกัน: ชน (course, student) = มีคนออกให้แล้ว -> ข้าม,
+    ชน serial_no (สุ่มซ้ำกับแถวที่เพิ่ง insert) -> สุ่มใหม่เฉพาะคนนั้น; คืนเฉพาะใบที่สร้างจริง
+    """
+    pending = list(students)
+    created = []
+    for _ in range(INSERT_ATTEMPTS):
+        if not pending:
+            break
+        certs = _build_certificates(course, pending, tpl, opts, actor, job)
+        inserted = _insert_certificates(certs)
+        created += inserted
+        if len(inserted) == len(certs):
+            pending = []
+            break
+
+        done = {c.pk for c in inserted}
+        missed = {c.student_id for c in certs if c.pk not in done}
+        issued = set(
+            Certificate.objects.filter(course=course, student_id__in=missed)
+            .values_list("student_id", flat=True)
+        )
+        pending = [st for st in pending if st.id in missed and st.id not in issued]
+
+    if pending:
+        logger.error("Certificate serials kept colliding for %d students (%s)", len(pending), course.pk)
+    return created
+
+
+def _build_certificates(course, students, tpl, opts, actor, job) -> list:
+    today = timezone.now().date()
+    serials = allocate_unique("serial_no", _gen_serial_no, len(students))
+
+    certs = [
+        Certificate(
+            course=course,
+            student=student,
+            serial_no=serial,
+            instructor_name=opts["issuer"],
+            student_name=student.full_name,
+            course_name=opts["course_title"],
+            completion_date=today,
+            render_status="pending",
+            render_error="",
+            created_by=actor,
+            template=tpl,
+            render_job=job,
+        )
+        for student, serial in zip(students, serials)
+    ]
+    # id (uuid) มีตั้งแต่สร้าง object -> ลงลายเซ็นรหัสตรวจสอบได้ก่อน insert และไม่ชนกันแน่นอน
+    for cert in certs:
+        cert.verification_code = code_for(cert)
+    return certs
+
+
+def _finish_enqueue(job, total: int, skipped: int = 0) -> None:
+    job.total = total
+    job.skipped = skipped
+    if not total:
+        job.status = "done"
+        job.finished_at = timezone.now()
+    job.save(update_fields=["total", "skipped", "status", "finished_at", "updated_at"])
+
+
+# ---------- enqueue ----------
+def enqueue_course_certificates(course, actor) -> CertificateRenderJob:
+    """
+    เตรียม Certificate ของผู้เรียนที่ COMPLETED ทุกคนให้อยู่สถานะ pending แล้วผูกกับ job ใหม่
+    (ไม่ render ที่นี่ — worker จะมาจองไปทำเอง)
+    ใบที่ข้อมูลไม่เปลี่ยน (fingerprint เท่าเดิม) จะถูกข้าม นับไว้ใน job.skipped
+    จำนวน query คงที่ไม่ขึ้นกับจำนวนผู้เรียน (อ่านทีละชุด + bulk_create / bulk_update)
+    """
+    tpl = CertificateTemplate.objects.filter(course=course).first()
+    opts = template_options(course, tpl)
+
+    students = [
+        en.student
+        for en in Enrollment.objects.filter(course=course, status=EnrollmentStatus.COMPLETED)
+        .select_related("student")
+    ]
+    existing = {
+        cert.student_id: cert
+        for cert in Certificate.objects.filter(course=course, student__in=students)
+    }
+
+    with transaction.atomic():
+        job = CertificateRenderJob.objects.create(course=course, created_by=actor)
+
+        now = timezone.now()
+        to_update = []
+        skipped = 0
+        for student in students:
+            cert = existing.get(student.id)
+            if cert is None:
+                continue
+
+            # completion_date คงเดิม (วันที่จบจริงไม่เปลี่ยนเพราะกด issue ซ้ำ)
+            cert.instructor_name = opts["issuer"]
+            cert.student_name = student.full_name
+            cert.course_name = opts["course_title"]
+            cert.template = tpl
+
+            if is_up_to_date(cert):
+                skipped += 1
+                continue
+
+            cert.render_status = "pending"
+            cert.render_error = ""
+            cert.render_job = job
+            cert.render_attempts = 0
+            cert.render_started_at = None
+            cert.updated_at = now
+            to_update.append(cert)
+
+        Certificate.objects.bulk_update(
+            to_update,
+            [
+                "instructor_name", "student_name", "course_name", "template",
+                "render_status", "render_error", "render_job", "render_attempts", "render_started_at",
+                "updated_at",
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        created = _new_certificates(
+            course, [st for st in students if st.id not in existing], tpl, opts, actor, job
+        )
+
+        _finish_enqueue(job, len(to_update) + len(created), skipped)
+
+    return job
+
+
+def bulk_issue_certificates(course, student_ids, actor):
+    """
+    ออกใบให้นักเรียนตาม id ที่ยังไม่มีใบของคอร์สนี้ (ใบที่มีแล้วไม่แตะ)
+    หา pair ที่ขาดด้วย query เดียว, bulk_create แล้วส่งเข้าคิว render
+    คืน (job, [id ของใบที่สร้างใหม่])
+    """
+    student_ids = set(student_ids)
+    tpl = CertificateTemplate.objects.filter(course=course).first()
+    opts = template_options(course, tpl)
+
+    issued = set(
+        Certificate.objects.filter(course=course, student_id__in=student_ids)
+        .values_list("student_id", flat=True)
+    )
+    students = User.objects.filter(id__in=student_ids - issued).only("id", "full_name")
+
+    with transaction.atomic():
+        job = CertificateRenderJob.objects.create(course=course, created_by=actor)
+        created = _new_certificates(course, students, tpl, opts, actor, job)
+        _finish_enqueue(job, len(created))
+
+    return job, [c.id for c in created]
+
+
+# ---------- worker side ----------
+def retry_backoff(attempts: int) -> timedelta:
+    """ช่วงรอก่อนลองใหม่หลังล้มมาแล้ว attempts ครั้ง: RETRY_AFTER, x2, x4, ..."""
+    return RETRY_AFTER * (2 ** max(attempts - 1, 0))
+
+
+def retry_due(now, attempts_field: str, since_field: str) -> Q:
+    """
+    แถวที่ล้มแล้วลองใหม่ได้ตอนนี้: ยังไม่ครบ MAX_RENDER_ATTEMPTS และพ้น retry_backoff นับจาก since_field
+    (งานที่ล้มแบบเดิมทุกครั้งจะไม่ใช้ครบทุกรอบภายในไม่กี่วินาที)
+    """
+    return reduce(
+        operator.or_,
+        (
+            Q(**{attempts_field: n})
+            & (Q(**{f"{since_field}__lt": now - retry_backoff(n)}) | Q(**{f"{since_field}__isnull": True}))
+            for n in range(MAX_RENDER_ATTEMPTS)
+        ),
+        Q(pk__in=[]),
+    )
+
+
+def _claimable(now):
+    return (
+        Q(render_status="pending")
+        | (Q(render_status="failed") & retry_due(now, "render_attempts", "render_started_at"))
+        | Q(render_status="rendering", render_started_at__lt=now - STALE_AFTER)
+    )
+
+
+def claim_certificates(limit: int, job_id=None) -> list:
+    """
+    จอง Certificate ที่รอ render สูงสุด `limit` ใบ
+    ใช้ FOR UPDATE SKIP LOCKED เพื่อให้ worker หลายตัวดึงงานคนละชุดกันได้
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        qs = (
+            Certificate.objects.select_for_update(skip_locked=True)
+            .filter(render_job__isnull=False)
+            .filter(_claimable(now))
+            .order_by("created_at")
+        )
+        if job_id:
+            qs = qs.filter(render_job_id=job_id)
+        ids = list(qs.values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+
+        Certificate.objects.filter(id__in=ids).update(
+            render_status="rendering",
+            render_started_at=now,
+            render_attempts=F("render_attempts") + 1,
+        )
+        CertificateRenderJob.objects.filter(
+            certificates__id__in=ids, status="queued"
+        ).update(status="running", updated_at=now)
+
+    return list(
+        Certificate.objects.filter(id__in=ids)
+        .select_related("template", "render_job")
+        .order_by("created_at")
+    )
+
+
+def _store_result(cert, data: dict, content, error: str) -> bool:
+    if content is not None:
+        cert.file.save(f"cert_{cert.id}.pdf", ContentFile(content), save=False)
+        cert.render_status = "done"
+        cert.render_error = ""
+        cert.render_fingerprint = render_fingerprint(data)
+    else:
+        logger.error("Certificate render failed (%s): %s", cert.id, error)
+        cert.render_status = "failed"
+        cert.render_error = (error or "render failed")[:2000]
+
+    cert.save(update_fields=["file", "render_status", "render_error", "render_fingerprint"])
+    return cert.render_status == "done"
+
+
+def render_certificate(cert) -> bool:
+    """render ใบเดียว (PDF อย่างเดียว) ใน process ปัจจุบันแล้วบันทึกผล; คืน True ถ้าสำเร็จ"""
+    return render_certificates([cert], max_workers=1)[0]
+
+
+def ensure_certificate_file(cert, missing: bool = False) -> bool:
+    """
+    render ใหม่ (ใน request นี้) เมื่อไฟล์ไม่ตรงกับข้อมูลปัจจุบัน หรือผู้เรียกพบว่าไฟล์หาย (missing=True)
+    ไม่ stat ไฟล์เอง — ผู้ส่งไฟล์จะ stat อยู่แล้ว; คืน True ถ้ามีไฟล์พร้อมส่ง
+    """
+    if not missing and is_up_to_date(cert):
+        return True
+    return render_certificate(cert)
+
+
+def render_certificates(certs, executor=None, max_workers=None, prerender_images: bool = False) -> list:
+    """
+    render หลายใบผ่าน cert_batch.render_batch (กระจายหลาย process, backend ตาม CERT_RENDER_BACKENDS)
+    แล้วบันทึกไฟล์/สถานะทีละใบ; คืน list[bool] ตามลำดับ certs
+    prerender_images: ทำ PNG ต่อ (เฉพาะ worker — ใน request ให้ cert_images ทำเมื่อมีคนขอจริง)
+    """
+    certs = list(certs)
+    payloads = [certificate_render_data(c) for c in certs]
+    results = render_batch(
+        [{**data, "certificate_id": str(c.id)} for c, data in zip(certs, payloads)],
+        executor=executor,
+        max_workers=max_workers,
+    )
+    stored = [
+        _store_result(cert, data, r.content, r.error)
+        for cert, data, r in zip(certs, payloads, results)
+    ]
+    if prerender_images and getattr(settings, "CERT_IMAGES_PRERENDER", True):
+        _prerender_images([cert for cert, ok in zip(certs, stored) if ok])
+    return stored
+
+
+def _prerender_images(certs) -> None:
+    """PNG ทุก variant ต่อจาก PDF (หน้าเว็บสาธารณะจะได้แค่ส่งไฟล์) — ล้มแค่ log, PDF ยังใช้ได้"""
+    from .cert_images import generate_variants
+
+    for cert in certs:
+        try:
+            generate_variants(cert)
+        except Exception:
+            logger.exception("Certificate images failed (%s)", cert.id)
+
+
+def job_progress(job) -> dict:
+    counts = job.certificates.aggregate(
+        done=Count("id", filter=Q(render_status="done")),
+        failed=Count("id", filter=Q(render_status="failed")),
+        rendering=Count("id", filter=Q(render_status="rendering")),
+        pending=Count("id", filter=Q(render_status="pending")),
+        retryable=Count("id", filter=Q(render_status="failed", render_attempts__lt=MAX_RENDER_ATTEMPTS)),
+    )
+    return counts
+
+
+def job_finished(job_id) -> bool:
+    """สรุปสถานะ job แล้วบอกว่าจบหรือยัง (ไม่มี job นี้ = จบ)"""
+    refresh_job(job_id)
+    return not (
+        CertificateRenderJob.objects.filter(pk=job_id).exclude(status__in=("done", "failed")).exists()
+    )
+
+
+def refresh_job(job_id) -> None:
+    """อัปเดตสถานะ job เมื่อไม่มีใบที่รอ/กำลัง render หรือรอ retry แล้ว"""
+    job = CertificateRenderJob.objects.filter(pk=job_id).first()
+    if not job or job.status in ("done", "failed"):
+        return
+
+    counts = job_progress(job)
+    if counts["pending"] or counts["rendering"] or counts["retryable"]:
+        return
+
+    job.status = "failed" if counts["failed"] else "done"
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "finished_at", "updated_at"])
@@ -6,42 +6,95 @@ from reportlab.pdfbase.ttfonts import TTFont
 from django.core.files.base import ContentFile
 from io import BytesIO
 from pathlib import Path
+import logging
+import threading
 
-from .cert_templates.classic import draw_classic
-from .cert_templates.minimalist import draw_minimalist
-from .cert_templates.modern import draw_modern
+from .cert_templates.layers import draw_page
 
-# ----- register Thai fonts (best-effort) -----
-def register_fonts():
-    base = Path(__file__).resolve().parent / "fonts"
-    try:
-        pdfmetrics.registerFont(TTFont("Sarabun",            str(base / "THSarabunNew.ttf")))
-        pdfmetrics.registerFont(TTFont("Sarabun-Bold",       str(base / "THSarabunNew Bold.ttf")))
-        pdfmetrics.registerFont(TTFont("Sarabun-Italic",     str(base / "THSarabunNew Italic.ttf")))
-        pdfmetrics.registerFont(TTFont("Sarabun-BoldItalic", str(base / "THSarabunNew BoldItalic.ttf")))
-    except Exception:
-        # หาไม่เจอให้ fallback เป็น Helvetica
-        pass
+logger = logging.getLogger(__name__)
 
+# เพิ่มเลขนี้ทุกครั้งที่แก้หน้าตาเทมเพลต/ฟอนต์ -> ใบเดิมทั้งหมดจะถูก render ใหม่ตอน issue ครั้งถัดไป
+RENDERER_VERSION = "2"
 
-def render_certificate_pdf(data: dict, filename: str):
-    register_fonts()
+# ----- register Thai fonts (best-effort, ครั้งเดียวต่อ process) -----
+# ถูกเรียกจาก cert_backends.warm_up_renderers() (lms/wsgi.py ใน master ของ gunicorn --preload) -> worker ที่ fork ออกไปใช้ฟอนต์ชุดเดียวกัน (copy-on-write)
+FONT_FILES = {
+    "Sarabun":            "THSarabunNew.ttf",
+    "Sarabun-Bold":       "THSarabunNew Bold.ttf",
+    "Sarabun-Italic":     "THSarabunNew Italic.ttf",
+    "Sarabun-BoldItalic": "THSarabunNew BoldItalic.ttf",
+}
+FALLBACK_FACES = {
+    "Sarabun":            "Helvetica",
+    "Sarabun-Bold":       "Helvetica-Bold",
+    "Sarabun-Italic":     "Helvetica-Oblique",
+    "Sarabun-BoldItalic": "Helvetica-BoldOblique",
+}
+
+_font_lock = threading.Lock()
+_font_state = {"registered": False, "fallback": False, "error": ""}
+
+
+def register_fonts() -> bool:
+    """
+    ลงทะเบียนฟอนต์ไทยครั้งแรกครั้งเดียว (เรียกซ้ำได้ ไม่ parse TTF ใหม่)
+    ถ้าโหลด TTF ไม่ได้ จะผูกชื่อ Sarabun* กับ Helvetica แทน เพื่อให้ template ยังวาดได้
+    คืน True ถ้าได้ฟอนต์ THSarabunNew จริง
+    """
+    if _font_state["registered"]:
+        return not _font_state["fallback"]
+
+    with _font_lock:
+        if _font_state["registered"]:
+            return not _font_state["fallback"]
+
+        base = Path(__file__).resolve().parent / "fonts"
+        try:
+            for name, filename in FONT_FILES.items():
+                pdfmetrics.registerFont(TTFont(name, str(base / filename)))
+        except Exception as e:
+            # หาไม่เจอให้ fallback เป็น Helvetica
+            logger.warning("Thai fonts unavailable, falling back to Helvetica: %s", e)
+            for name, face in FALLBACK_FACES.items():
+                pdfmetrics.registerFont(pdfmetrics.Font(name, face, "WinAnsiEncoding"))
+            _font_state["fallback"] = True
+            _font_state["error"] = str(e)
+
+        _font_state["registered"] = True
+        return not _font_state["fallback"]
 
-    buf = BytesIO()
-    c = canvas.Canvas(buf, pagesize=landscape(A4))
 
-    style = data.get("style", "classic")
+def font_status() -> dict:
+    """สถานะฟอนต์ของ process นี้: registered / fallback (ใช้ Helvetica แทน) / error"""
+    return dict(_font_state)
 
-    if style == "minimalist":
-        draw_minimalist(c, data)
-    elif style == "modern":
-        draw_modern(c, data)
-    else:
-        # default = classic
-        draw_classic(c, data)
 
-    c.showPage()
+def render_certificate_bytes(data: dict, invariant: bool = False) -> bytes:
+    """
+    วาดใบประกาศ 1 หน้าแล้วคืน bytes ของ PDF
+    (ไม่ลงทะเบียนฟอนต์ให้ — ผู้เรียกต้อง register_fonts() ก่อน)
+    invariant=True: ไม่ฝังเวลาสร้าง/ID สุ่ม -> input เดิมได้ bytes เดิมทุกครั้ง (ใช้กับ ETag)
+    """
+    return render_certificates_bytes([data], invariant=invariant)
+
+
+def render_certificates_bytes(payloads, invariant: bool = False) -> bytes:
+    """
+    วาดหลายใบลง PDF เดียว (ใบละหน้า)
+    พื้นหลังของแต่ละ style/สี ถูกเขียนเป็น form XObject ครั้งเดียวแล้วทุกหน้าอ้างถึงซ้ำ
+    ไฟล์รวมจึงโตตามจำนวนข้อความ ไม่ใช่จำนวนกรอบ/แถบสี
+    """
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=landscape(A4), invariant=int(invariant))
+
+    for data in payloads:
+        draw_page(c, data)
+        c.showPage()
+
     c.save()
+    return buf.getvalue()
+
 
-    buf.seek(0)
-    return ContentFile(buf.getvalue(), name=filename)
+def render_certificate_pdf(data: dict, filename: str):
+    register_fonts()
+    return ContentFile(render_certificate_bytes(data), name=filename)
@@ -0,0 +1,80 @@
+# lms_app/cert_preview.py
+"""
+แคช PDF ตัวอย่างใบประกาศ (หน้าแก้เทมเพลตเรียก preview ทุกครั้งที่แก้ค่า)
+
+- key = sha256 ของข้อมูลที่ใช้วาด (style / สี / ชื่อคอร์ส / ผู้ออก / วันที่) + RENDERER_VERSION
+  ใช้เป็น strong ETag ได้ตรง ๆ: ข้อมูลเท่ากัน = PDF เท่ากันทุก byte (render แบบ invariant)
+- เก็บใน cache alias "cert_preview" (MAX_ENTRIES จำกัดขนาด, เต็มแล้ว cull ทิ้ง)
+- request ที่ key เดียวกันมาพร้อมกัน render แค่ครั้งเดียว (คนที่เหลือรอ lock แล้วอ่านจาก cache)
+"""
+import hashlib
+import json
+import threading
+
+from django.core.cache import caches
+from django.utils import timezone
+
+from .cert_pdf_renderer import RENDERER_VERSION
+
+PREVIEW_CACHE_ALIAS = "cert_preview"
+PREVIEW_STUDENT_NAME = "ตัวอย่างผู้เรียน"
+
+# lock แบบแบ่งช่อง (จำนวนคงที่) แทน lock ต่อ key — ไม่ต้องเก็บ/ลบ lock ของทุก key
+_LOCK_STRIPES = 64
+_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+
+def preview_data(course, tpl=None) -> dict:
+    style = tpl.style if tpl else "classic"
+    primary = tpl.primary_color if tpl else "#881337"
+    secondary = tpl.secondary_color if tpl else "#1f2937"
+    course_title = (tpl.course_title_override if (tpl and tpl.course_title_override) else course.title)
+    issuer = tpl.issuer_name if tpl else ""
+
+    return {
+        "student_name": PREVIEW_STUDENT_NAME,
+        "course_name": course_title,
+        "instructor_name": issuer or (
+            course.instructor.full_name if getattr(course, "instructor", None) else ""
+        ),
+        "completion_date": timezone.now().strftime("%d/%m/%Y"),
+        "primary_color": primary,
+        "secondary_color": secondary,
+        "style": style,
+        "locale": tpl.locale if tpl else "th",
+    }
+
+
+def preview_key(data: dict) -> str:
+    payload = json.dumps({"renderer": RENDERER_VERSION, **data}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def preview_etag(key: str) -> str:
+    return f'"{key}"'
+
+
+def _render(data: dict) -> bytes:
+    from .cert_pdf_renderer import register_fonts, render_certificate_bytes
+    register_fonts()
+    # invariant -> ทุก process render ได้ bytes เดียวกันสำหรับ ETag เดียวกัน
+    return render_certificate_bytes(data, invariant=True)
+
+
+def get_preview_pdf(data: dict, key: str = None) -> bytes:
+    """คืน PDF ของ preview จาก cache หรือ render ใหม่ (single-flight ต่อ key ภายใน process)"""
+    key = key or preview_key(data)
+    cache = caches[PREVIEW_CACHE_ALIAS]
+    cache_key = f"cert-preview:{key}"
+
+    content = cache.get(cache_key)
+    if content is not None:
+        return content
+
+    with _locks[int(key[:8], 16) % _LOCK_STRIPES]:
+        # อาจมีคนอื่น render เสร็จระหว่างรอ lock
+        content = cache.get(cache_key)
+        if content is None:
+            content = _render(data)
+            cache.set(cache_key, content)
+    return content
@@ -3,6 +3,12 @@ from reportlab.lib.pagesizes import landscape, A4
 from reportlab.lib.colors import HexColor
 
 
+# ตำแหน่งที่ใช้ร่วมกันระหว่างชั้นพื้นหลัง (static) กับชั้นข้อความ
+TITLE_Y_OFFSET = 140
+FOOTER_Y = 120
+SIGN_LINE_WIDTH = 200
+
+
 def draw_classic(c, data: dict):
     """
     เทมเพต Classic: กรอบ 2 ชั้น กลางกระดาษ
@@ -14,6 +20,12 @@ def draw_classic(c, data: dict):
       - primary_color
       - secondary_color
     """
+    draw_classic_static(c, data)
+    draw_classic_text(c, data)
+
+
+def draw_classic_static(c, data: dict):
+    """ส่วนที่เหมือนกันทุกใบ (กรอบ / หัวข้อ / เส้นเซ็น / ป้ายกำกับ) — ใช้แค่สีจาก data"""
     # ใช้ขนาดจาก A4 แนวนอน
     width, height = landscape(A4)
 
@@ -47,7 +59,7 @@ def draw_classic(c, data: dict):
     )
 
     # ===== Title / หัวใบประกาศ =====
-    title_y = height - 140
+    title_y = height - TITLE_Y_OFFSET
 
     # หัวข้อ "ใบประกาศนียบัตร"
     c.setFillColor(secondary)
@@ -70,12 +82,6 @@ def draw_classic(c, data: dict):
     c.setFont("Sarabun", 20)
     c.drawCentredString(width / 2, title_y - 70, "มอบให้ไว้เพื่อแสดงว่า")
 
-    # ชื่อผู้เรียน
-    student_name = data.get("student_name", "")
-    c.setFillColor(primary)
-    c.setFont("Sarabun-Bold", 36)
-    c.drawCentredString(width / 2, title_y - 120, student_name)
-
     # ข้อความใต้ชื่อผู้เรียน
     c.setFillColor(secondary)
     c.setFont("Sarabun", 20)
@@ -85,6 +91,34 @@ def draw_classic(c, data: dict):
         "ได้สำเร็จการศึกษาตามหลักสูตรเป็นที่เรียบร้อย",
     )
 
+    # ===== Footer: เส้นเซ็น & ป้ายกำกับ =====
+    for x, label in ((width * 0.28, "ผู้สอน"), (width * 0.72, "วันที่สำเร็จการศึกษา")):
+        c.setStrokeColor(primary)
+        c.setLineWidth(2)
+        c.line(
+            x - SIGN_LINE_WIDTH / 2,
+            FOOTER_Y + 12,
+            x + SIGN_LINE_WIDTH / 2,
+            FOOTER_Y + 12,
+        )
+
+        c.setFillColor(secondary)
+        c.setFont("Sarabun", 14)
+        c.drawCentredString(x, FOOTER_Y - 5, label)
+
+
+def draw_classic_text(c, data: dict):
+    """ส่วนที่เปลี่ยนทุกใบ: ชื่อผู้เรียน / ชื่อคอร์ส / ผู้สอน / วันที่"""
+    width, height = landscape(A4)
+    primary = HexColor(data.get("primary_color", "#881337"))
+    title_y = height - TITLE_Y_OFFSET
+
+    # ชื่อผู้เรียน
+    student_name = data.get("student_name", "")
+    c.setFillColor(primary)
+    c.setFont("Sarabun-Bold", 36)
+    c.drawCentredString(width / 2, title_y - 120, student_name)
+
     # ชื่อคอร์ส (ทดสอบบบ)
     course_name = data.get("course_name", "")
     c.setFillColor(primary)
@@ -92,44 +126,15 @@ def draw_classic(c, data: dict):
     c.drawCentredString(width / 2, title_y - 210, course_name)
 
     # ===== Footer: ผู้สอน & วันที่ =====
-    footer_y = 120
-    line_width = 200
-
     instructor_name = data.get("instructor_name", "")
     completion_date = data.get("completion_date", "")
 
     # ผู้สอน
     c.setFillColor(primary)
     c.setFont("Sarabun-Bold", 18)
-    c.drawCentredString(width * 0.28, footer_y + 20, instructor_name)
-
-    c.setStrokeColor(primary)
-    c.setLineWidth(2)
-    c.line(
-        width * 0.28 - line_width / 2,
-        footer_y + 12,
-        width * 0.28 + line_width / 2,
-        footer_y + 12,
-    )
-
-    c.setFillColor(secondary)
-    c.setFont("Sarabun", 14)
-    c.drawCentredString(width * 0.28, footer_y - 5, "ผู้สอน")
+    c.drawCentredString(width * 0.28, FOOTER_Y + 20, instructor_name)
 
     # วันที่สำเร็จการศึกษา
     c.setFillColor(primary)
     c.setFont("Sarabun-Bold", 18)
-    c.drawCentredString(width * 0.72, footer_y + 20, completion_date)
-
-    c.setStrokeColor(primary)
-    c.setLineWidth(2)
-    c.line(
-        width * 0.72 - line_width / 2,
-        footer_y + 12,
-        width * 0.72 + line_width / 2,
-        footer_y + 12,
-    )
-
-    c.setFillColor(secondary)
-    c.setFont("Sarabun", 14)
-    c.drawCentredString(width * 0.72, footer_y - 5, "วันที่สำเร็จการศึกษา")
+    c.drawCentredString(width * 0.72, FOOTER_Y + 20, completion_date)
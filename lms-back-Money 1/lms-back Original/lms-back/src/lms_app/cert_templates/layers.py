@@ -0,0 +1,110 @@
+# lms_app/cert_templates/layers.py
+"""
+แยกใบประกาศเป็น 2 ชั้น
+  - ชั้นพื้นหลัง (static): กรอบ / แถบสี / หัวข้อ / ป้ายกำกับ — ขึ้นกับแค่ style + สี + locale
+  - ชั้นข้อความ: ชื่อผู้เรียน / คอร์ส / ผู้สอน / วันที่ — วาดใหม่ทุกหน้า
+
+ชั้นพื้นหลังถูกบันทึกเป็นลำดับคำสั่ง canvas (display list) ครั้งเดียวต่อ key แล้วเก็บใน LRU ขนาดจำกัด
+ตอนวาดจริงจะเขียน display list ลง PDF เป็น form XObject ครั้งเดียวต่อเอกสาร แล้วทุกหน้าเรียก doForm()
+(form XObject ของ reportlab ผูกกับเอกสาร จึงแคช "คำสั่งวาด" ข้ามเอกสาร ไม่ใช่ตัว form)
+"""
+import hashlib
+from functools import lru_cache
+
+from .classic import draw_classic_static, draw_classic_text
+from .minimalist import draw_minimalist_static, draw_minimalist_text
+from .modern import draw_modern_static, draw_modern_text
+
+# จำนวนชุด (style, สี, locale) ที่เก็บ display list ไว้ใน process
+STATIC_LAYER_CACHE_SIZE = 64
+
+DEFAULT_LOCALE = "th"
+
+LAYERS = {
+    "classic": (draw_classic_static, draw_classic_text),
+    "minimalist": (draw_minimalist_static, draw_minimalist_text),
+    "modern": (draw_modern_static, draw_modern_text),
+}
+
+
+class _Recorder:
+    """canvas ปลอม: จดทุกการเรียก method ไว้เป็น (name, args, kwargs) เพื่อเล่นซ้ำทีหลัง"""
+
+    def __init__(self):
+        self.ops = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+        return record
+
+
+def resolve_style(style) -> str:
+    return style if style in LAYERS else "classic"
+
+
+def static_key(data: dict) -> tuple:
+    style = resolve_style(data.get("style", "classic"))
+    return (
+        style,
+        data.get("primary_color"),
+        data.get("secondary_color"),
+        data.get("locale") or DEFAULT_LOCALE,
+    )
+
+
+@lru_cache(maxsize=STATIC_LAYER_CACHE_SIZE)
+def _static_ops(style, primary_color, secondary_color, locale) -> tuple:
+    # ชั้นพื้นหลังเห็นแค่ field ที่อยู่ใน key (กันไม่ให้เผลอใช้ชื่อผู้เรียนแล้ว cache ผิดใบ)
+    draw_static, _ = LAYERS[style]
+    data = {"locale": locale}
+    if primary_color is not None:
+        data["primary_color"] = primary_color
+    if secondary_color is not None:
+        data["secondary_color"] = secondary_color
+
+    rec = _Recorder()
+    draw_static(rec, data)
+    return tuple(rec.ops)
+
+
+def static_cache_info():
+    return _static_ops.cache_info()
+
+
+def form_name(key: tuple) -> str:
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    return f"CertBg{digest}"
+
+
+def draw_static_layer(c, data: dict) -> str:
+    """วาดชั้นพื้นหลังลงหน้าปัจจุบัน (นิยาม form ครั้งแรกที่เจอในเอกสารนี้) แล้วคืนชื่อ form"""
+    key = static_key(data)
+    name = form_name(key)
+
+    if not c.hasForm(name):
+        c.beginForm(name)
+        for method, args, kwargs in _static_ops(*key):
+            getattr(c, method)(*args, **kwargs)
+        c.endForm()
+
+    c.doForm(name)
+    return name
+
+
+def draw_page(c, data: dict) -> None:
+    """วาดใบประกาศ 1 หน้า (พื้นหลังจาก form + ข้อความของใบนี้) — ผู้เรียกเป็นคน showPage()"""
+    _, draw_text = LAYERS[resolve_style(data.get("style", "classic"))]
+    draw_static_layer(c, data)
+    draw_text(c, data)
+
+
+def draw_flat(c, data: dict) -> None:
+    """
+    วาดทั้งสองชั้นตรง ๆ (เล่น display list ของพื้นหลังซ้ำ ไม่ใช้ form)
+    สำหรับ canvas ที่ไม่ใช่ PDF เช่น PillowCanvas ใน cert_images.py
+    """
+    _, draw_text = LAYERS[resolve_style(data.get("style", "classic"))]
+    for method, args, kwargs in _static_ops(*static_key(data)):
+        getattr(c, method)(*args, **kwargs)
+    draw_text(c, data)
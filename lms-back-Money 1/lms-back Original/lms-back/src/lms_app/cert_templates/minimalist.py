@@ -2,6 +2,22 @@
 from reportlab.lib.colors import HexColor
 from reportlab.lib.pagesizes import landscape, A4
 
+# ===== layout ที่ใช้ร่วมกันระหว่างชั้นพื้นหลัง (static) กับชั้นข้อความ =====
+BAND_WIDTH = 65
+BOTTOM_BAR_HEIGHT = 18
+LEFT_MARGIN = 40  # margin จากขอบซ้ายหลังแถบ
+FOOTER_Y = 90
+SIGN_LINE_WIDTH = 160
+
+
+def _layout():
+    width, height = landscape(A4)
+    left = BAND_WIDTH + LEFT_MARGIN
+    top = height - 80
+    right_block_x = width - 260
+    return width, height, left, top, right_block_x
+
+
 def draw_minimalist(c, data):
     """
     เทมเพต Minimalist: แถบสีด้านซ้าย + heading ด้านบน + ชื่อผู้เรียนใน [ ]
@@ -13,7 +29,13 @@ def draw_minimalist(c, data):
       - primary_color
       - secondary_color
     """
-    width, height = landscape(A4)
+    draw_minimalist_static(c, data)
+    draw_minimalist_text(c, data)
+
+
+def draw_minimalist_static(c, data):
+    """ส่วนที่เหมือนกันทุกใบ (พื้นหลัง / แถบสี / หัวข้อ / เส้นเซ็น / ป้ายกำกับ) — ใช้แค่สีจาก data"""
+    width, height, LEFT, TOP, right_block_x = _layout()
 
     primary = HexColor(data.get("primary_color", "#00bcd4"))
     secondary = HexColor(data.get("secondary_color", "#475569"))
@@ -23,25 +45,13 @@ def draw_minimalist(c, data):
     c.rect(0, 0, width, height, fill=1, stroke=0)
 
     # ===== แถบซ้าย =====
-    BAND_WIDTH = 65
     c.setFillColor(primary)
     c.rect(0, 0, BAND_WIDTH, height, fill=1, stroke=0)
 
     # ===== แถบล่าง (ที่ขาดอยู่) =====
-    BOTTOM_BAR_HEIGHT = 18
     c.setFillColor(primary)
     c.rect(0, 0, width, BOTTOM_BAR_HEIGHT, fill=1, stroke=0)
 
-    # ===== พื้นที่เนื้อหา =====
-    LEFT = BAND_WIDTH + 40  # margin จากขอบซ้ายหลังแถบ
-    TOP  = height - 80
-
-    # ---- บรรทัดบนสุด: ชื่อคอร์ส ----
-    course_title = data.get("course_name", "")
-    c.setFillColor(primary)
-    c.setFont("Sarabun-Bold", 26)
-    c.drawString(LEFT, TOP, course_title)
-
     # ---- ใบประกาศนียบัตร ----
     c.setFillColor(secondary)
     c.setFont("Sarabun-Bold", 22)
@@ -51,42 +61,20 @@ def draw_minimalist(c, data):
     c.setFont("Sarabun", 18)
     c.drawString(LEFT, TOP - 90, "มอบให้ไว้เพื่อแสดงว่า")
 
-    # ---- ชื่อผู้เรียนในวงเล็บ [ ] ----
-    student = data.get("student_name", "")
-    c.setFillColor(primary)
-    c.setFont("Sarabun-Bold", 32)
-    c.drawString(LEFT, TOP - 130, f"[{student}]")
-
     # ---- ข้อความใต้ชื่อ ----
     c.setFillColor(secondary)
     c.setFont("Sarabun", 18)
     c.drawString(LEFT, TOP - 170, "ได้สำเร็จการศึกษาตามหลักสูตรเป็นที่เรียบร้อย")
 
-    # ---- แถวคอร์สซ้ำด้านล่าง (เช่น 'ทดสอบบบ') ----
-    c.setFillColor(primary)
-    c.setFont("Sarabun-Bold", 20)
-    c.drawString(LEFT, TOP - 210, course_title)
-
-    # ===== footer: ผู้สอน & วันที่ =====
-    FOOTER_Y = 90
-
-    # ผู้สอน (ซ้ายล่าง)
-    c.setFillColor(primary)
-    c.setFont("Sarabun-Bold", 18)
-    c.drawString(LEFT, FOOTER_Y + 25, data.get("instructor_name", ""))
-
+    # ===== footer: เส้นเซ็น & ป้ายกำกับ =====
     c.setStrokeColor(primary)
     c.setLineWidth(2)
-    SIGN_LINE_WIDTH = 160
     c.line(LEFT, FOOTER_Y + 15, LEFT + SIGN_LINE_WIDTH, FOOTER_Y + 15)
 
     c.setFillColor(secondary)
     c.setFont("Sarabun", 14)
     c.drawString(LEFT, FOOTER_Y - 5, "อาจารย์ผู้สอน")
 
-    # วันที่สำเร็จ (ขวาล่าง)
-    right_block_x = width - 260
-
     c.setFillColor(primary)
     c.setFont("Sarabun-Bold", 18)
     c.drawString(right_block_x, FOOTER_Y + 25, "[วันที่สำเร็จการศึกษา]")
@@ -99,6 +87,38 @@ def draw_minimalist(c, data):
     c.setFont("Sarabun", 14)
     c.drawString(right_block_x, FOOTER_Y - 5, "วันที่สำเร็จการศึกษา")
 
+
+def draw_minimalist_text(c, data):
+    """ส่วนที่เปลี่ยนทุกใบ: ชื่อคอร์ส / ชื่อผู้เรียน / ผู้สอน / วันที่"""
+    width, height, LEFT, TOP, right_block_x = _layout()
+
+    primary = HexColor(data.get("primary_color", "#00bcd4"))
+    secondary = HexColor(data.get("secondary_color", "#475569"))
+
+    # ---- บรรทัดบนสุด: ชื่อคอร์ส ----
+    course_title = data.get("course_name", "")
+    c.setFillColor(primary)
+    c.setFont("Sarabun-Bold", 26)
+    c.drawString(LEFT, TOP, course_title)
+
+    # ---- ชื่อผู้เรียนในวงเล็บ [ ] ----
+    student = data.get("student_name", "")
+    c.setFillColor(primary)
+    c.setFont("Sarabun-Bold", 32)
+    c.drawString(LEFT, TOP - 130, f"[{student}]")
+
+    # ---- แถวคอร์สซ้ำด้านล่าง (เช่น 'ทดสอบบบ') ----
+    c.setFillColor(primary)
+    c.setFont("Sarabun-Bold", 20)
+    c.drawString(LEFT, TOP - 210, course_title)
+
+    # ===== footer: ผู้สอน & วันที่ =====
+    # ผู้สอน (ซ้ายล่าง)
+    c.setFillColor(primary)
+    c.setFont("Sarabun-Bold", 18)
+    c.drawString(LEFT, FOOTER_Y + 25, data.get("instructor_name", ""))
+
     # ข้อความวันที่จริง (เล็ก ๆ ใต้บรรทัด)
+    c.setFillColor(secondary)
     c.setFont("Sarabun", 12)
     c.drawString(right_block_x, FOOTER_Y - 22, data.get("completion_date", ""))
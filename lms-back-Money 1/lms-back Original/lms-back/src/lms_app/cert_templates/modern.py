@@ -1,7 +1,14 @@
 # lms_app/cert_templates/modern.py
 from reportlab.lib.colors import HexColor
 
+
 def draw_modern(c, data):
+    draw_modern_static(c, data)
+    draw_modern_text(c, data)
+
+
+def draw_modern_static(c, data):
+    """ส่วนที่เหมือนกันทุกใบ (พื้นหลัง / แถบซ้าย / หัวข้อ / ป้ายกำกับ) — ใช้แค่สีจาก data"""
     primary = HexColor(data["primary_color"])
     secondary = HexColor(data["secondary_color"])
 
@@ -27,16 +34,27 @@ def draw_modern(c, data):
     c.setFillColor(secondary)
     c.drawString(300, 465, "มอบให้ไว้เพื่อแสดงว่า")
 
-    # ชื่อผู้เรียน
-    c.setFont("Sarabun-Bold", 30)
-    c.setFillColor(primary)
-    c.drawString(300, 425, data["student_name"])
-
     # รายละเอียด
     c.setFillColor(secondary)
     c.setFont("Sarabun", 18)
     c.drawString(300, 385, "ได้สำเร็จการศึกษาตามหลักสูตร")
 
+    # ป้ายกำกับ footer
+    c.setFont("Sarabun", 14)
+    c.drawString(300, 170, "ผู้สอน")
+    c.drawString(600, 170, "วันที่สำเร็จการศึกษา")
+
+
+def draw_modern_text(c, data):
+    """ส่วนที่เปลี่ยนทุกใบ: ชื่อผู้เรียน / ชื่อคอร์ส / ผู้สอน / วันที่"""
+    primary = HexColor(data["primary_color"])
+    secondary = HexColor(data["secondary_color"])
+
+    # ชื่อผู้เรียน
+    c.setFont("Sarabun-Bold", 30)
+    c.setFillColor(primary)
+    c.drawString(300, 425, data["student_name"])
+
     # ชื่อคอร์ส
     c.setFont("Sarabun-Bold", 22)
     c.setFillColor(primary)
@@ -46,11 +64,7 @@ def draw_modern(c, data):
     c.setFillColor(secondary)
     c.setFont("Sarabun-Bold", 16)
     c.drawString(300, 190, data["instructor_name"])
-    c.setFont("Sarabun", 14)
-    c.drawString(300, 170, "ผู้สอน")
 
     # Completion
     c.setFont("Sarabun-Bold", 16)
     c.drawString(600, 190, data["completion_date"])
-    c.setFont("Sarabun", 14)
-    c.drawString(600, 170, "วันที่สำเร็จการศึกษา")
@@ -0,0 +1,131 @@
+# lms_app/cert_verify.py
+"""
+รหัสตรวจสอบใบประกาศแบบลงลายเซ็น (ตรวจได้โดยไม่ต้องค้น DB)
+
+    token = base64url(payload) + "." + base64url(HMAC-SHA256(payload)[:12])
+    payload = cert_id (16 bytes) | วันที่ออก (ordinal, 3 bytes) | serial_no (utf-8)
+
+- ใช้ salted_hmac ของ Django (key มาจาก CERT_VERIFY_SECRET หรือ SECRET_KEY)
+- ความถูกต้องตรวจจากลายเซ็นอย่างเดียว; DB ถูกใช้แค่สร้างชุด id ที่ถูกเพิกถอน
+  ซึ่ง cache ไว้ CERT_VERIFY_REVOKED_CACHE_SECONDS ใน cache "cert_verify" และล้างเมื่อ revoked_at ถูกบันทึก
+  cache เป็น Redis (แชร์ทุก worker) -> การเพิกถอนมีผลทันที
+  ไม่มี Redis (locmem ต่อ process) -> ล้างได้แค่ process ที่บันทึก ที่เหลือเห็นช้าสุดเท่าอายุ cache
+- รหัสเก่าแบบสุ่ม 12 ตัว (ก่อนมีลายเซ็น) ยังตรวจได้ผ่าน lookup_legacy()
+"""
+import base64
+import binascii
+import uuid
+from dataclasses import dataclass
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signing import BadSignature
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+SALT = "lms_app.cert_verify"
+SIG_BYTES = 12
+REVOKED_CACHE_KEY = "cert-verify:revoked"
+
+
+@dataclass(frozen=True)
+class VerifiedCertificate:
+    id: uuid.UUID
+    serial_no: str
+    issued: date
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(payload: bytes) -> bytes:
+    secret = getattr(settings, "CERT_VERIFY_SECRET", None) or settings.SECRET_KEY
+    return salted_hmac(SALT, payload, secret=secret, algorithm="sha256").digest()[:SIG_BYTES]
+
+
+def make_verification_code(cert_id, serial_no: str, issued: date) -> str:
+    cert_id = cert_id if isinstance(cert_id, uuid.UUID) else uuid.UUID(str(cert_id))
+    payload = cert_id.bytes + issued.toordinal().to_bytes(3, "big") + serial_no.encode("utf-8")
+    return f"{_b64encode(payload)}.{_b64encode(_signature(payload))}"
+
+
+def code_for(cert) -> str:
+    return make_verification_code(cert.id, cert.serial_no, cert.completion_date)
+
+
+def parse_verification_code(token: str) -> VerifiedCertificate:
+    """ตรวจลายเซ็นแล้วคืนข้อมูลใน token; ปลอม/เสีย -> BadSignature"""
+    try:
+        body, sig = token.split(".", 1)
+        payload, signature = _b64decode(body), _b64decode(sig)
+    except (ValueError, binascii.Error):
+        raise BadSignature("Malformed verification code")
+
+    if len(payload) <= 19 or not constant_time_compare(signature, _signature(payload)):
+        raise BadSignature("Verification code signature mismatch")
+
+    try:
+        return VerifiedCertificate(
+            id=uuid.UUID(bytes=payload[:16]),
+            issued=date.fromordinal(int.from_bytes(payload[16:19], "big")),
+            serial_no=payload[19:].decode("utf-8"),
+        )
+    except (ValueError, UnicodeDecodeError):
+        raise BadSignature("Malformed verification code")
+
+
+# ---------- revocation ----------
+def _cache():
+    return caches["cert_verify" if "cert_verify" in settings.CACHES else "default"]
+
+
+def revoked_ids() -> frozenset:
+    """id (str) ของใบที่ถูกเพิกถอน — อ่าน DB เมื่อ cache หมดอายุเท่านั้น"""
+    from .models import Certificate
+
+    def load():
+        return frozenset(
+            str(pk) for pk in Certificate.objects.filter(revoked_at__isnull=False).values_list("id", flat=True)
+        )
+
+    return _cache().get_or_set(
+        REVOKED_CACHE_KEY,
+        load,
+        timeout=getattr(settings, "CERT_VERIFY_REVOKED_CACHE_SECONDS", 60),
+    )
+
+
+def is_revoked(cert_id) -> bool:
+    return str(cert_id) in revoked_ids()
+
+
+def invalidate_revoked_cache(sender=None, update_fields=None, **kwargs):
+    """
+    receiver ของ post_save/post_delete(Certificate) — ต่อใน LmsAppConfig.ready()
+    save ที่ระบุ update_fields โดยไม่มี revoked_at (เช่น worker อัปเดตสถานะ render) ไม่ต้องล้าง
+    """
+    if update_fields is not None and "revoked_at" not in update_fields:
+        return
+    _cache().delete(REVOKED_CACHE_KEY)
+
+
+def lookup_legacy(code: str):
+    """รหัสแบบสุ่มเดิม (ไม่มีลายเซ็น) ต้องค้น DB"""
+    from .models import Certificate
+
+    row = (
+        Certificate.objects.filter(verification_code=code)
+        .values("id", "serial_no", "completion_date", "revoked_at")
+        .first()
+    )
+    if not row:
+        return None, False
+    return (
+        VerifiedCertificate(id=row["id"], serial_no=row["serial_no"], issued=row["completion_date"]),
+        row["revoked_at"] is not None,
+    )
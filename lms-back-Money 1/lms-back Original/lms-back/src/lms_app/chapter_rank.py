@@ -0,0 +1,198 @@
+# lms_app/chapter_rank.py
+"""
+ลำดับบทเรียนด้วย rank key แบบ lexicographic (CourseChapter.rank)
+
+- key คือเศษส่วนฐาน 36 หลังจุดทศนิยม เขียนเป็นสตริง "0-9a-z" ไม่มี 0 ปิดท้าย
+  เรียงแบบสตริงธรรมดา = เรียงตามค่า -> ย้ายบท X ไปไว้ระหว่าง A กับ B = ตั้ง rank ของ X เป็น
+  key_between(A.rank, B.rank) แก้แถวเดียว (ไม่ต้องเขียน position ของทั้งคอร์สใหม่)
+- ใช้เฉพาะตัวเลขและอักษรตัวเล็ก: collation ทั่วไปของ Postgres/SQLite เรียงชุดนี้ตรงกับ byte order
+- ย้ายที่จุดเดิมซ้ำ ๆ key จะยาวขึ้นเรื่อย ๆ (~1 ตัวต่อการแทรก 5 ครั้ง)
+  -> python manage.py rebalance_chapter_ranks เกลี่ย key ของคอร์สที่ key ยาวเกิน CHAPTER_RANK_REBALANCE_LENGTH
+  (ถ้ายาวจนเกิน MAX_LENGTH ระหว่าง request จะเกลี่ยทั้งคอร์สทันที)
+- position (int) เป็นค่าเดิมที่ไม่อัปเดตตอนย้าย -> API คืนลำดับที่จริงจาก with_rank_position / position_of
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import Length, RowNumber
+from django.utils import timezone
+
+from .models import CourseChapter
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(ALPHABET)
+MAX_LENGTH = 64  # = CourseChapter.rank.max_length
+REBALANCE_LENGTH = getattr(settings, "CHAPTER_RANK_REBALANCE_LENGTH", 24)
+
+
+class RankError(ValueError):
+    pass
+
+
+def _digit(ch: str) -> int:
+    return ALPHABET.index(ch)
+
+
+def _midpoint(a: str, b) -> str:
+    """key ระหว่าง a (""=0) กับ b (None=1) โดย a < b และทั้งคู่ไม่มี 0 ปิดท้าย"""
+    if b is not None:
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    lo = _digit(a[0]) if a else 0
+    hi = _digit(b[0]) if b else BASE
+    if hi - lo > 1:
+        return ALPHABET[(lo + hi) // 2]
+    # หลักติดกัน: ตัดหลักแรกของ b ก็น้อยกว่า b แล้ว (ถ้า b ยาวกว่านั้น)
+    if b and len(b) > 1:
+        return b[:1]
+    return ALPHABET[lo] + _midpoint(a[1:], None)
+
+
+def key_between(before=None, after=None) -> str:
+    """key ที่อยู่ระหว่าง before กับ after (None = ไม่มีขอบด้านนั้น)"""
+    before = before or ""
+    if after is not None and after <= before:
+        raise RankError(f"rank {before!r} must sort before {after!r}")
+    return _midpoint(before, after)
+
+
+def spread(n: int) -> list:
+    """n key เรียงกันที่เว้นระยะเท่า ๆ กัน (ใช้ตอน backfill / rebalance / reorder ทั้งคอร์ส)"""
+    width = 2
+    while BASE ** width < (n + 1) * BASE:
+        width += 1
+    step = BASE ** width // (n + 1)
+    keys = []
+    for i in range(1, n + 1):
+        value, digits = step * i, []
+        for _ in range(width):
+            value, d = divmod(value, BASE)
+            digits.append(ALPHABET[d])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
+
+
+# ---------- DB helpers ----------
+ORDERING = ("rank", "created_at")
+
+
+def with_rank_position(queryset):
+    """annotate rank_position = ลำดับที่ (เริ่ม 1) ในคอร์สตาม rank — แทน position เดิมที่ไม่ได้อัปเดตตอนย้าย"""
+    return queryset.annotate(
+        rank_position=Window(
+            RowNumber(),
+            partition_by=[F("course_id")],
+            order_by=[F(f).asc() for f in ORDERING],
+        )
+    )
+
+
+def position_of(chapter) -> int:
+    """ลำดับที่ของบทเดี่ยว (COUNT บทที่อยู่ก่อนหน้า ใช้ index (course, rank))"""
+    before = CourseChapter.objects.filter(course_id=chapter.course_id).filter(
+        Q(rank__lt=chapter.rank) | Q(rank=chapter.rank, created_at__lt=chapter.created_at)
+    )
+    return before.count() + 1
+
+
+def last_rank(course_id):
+    """(rank, position) ของบทสุดท้าย — ใช้ index (course, rank) ไม่ต้อง aggregate"""
+    return (
+        CourseChapter.objects.filter(course_id=course_id)
+        .order_by("-rank")
+        .values_list("rank", "position")
+        .first()
+    )
+
+
+def rank_at_index(course_id, index: int, exclude=None) -> str:
+    """key สำหรับแทรกให้เป็นบทลำดับที่ index (เริ่ม 0) ไม่นับบท exclude"""
+    qs = CourseChapter.objects.filter(course_id=course_id).order_by(*ORDERING)
+    if exclude is not None:
+        qs = qs.exclude(pk=exclude)
+    index = max(index, 0)
+    if index == 0:
+        first = qs.values_list("rank", flat=True).first()
+        return key_between(None, first)
+    ranks = list(qs.values_list("rank", flat=True)[index - 1:index + 1])
+    return key_between(ranks[0] if ranks else None, ranks[1] if len(ranks) > 1 else None)
+
+
+def _neighbour_ranks(chapter, after_id, before_id):
+    """(rank ของบทก่อนหน้า, rank ของบทถัดไป) รอบจุดที่จะวาง; ระบุฝั่งเดียวได้ อีกฝั่งหาบทที่ติดกัน"""
+    siblings = CourseChapter.objects.filter(course_id=chapter.course_id).exclude(pk=chapter.pk)
+    ranks = siblings.values_list("rank", flat=True)
+
+    lo = hi = None
+    if after_id is not None:
+        lo = ranks.filter(pk=after_id).first()
+        if lo is None:
+            raise CourseChapter.DoesNotExist(f"chapter {after_id} not found in this course")
+    if before_id is not None:
+        hi = ranks.filter(pk=before_id).first()
+        if hi is None:
+            raise CourseChapter.DoesNotExist(f"chapter {before_id} not found in this course")
+
+    if before_id is None:
+        hi = ranks.filter(rank__gt=lo or "").order_by("rank").first()
+    if after_id is None:
+        lo = ranks.filter(rank__lt=hi).order_by("-rank").first()
+    return lo, hi
+
+
+def move_chapter(chapter, after_id=None, before_id=None) -> CourseChapter:
+    """
+    วางบทไว้หลัง after_id และ/หรือก่อน before_id (None = ไม่ระบุฝั่งนั้น) แก้เฉพาะแถวนี้
+    rank ซ้ำกัน (ย้ายพร้อมกันได้ key เดียวกัน) หรือ key ยาวเกิน MAX_LENGTH -> เกลี่ยทั้งคอร์สแล้วลองใหม่
+    ลำดับ after/before กลับกัน -> RankError
+    """
+    with transaction.atomic():
+        chapter = CourseChapter.objects.select_for_update().get(pk=chapter.pk)
+        for attempt in range(2):
+            lo, hi = _neighbour_ranks(chapter, after_id, before_id)
+            if lo is not None and lo == hi and not attempt:
+                rebalance_course(chapter.course_id)
+                continue
+            key = key_between(lo, hi)
+            if len(key) > MAX_LENGTH and not attempt:
+                rebalance_course(chapter.course_id)
+                continue
+            break
+        if len(key) > MAX_LENGTH:
+            raise RankError("rank key too long after rebalance")
+
+        chapter.rank = key
+        chapter.save(update_fields=["rank", "updated_at"])
+    return chapter
+
+
+def rebalance_course(course_id) -> int:
+    """เกลี่ย rank ของทั้งคอร์สใหม่ตามลำดับปัจจุบัน (ล็อกแถวกันการย้ายพร้อมกัน); คืนจำนวนบท"""
+    with transaction.atomic():
+        chapters = list(
+            CourseChapter.objects.filter(course_id=course_id)
+            .select_for_update()
+            .order_by(*ORDERING)
+            .only("id", "rank")
+        )
+        now = timezone.now()
+        for chapter, key in zip(chapters, spread(len(chapters))):
+            chapter.rank = key
+            chapter.updated_at = now
+        CourseChapter.objects.bulk_update(chapters, ["rank", "updated_at"], batch_size=500)
+    return len(chapters)
+
+
+def courses_to_rebalance(min_length: int = REBALANCE_LENGTH):
+    """course id ที่มี rank ยาวตั้งแต่ min_length ขึ้นไป"""
+    return (
+        CourseChapter.objects.annotate(rank_length=Length("rank"))
+        .filter(rank_length__gte=min_length)
+        .order_by()
+        .values_list("course_id", flat=True)
+        .distinct()
+    )
@@ -0,0 +1,246 @@
+# lms_app/course_deletion.py
+"""
+ลบคอร์สแบบเบื้องหลัง (ไม่ลบทั้งต้นใน HTTP request / transaction เดียว)
+
+ขั้นตอน:
+  0) protected_objects()        -> DELETE ปกติ (ไม่ force) เช็คแถวที่อ้างคอร์สแบบ PROTECT/RESTRICT ก่อน
+                                   มี -> view ตอบ 409 แบบเดิม ไม่ tombstone
+  1) schedule_course_deletion() -> ตั้ง Course.deleted_at (tombstone) + สร้าง CourseDeletionJob
+                                   request จบทันที; Course.objects มองไม่เห็นคอร์สนี้แล้ว
+  2) claim_job()                -> worker จอง job ด้วย SELECT ... FOR UPDATE SKIP LOCKED
+  3) process_job()              -> ไล่ STEPS จากใบไปราก: ลบทีละไม่เกิน batch_size แถว ต่อ 1 transaction
+                                   (lock สั้น ไม่ขึ้นกับขนาดคอร์ส) ลบไฟล์ของชุดนั้นหลัง commit
+                                   แล้วอัปเดตความคืบหน้าใน job (เห็นในแอดมิน)
+  4) สุดท้ายลบแถวคอร์ส (ที่เหลือเป็นแถวเล็ก ๆ แบบ 1:1 เช่น stats/quiz/scoring) + ไฟล์ banner
+
+ทุกขั้นดูจาก "สิ่งที่ยังเหลือใน DB" -> job ที่ล้ม/worker ตาย รันต่อจากเดิมได้ (จองใหม่เมื่อค้างเกิน
+COURSE_DELETION_STALE_SECONDS หรือ failed และยังไม่ครบ COURSE_DELETION_MAX_ATTEMPTS)
+ไฟล์ที่ลบไม่สำเร็จนับใน files_failed (แถวใน DB ลบไปแล้ว ไม่ย้อนกลับ)
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import (
+    Assignment,
+    AssignmentAttachment,
+    AssignmentSubmission,
+    Certificate,
+    CertificateExport,
+    Course,
+    CourseChapter,
+    CourseDeletionJob,
+    CourseFavorite,
+    CourseMaterial,
+    CourseProgression,
+    Enrollment,
+    Order,
+    Question,
+    QuizChoice,
+    QuizQuestion,
+    Review,
+    Submission,
+    Test,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, "COURSE_DELETION_BATCH_SIZE", 500)
+MAX_ATTEMPTS = getattr(settings, "COURSE_DELETION_MAX_ATTEMPTS", 3)
+STALE_AFTER = timedelta(seconds=getattr(settings, "COURSE_DELETION_STALE_SECONDS", 600))
+
+# ตั้งบน QuerySet ที่ใช้ลบ -> receiver ที่ผูกกับคอร์ส (เช่น course_stats) รู้ว่าคอร์สกำลังจะหายทั้งคอร์ส
+TEARDOWN_FLAG = "_course_teardown"
+
+# (ชื่อขั้น, model, path ไปหา course_id, FileField ที่ต้องลบไฟล์ตาม) — เรียงจากใบไปราก
+# ลูกของแต่ละขั้นถูกลบไปก่อนแล้ว -> cascade ตอนลบแต่ละชุดแทบไม่มี
+STEPS = (
+    ("quiz_choices", QuizChoice, "question__quiz__course_id", ()),
+    ("quiz_questions", QuizQuestion, "quiz__course_id", ()),
+    ("test_submissions", Submission, "test__course_id", ()),
+    ("test_questions", Question, "test__course_id", ()),
+    ("tests", Test, "course_id", ()),
+    ("submission_attachments", AssignmentAttachment, "submission__assignment__course_id", ("file",)),
+    ("assignment_attachments", AssignmentAttachment, "assignment__course_id", ("file",)),
+    ("assignment_submissions", AssignmentSubmission, "assignment__course_id", ()),
+    ("assignments", Assignment, "course_id", ()),
+    ("progressions", CourseProgression, "course_id", ()),
+    ("materials", CourseMaterial, "chapter__course_id", ("file",)),
+    ("chapters", CourseChapter, "course_id", ("cover_image",)),
+    ("enrollments", Enrollment, "course_id", ()),
+    ("reviews", Review, "course_id", ()),
+    ("favorites", CourseFavorite, "course_id", ()),
+    ("certificate_exports", CertificateExport, "course_id", ("file",)),
+    ("certificates", Certificate, "course_id", ("file",)),
+    ("orders", Order, "course_id", ()),
+)
+
+
+# ---------- request side ----------
+def protected_objects(course, limit: int = 20) -> list:
+    """
+    แถวที่อ้างคอร์สตรง ๆ ด้วย on_delete=PROTECT/RESTRICT (สิ่งที่ course.delete() เดิมจะชน ProtectedError)
+    เช็คด้วย query เล็ก ๆ ต่อความสัมพันธ์ ไม่ต้องเดินทั้งต้นแบบ Collector
+    """
+    blocked = []
+    for rel in Course._meta.related_objects:
+        if rel.on_delete not in (models.PROTECT, models.RESTRICT):
+            continue
+        rows = rel.related_model._base_manager.filter(**{rel.field.name: course})
+        blocked.extend(rows[: limit - len(blocked)])
+        if len(blocked) >= limit:
+            break
+    return blocked
+
+
+def schedule_course_deletion(course, actor=None) -> CourseDeletionJob:
+    """tombstone คอร์ส + เข้าคิวลบ (เรียกซ้ำกับคอร์สที่รอลบอยู่ได้ job เดิม)"""
+    with transaction.atomic():
+        if course.deleted_at is not None:
+            job = (
+                CourseDeletionJob.objects.filter(course_id=course.pk)
+                .exclude(status="done")
+                .first()
+            )
+            if job:
+                return job
+        else:
+            course.deleted_at = timezone.now()
+            course.save(update_fields=["deleted_at", "updated_at"])
+        return CourseDeletionJob.objects.create(
+            course_id=course.pk,
+            course_title=course.title,
+            created_by=actor if getattr(actor, "is_authenticated", False) else None,
+        )
+
+
+# ---------- worker side ----------
+def _claimable(now):
+    return (
+        Q(status="queued")
+        | Q(status="running", updated_at__lt=now - STALE_AFTER)
+        | Q(status="failed", attempts__lt=MAX_ATTEMPTS)
+    )
+
+
+def claim_job(job_id=None):
+    """จอง job ถัดไป (หรือ job_id ที่ระบุ) ที่ worker อื่นยังไม่ได้ทำ; ไม่มี -> None"""
+    now = timezone.now()
+    with transaction.atomic():
+        qs = (
+            CourseDeletionJob.objects.select_for_update(skip_locked=True)
+            .filter(_claimable(now))
+            .order_by("created_at")
+        )
+        if job_id:
+            qs = qs.filter(pk=job_id)
+        job = qs.first()
+        if job is None:
+            return None
+
+        job.status = "running"
+        job.started_at = job.started_at or now
+        job.attempts += 1
+        job.error = ""
+        job.save(update_fields=["status", "started_at", "attempts", "error", "updated_at"])
+    return job
+
+
+def _delete_files(model, names: dict) -> tuple:
+    """names = {field: [storage name, ...]} -> (ลบได้, ลบไม่ได้)"""
+    ok = failed = 0
+    for field, files in names.items():
+        storage = model._meta.get_field(field).storage
+        for name in files:
+            try:
+                storage.delete(name)
+                ok += 1
+            except Exception:
+                logger.exception("Course deletion: cannot delete file %s", name)
+                failed += 1
+    return ok, failed
+
+
+def _purge_certificate_images(cert_ids) -> tuple:
+    from .cert_images import purge_images
+
+    ok = failed = 0
+    for cert_id in cert_ids:
+        try:
+            ok += purge_images(cert_id)
+        except Exception:
+            logger.exception("Course deletion: cannot purge images of certificate %s", cert_id)
+            failed += 1
+    return ok, failed
+
+
+def _progress(job, step: str, rows: int = 0, files=(0, 0)) -> None:
+    # ทุกชุดแตะ updated_at = heartbeat (job ที่ไม่ขยับเกิน STALE_AFTER ถูกจองใหม่ได้)
+    CourseDeletionJob.objects.filter(pk=job.pk).update(
+        step=step,
+        deleted_rows=F("deleted_rows") + rows,
+        files_deleted=F("files_deleted") + files[0],
+        files_failed=F("files_failed") + files[1],
+        updated_at=timezone.now(),
+    )
+
+
+def delete_batch(job, step: str, model, path: str, file_fields=(), batch_size: int = BATCH_SIZE) -> int:
+    """ลบแถวของขั้นนี้ไม่เกิน batch_size แถวใน transaction เดียว แล้วลบไฟล์; คืนจำนวนแถวที่เลือก"""
+    with transaction.atomic():
+        rows = list(
+            model.objects.filter(**{path: job.course_id})
+            .order_by("pk")
+            .values_list("pk", *file_fields)[:batch_size]
+        )
+        if not rows:
+            return 0
+        batch = model.objects.filter(pk__in=[r[0] for r in rows])
+        setattr(batch, TEARDOWN_FLAG, True)
+        deleted, _ = batch.delete()
+
+    # หลัง commit: แถวหายแน่แล้วค่อยลบไฟล์ (ถ้าลบไฟล์ก่อนแล้ว transaction ล้ม จะเหลือแถวที่ชี้ไฟล์หาย)
+    names = {f: [r[i] for r in rows if r[i]] for i, f in enumerate(file_fields, start=1)}
+    ok, failed = _delete_files(model, names)
+    if model is Certificate:
+        extra = _purge_certificate_images([r[0] for r in rows])
+        ok, failed = ok + extra[0], failed + extra[1]
+
+    _progress(job, step, deleted, (ok, failed))
+    return len(rows)
+
+
+def _delete_course_row(job) -> None:
+    # โหลดทั้งแถว: receiver ของ post_delete (catalog_cache) อ่าน university_id
+    course = Course.all_objects.filter(pk=job.course_id).first()
+    if course is None:
+        return
+    banner = course.banner_img.name if course.banner_img else ""
+    with transaction.atomic():
+        deleted, _ = course.delete()
+    _progress(job, "course", deleted, _delete_files(Course, {"banner_img": [banner] if banner else []}))
+
+
+def process_job(job, batch_size: int = BATCH_SIZE) -> bool:
+    """ทำ job จนจบ; คืน True ถ้าสำเร็จ (ล้ม -> status failed + error, จองใหม่ได้ภายหลัง)"""
+    batch_size = max(1, batch_size)
+    try:
+        for step, model, path, file_fields in STEPS:
+            while delete_batch(job, step, model, path, file_fields, batch_size) >= batch_size:
+                pass
+        _delete_course_row(job)
+    except Exception as exc:
+        logger.exception("Course deletion job %s failed", job.pk)
+        CourseDeletionJob.objects.filter(pk=job.pk).update(
+            status="failed", error=str(exc)[:2000], updated_at=timezone.now()
+        )
+        return False
+
+    CourseDeletionJob.objects.filter(pk=job.pk).update(
+        status="done", step="", finished_at=timezone.now(), updated_at=timezone.now()
+    )
+    return True
@@ -0,0 +1,119 @@
+# lms_app/course_search.py
+"""
+ค้นหาคอร์สด้วย Postgres full-text (Course.search_vector + GIN index)
+
+ภาษาไทยไม่มีช่องว่างระหว่างคำ parser ของ tsvector จึงตัดคำไม่ได้ -> ตัดเองเป็น character bigram
+    "ไพธอน" -> ไพ พธ ธอ อน      (ค้น "พธอ" = พธ & ธอ -> เจอ)
+- token ไทยเข้ารหัสเป็น hex ของ codepoint ("th0e1e0e18") ให้ parser มองเป็นคำ ASCII คำเดียวเสมอ
+  ไม่ขึ้นกับ locale ของ DB (สระ/วรรณยุกต์เป็น combining mark ที่ parser บาง locale ตัดทิ้ง)
+- ภาษาอื่นตัดตามคำ; ใช้ config "simple" (ไม่ stem) ฝั่ง query คำละตินค้นแบบ prefix (pyth -> python)
+- ชื่อคอร์สน้ำหนัก A, คำอธิบาย B -> จัดอันดับด้วย ts_rank
+
+search_vector อัปเดตทุกครั้งที่ save ชื่อ/คำอธิบาย (post_save ใน LmsAppConfig.ready)
+ข้อมูลเก่า/bulk_create: python manage.py rebuild_course_search
+DB ที่ไม่ใช่ Postgres (เช่น sqlite ตอนพัฒนา) ใช้ icontains แบบเดิม
+"""
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.db import connections, router
+from django.db.models import Case, F, Q, Value, When
+
+CONFIG = "simple"
+RANK = "search_rank"
+
+# ช่วงอักษรไทยทั้งบล็อก (รวมสระ/วรรณยุกต์) หรือคำของภาษาอื่น (ไม่รวม _)
+TOKEN_RE = re.compile(r"[\u0e00-\u0e7f]+|[^\W_]+")
+THAI_RE = re.compile(r"[\u0e00-\u0e7f]")
+
+
+def _enabled(alias: str) -> bool:
+    return connections[alias].vendor == "postgresql"
+
+
+def _thai(chars: str) -> str:
+    return "th" + "".join(f"{ord(c):04x}" for c in chars)
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFC", text or "").casefold()
+
+
+def document_tokens(text: str) -> list:
+    tokens = []
+    for run in TOKEN_RE.findall(normalize(text)):
+        if THAI_RE.match(run):
+            if len(run) == 1:
+                tokens.append(_thai(run))
+            else:
+                tokens.extend(_thai(run[i:i + 2]) for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def query_terms(text: str) -> list:
+    """term ของ tsquery (raw) — ทุก term ต้องตรง (AND)"""
+    terms = []
+    for run in TOKEN_RE.findall(normalize(text)):
+        if THAI_RE.match(run):
+            if len(run) == 1:
+                # อักษรเดียว: bigram ใดก็ได้ที่ขึ้นต้นด้วยตัวนี้
+                terms.append(f"{_thai(run)}:*")
+            else:
+                terms.extend(_thai(run[i:i + 2]) for i in range(len(run) - 1))
+        else:
+            terms.append(f"{run}:*")
+    return list(dict.fromkeys(terms))
+
+
+def search_vector(title: str, description: str):
+    return (
+        SearchVector(Value(" ".join(document_tokens(title))), weight="A", config=CONFIG)
+        + SearchVector(Value(" ".join(document_tokens(description))), weight="B", config=CONFIG)
+    )
+
+
+def update_search_vector(course):
+    from .models import Course
+
+    if not _enabled(router.db_for_write(Course)):
+        return
+    Course.objects.filter(pk=course.pk).update(
+        search_vector=search_vector(course.title, course.description)
+    )
+
+
+def update_search_vectors(rows) -> int:
+    """rows = [(id, title, description), ...] -> UPDATE เดียวทั้งชุด (ใช้ตอน backfill)"""
+    from .models import Course
+
+    if not rows or not _enabled(router.db_for_write(Course)):
+        return 0
+    whens = [When(pk=pk, then=search_vector(title, description)) for pk, title, description in rows]
+    return Course.objects.filter(pk__in=[r[0] for r in rows]).update(
+        search_vector=Case(*whens, output_field=SearchVectorField())
+    )
+
+
+def update_search_vector_on_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    """receiver ของ post_save(Course) — ต่อใน LmsAppConfig.ready()"""
+    if raw:
+        return
+    if update_fields is not None and not {"title", "description"} & set(update_fields):
+        return
+    update_search_vector(instance)
+
+
+def search_courses(qs, text: str):
+    """กรอง + annotate RANK (ยิ่งมากยิ่งตรง); ไม่มีคำให้ค้น -> queryset ว่าง"""
+    terms = query_terms(text)
+    if not terms:
+        return qs.none()
+
+    if not _enabled(qs.db):
+        return qs.filter(Q(title__icontains=text) | Q(description__icontains=text))
+
+    query = SearchQuery(" & ".join(terms), search_type="raw", config=CONFIG)
+    return qs.filter(search_vector=query).annotate(**{RANK: SearchRank(F("search_vector"), query)})
@@ -0,0 +1,163 @@
+# lms_app/course_stats.py
+"""
+ดูแล CourseStats แบบ incremental (ไม่ต้อง COUNT/AVG ตอนอ่าน)
+
+- Enrollment / Review แต่ละแถว "มีส่วน" ในตัวนับเป็นเวกเตอร์ (_enrollment_part / _review_part)
+  post_init จำค่าเดิม -> post_save/post_delete ส่งเฉพาะผลต่าง (ใหม่ - เดิม) เป็น UPDATE ... SET x = x + d
+  (ถ้าค่าเดิมไม่รู้ เช่นโหลดด้วย .only() -> นับใหม่ทั้งคอร์ส)
+  ครอบคลุมการสร้าง ลบ เปลี่ยนสถานะ (enrolled/completed/cancelled) เปลี่ยนคะแนน และย้ายคอร์ส
+- ยังไม่มีแถว CourseStats ของคอร์สนั้น -> คำนวณจาก DB ทั้งคอร์สครั้งเดียว (rebuild_course_stats)
+- การลบที่มาจากการลบคอร์ส (cascade หรือชุดของ course_deletion) ข้าม เพราะ CourseStats ถูกลบตามไปด้วย
+- QuerySet.update()/bulk_create ไม่ส่ง signal -> รัน python manage.py rebuild_course_stats
+"""
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Course, CourseStats, Enrollment, EnrollmentStatus, Review
+
+STAT_FIELDS = ("enrollment_count", "completion_count", "review_count", "rating_sum")
+
+
+def _enrollment_part(status) -> dict:
+    if status is None:
+        return {}
+    return {
+        "enrollment_count": int(status != EnrollmentStatus.CANCELLED),
+        "completion_count": int(status == EnrollmentStatus.COMPLETED),
+    }
+
+
+def _review_part(rating) -> dict:
+    if rating is None:
+        return {}
+    return {"review_count": 1, "rating_sum": int(rating)}
+
+
+def compute_stats(course_ids=None):
+    """{course_id: {field: value}} จากข้อมูลจริง (ใช้ตอน rebuild)"""
+    courses = Course.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+
+    stats = {pk: dict.fromkeys(STAT_FIELDS, 0) for pk in courses.values_list("pk", flat=True)}
+    if not stats:
+        return stats
+
+    enrollments = (
+        Enrollment.objects.filter(course_id__in=stats)
+        .values("course_id")
+        .annotate(
+            enrolled=Count("pk", filter=~Q(status=EnrollmentStatus.CANCELLED)),
+            completed=Count("pk", filter=Q(status=EnrollmentStatus.COMPLETED)),
+        )
+    )
+    for row in enrollments:
+        stats[row["course_id"]].update(enrollment_count=row["enrolled"], completion_count=row["completed"])
+
+    reviews = (
+        Review.objects.filter(course_id__in=stats)
+        .values("course_id")
+        .annotate(n=Count("pk"), total=Sum("rating"))
+    )
+    for row in reviews:
+        stats[row["course_id"]].update(review_count=row["n"], rating_sum=row["total"] or 0)
+    return stats
+
+
+def rebuild_course_stats(course_ids=None) -> int:
+    stats = compute_stats(course_ids)
+    existing = set(CourseStats.objects.filter(course_id__in=stats).values_list("course_id", flat=True))
+    now = timezone.now()
+
+    rows = [CourseStats(course_id=pk, updated_at=now, **values) for pk, values in stats.items()]
+    # ignore_conflicts: อีก request อาจสร้างแถวเดียวกันไปก่อน (คอร์สเก่าที่ยังไม่เคยมี stats)
+    CourseStats.objects.bulk_create(
+        [r for r in rows if r.course_id not in existing], batch_size=500, ignore_conflicts=True
+    )
+    CourseStats.objects.bulk_update(
+        [r for r in rows if r.course_id in existing], [*STAT_FIELDS, "updated_at"], batch_size=500
+    )
+    return len(rows)
+
+
+def apply_delta(course_id, delta: dict):
+    delta = {k: v for k, v in delta.items() if v}
+    if not course_id or not delta:
+        return
+    updated = CourseStats.objects.filter(course_id=course_id).update(
+        updated_at=timezone.now(), **{k: F(k) + v for k, v in delta.items()}
+    )
+    if not updated:
+        # แถวยังไม่มี: นับจาก DB (รวมการเปลี่ยนแปลงนี้อยู่แล้ว เพราะ post_save/post_delete มาหลังคำสั่ง SQL)
+        rebuild_course_stats([course_id])
+
+
+def _diff(new: dict, old: dict) -> dict:
+    return {k: new.get(k, 0) - old.get(k, 0) for k in {*new, *old}}
+
+
+def _stash(instance, field, part):
+    """(course_id, ส่วนของแถวนี้) ตอนโหลด; None = ไม่รู้ค่าเดิม (field ถูก defer)"""
+    values = instance.__dict__
+    if "course_id" not in values or field not in values:
+        return None
+    return values["course_id"], part(values[field])
+
+
+def _saved(instance, created: bool, new_part: dict):
+    state = None if created else getattr(instance, "_stats_state", None)
+    if created:
+        apply_delta(instance.course_id, new_part)
+    elif state is None:
+        rebuild_course_stats([instance.course_id])
+    else:
+        old_course_id, old_part = state
+        if old_course_id != instance.course_id:
+            apply_delta(old_course_id, _diff({}, old_part))
+            apply_delta(instance.course_id, new_part)
+        else:
+            apply_delta(instance.course_id, _diff(new_part, old_part))
+    instance._stats_state = (instance.course_id, new_part)
+
+
+def _from_course_cascade(origin) -> bool:
+    # _course_teardown: ชุดที่ course_deletion ลบ (คอร์สถูก tombstone และ stats จะหายตามคอร์ส)
+    return (
+        isinstance(origin, Course)
+        or getattr(origin, "model", None) is Course
+        or getattr(origin, "_course_teardown", False)
+    )
+
+
+# ---------- signal receivers (ต่อใน LmsAppConfig.ready) ----------
+def remember_enrollment(sender, instance, **kwargs):
+    instance._stats_state = _stash(instance, "status", _enrollment_part)
+
+
+def enrollment_saved(sender, instance, created=False, raw=False, **kwargs):
+    if not raw:
+        _saved(instance, created, _enrollment_part(instance.status))
+
+
+def enrollment_deleted(sender, instance, origin=None, **kwargs):
+    if not _from_course_cascade(origin):
+        apply_delta(instance.course_id, _diff({}, _enrollment_part(instance.status)))
+
+
+def remember_review(sender, instance, **kwargs):
+    instance._stats_state = _stash(instance, "rating", _review_part)
+
+
+def review_saved(sender, instance, created=False, raw=False, **kwargs):
+    if not raw:
+        _saved(instance, created, _review_part(instance.rating))
+
+
+def review_deleted(sender, instance, origin=None, **kwargs):
+    if not _from_course_cascade(origin):
+        apply_delta(instance.course_id, _diff({}, _review_part(instance.rating)))
+
+
+def course_created(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        CourseStats.objects.get_or_create(course=instance)
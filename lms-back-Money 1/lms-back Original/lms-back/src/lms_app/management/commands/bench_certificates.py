@@ -0,0 +1,173 @@
+# lms_app/management/commands/bench_certificates.py
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from lms_app.cert_backends import BACKENDS
+from lms_app.cert_pdf_renderer import RENDERER_VERSION, font_status, register_fonts
+from lms_app.cert_templates.layers import LAYERS
+
+THAI_NAMES = ["สมชาย ใจดี", "กนกวรรณ ศรีสุข", "ณัฐพล วงศ์ไทย", "พิมพ์ชนก แก้วมณี", "ธีรภัทร์ สุขเกษม"]
+THAI_COURSES = ["การเขียนโปรแกรมภาษาไพธอนเบื้องต้น", "วิทยาการข้อมูลสำหรับผู้เริ่มต้น", "การออกแบบฐานข้อมูล"]
+EN_NAMES = ["Alice Johnson", "Bob Smith", "Charlotte Nguyen", "Daniel O'Brien", "Emily Zhang"]
+EN_COURSES = ["Introduction to Python", "Data Science Fundamentals", "Database Design"]
+
+# backend ที่วัดได้โดยไม่ต้องมี service/ไลบรารีระบบอื่น
+# (weasyprint ต้องมี pango และไม่ได้ใช้ style; next ต้องมี frontend — ระบุเองด้วย --backends)
+DEFAULT_BACKENDS = ["reportlab"]
+# จำนวนใบที่ใช้วัด peak ของ Python heap (tracemalloc)
+MEMORY_SAMPLE = 10
+
+
+def synthetic_payloads(style: str, count: int) -> list:
+    payloads = []
+    for i in range(count):
+        thai = i % 2 == 0
+        names, courses = (THAI_NAMES, THAI_COURSES) if thai else (EN_NAMES, EN_COURSES)
+        payloads.append({
+            "student_name": f"{names[i % len(names)]} {i}",
+            "course_name": courses[i % len(courses)],
+            "instructor_name": names[(i + 1) % len(names)],
+            "completion_date": f"{1 + i % 28:02d}/{1 + i % 12:02d}/2025",
+            "primary_color": "#881337",
+            "secondary_color": "#1f2937",
+            "style": style,
+            "locale": "th" if thai else "en",
+        })
+    return payloads
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def max_rss_kb() -> int:
+    """high-water mark ของ RSS ทั้ง process (ไม่มีวันลด)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS รายงานเป็น byte, Linux เป็น KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def bench_case(backend_name: str, style: str, count: int, warmup: int) -> dict:
+    """
+    วัดหนึ่งกรณี — รันใน process ลูกที่ fork ใหม่ทุกกรณี (Command._run_case)
+    ru_maxrss ไม่มีวันลด ถ้าวัดใน process เดียวกันกรณีหลัง ๆ จะได้ peak ของกรณีก่อนซ้ำ
+    rss_growth_kb = peak ตอนจบ - peak ตอนเริ่ม (ตอนเริ่ม = ขนาดที่ได้จาก parent ตอน fork)
+    """
+    result = {"backend": backend_name, "style": style, "count": count, "error": ""}
+    backend = BACKENDS[backend_name]
+    payloads = synthetic_payloads(style, count)
+    rss_start = max_rss_kb()
+
+    try:
+        for data in payloads[:warmup]:
+            backend.render(data, cert_id=str(uuid.uuid4()))
+
+        latencies, sizes = [], []
+        started = time.perf_counter()
+        for data in payloads:
+            t0 = time.perf_counter()
+            content = backend.render(data, cert_id=str(uuid.uuid4()))
+            latencies.append((time.perf_counter() - t0) * 1000)
+            sizes.append(len(content))
+        elapsed = time.perf_counter() - started
+        rss_end = max_rss_kb()
+
+        # วัดหน่วยความจำแยกรอบ (tracemalloc ทำให้ช้าลง ไม่ให้ปนกับตัวเลขเวลา)
+        tracemalloc.start()
+        try:
+            for data in payloads[:MEMORY_SAMPLE]:
+                backend.render(data, cert_id=str(uuid.uuid4()))
+            _, py_peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except Exception as e:
+        result["error"] = f"{e.__class__.__name__}: {e}"
+        return result
+
+    result.update({
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "certs_per_sec": round(count / elapsed, 2) if elapsed else None,
+        "peak_rss_kb": rss_end,
+        "rss_growth_kb": rss_end - rss_start,
+        "py_peak_kb": py_peak // 1024,
+        "avg_bytes": round(statistics.fmean(sizes)),
+        "max_bytes": max(sizes),
+    })
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        "วัดความเร็วการ render ใบประกาศ แยกตาม backend x style "
+        "(p50/p95 ms, ใบ/วินาที, RSS ที่เพิ่มขึ้นต่อกรณี, ขนาดไฟล์) แล้วพิมพ์เป็น JSON — "
+        "แต่ละกรณีรันใน process ลูกของตัวเอง"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=50, help="จำนวนใบต่อกรณี")
+        parser.add_argument("--warmup", type=int, default=3, help="จำนวนรอบอุ่นเครื่อง (ไม่นับผล)")
+        parser.add_argument("--styles", default=",".join(LAYERS), help="คั่นด้วย comma")
+        parser.add_argument("--backends", default=",".join(DEFAULT_BACKENDS), help="คั่นด้วย comma")
+        parser.add_argument("--output", default=None, help="เขียน JSON ลงไฟล์แทน stdout")
+        parser.add_argument("--fail-on-error", action="store_true",
+                            help="exit code 1 ถ้ามีกรณีที่ render ไม่ได้ (ใช้ใน CI)")
+
+    def handle(self, *args, **opts):
+        count = max(1, opts["count"])
+        styles = [s.strip() for s in opts["styles"].split(",") if s.strip()]
+        backends = [b.strip() for b in opts["backends"].split(",") if b.strip()]
+
+        unknown = [s for s in styles if s not in LAYERS] + [b for b in backends if b not in BACKENDS]
+        if unknown:
+            raise CommandError(f"ไม่รู้จัก: {', '.join(unknown)}")
+
+        register_fonts()
+
+        results = []
+        for backend_name in backends:
+            for style in styles:
+                results.append(self._run_case(backend_name, style, count, opts["warmup"]))
+
+        report = {
+            "generated_at": timezone.now().isoformat(),
+            "renderer_version": RENDERER_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fonts": font_status(),
+            "count": count,
+            "results": results,
+        }
+        out = json.dumps(report, ensure_ascii=False, indent=2)
+
+        if opts["output"]:
+            with open(opts["output"], "w", encoding="utf-8") as f:
+                f.write(out + "\n")
+        else:
+            self.stdout.write(out)
+
+        if opts["fail_on_error"] and any(r["error"] for r in results):
+            raise CommandError("บางกรณี render ไม่สำเร็จ (ดู field error)")
+
+    def _run_case(self, backend_name: str, style: str, count: int, warmup: int) -> dict:
+        # fork: ลูกได้ฟอนต์ที่ลงทะเบียนแล้วจาก parent (ไม่ต้อง setup Django ใหม่)
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as pool:
+            return pool.submit(bench_case, backend_name, style, count, warmup).result()
@@ -0,0 +1,30 @@
+# lms_app/management/commands/rebalance_chapter_ranks.py
+from django.core.management.base import BaseCommand
+
+from lms_app.chapter_rank import REBALANCE_LENGTH, courses_to_rebalance, rebalance_course
+
+
+class Command(BaseCommand):
+    help = (
+        "เกลี่ย rank ของบทเรียนใหม่ (ลำดับเดิม) ในคอร์สที่ key ยาวเกินเพราะย้ายบทที่จุดเดิมบ่อย ๆ. "
+        "ตั้งเป็น cron/background job ได้ — ล็อกทีละคอร์ส"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-length", type=int, default=REBALANCE_LENGTH,
+                            help="เกลี่ยคอร์สที่มี rank ยาวตั้งแต่ค่านี้")
+        parser.add_argument("--course", action="append", default=None,
+                            help="เกลี่ยเฉพาะคอร์สนี้ (ไม่ดูความยาว) ระบุซ้ำได้")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="แสดงคอร์สที่จะเกลี่ยเท่านั้น")
+
+    def handle(self, *args, **opts):
+        course_ids = opts["course"] or list(courses_to_rebalance(opts["min_length"]))
+        if opts["dry_run"]:
+            for course_id in course_ids:
+                self.stdout.write(str(course_id))
+            self.stdout.write(f"{len(course_ids)} course(s) to rebalance")
+            return
+
+        chapters = sum(rebalance_course(course_id) for course_id in course_ids)
+        self.stdout.write(self.style.SUCCESS(f"courses={len(course_ids)} chapters={chapters}"))
@@ -0,0 +1,42 @@
+# lms_app/management/commands/rebuild_course_search.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from lms_app.course_search import update_search_vectors
+from lms_app.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "สร้าง Course.search_vector ใหม่ (ค้นหา ?q=) — ใช้หลัง migrate ครั้งแรก, "
+        "หลัง bulk import หรือเมื่อเปลี่ยนวิธีตัดคำใน course_search.py"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="จำนวนคอร์สต่อ UPDATE")
+        parser.add_argument("--missing", action="store_true",
+                            help="ทำเฉพาะคอร์สที่ยังไม่มี search_vector")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("search_vector ใช้ได้กับ PostgreSQL เท่านั้น")
+
+        batch_size = max(1, opts["batch_size"])
+        qs = Course.objects.order_by("pk")
+        if opts["missing"]:
+            qs = qs.filter(search_vector__isnull=True)
+
+        done, last_pk = 0, None
+        while True:
+            # ไล่ตาม pk (keyset) แทน OFFSET ให้แต่ละรอบเร็วเท่ากัน
+            batch = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+            rows = list(batch.values_list("pk", "title", "description")[:batch_size])
+            if not rows:
+                break
+            with transaction.atomic():
+                done += update_search_vectors(rows)
+            last_pk = rows[-1][0]
+            self.stdout.write(f"  {done} courses", ending="\r")
+
+        self.stdout.write(self.style.SUCCESS(f"updated={done}"))
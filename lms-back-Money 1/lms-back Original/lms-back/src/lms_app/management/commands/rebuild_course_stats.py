@@ -0,0 +1,55 @@
+# lms_app/management/commands/rebuild_course_stats.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lms_app.course_stats import compute_stats, rebuild_course_stats
+from lms_app.models import Course, CourseStats
+
+
+class Command(BaseCommand):
+    help = (
+        "นับ CourseStats ใหม่จาก Enrollment/Review (reconcile) — ใช้หลัง migrate ครั้งแรก, "
+        "หลัง import ข้อมูลแบบ bulk หรือเมื่อสงสัยว่าตัวนับเพี้ยน"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="จำนวนคอร์สต่อรอบ")
+        parser.add_argument("--course", action="append", default=None,
+                            help="ทำเฉพาะคอร์สนี้ (ระบุซ้ำได้)")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="แค่รายงานคอร์สที่ตัวนับไม่ตรง ไม่เขียน")
+
+    def handle(self, *args, **opts):
+        batch_size = max(1, opts["batch_size"])
+        qs = Course.objects.order_by("pk")
+        if opts["course"]:
+            qs = qs.filter(pk__in=opts["course"])
+
+        total = drifted = 0
+        last_pk = None
+        while True:
+            batch = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+            ids = list(batch.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            last_pk = ids[-1]
+
+            with transaction.atomic():
+                drifted += self._count_drift(ids)
+                if not opts["dry_run"]:
+                    rebuild_course_stats(ids)
+            total += len(ids)
+            self.stdout.write(f"  {total} courses", ending="\r")
+
+        verb = "would fix" if opts["dry_run"] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"courses={total} {verb}={drifted}"))
+
+    def _count_drift(self, ids) -> int:
+        expected = compute_stats(ids)
+        current = {
+            row.pop("course_id"): row
+            for row in CourseStats.objects.filter(course_id__in=ids).values(
+                "course_id", "enrollment_count", "completion_count", "review_count", "rating_sum"
+            )
+        }
+        return sum(1 for pk, values in expected.items() if current.get(pk) != values)
@@ -0,0 +1,69 @@
+# lms_app/management/commands/run_certificate_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms_app.cert_backends import warm_up_renderers
+from lms_app.cert_batch import default_workers, make_executor
+from lms_app.cert_export import build_combined_pdf, claim_export
+from lms_app.cert_jobs import claim_certificates, job_finished, render_certificates, refresh_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker สำหรับ render ใบประกาศที่อยู่ในคิว (CertificateRenderJob) และ PDF รวมของคอร์ส "
+        "(CertificateExport). "
+        "รันหลายตัวพร้อมกันได้ — การจองงานใช้ SKIP LOCKED"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20,
+                            help="จำนวนใบที่จองต่อรอบ")
+        parser.add_argument("--sleep", type=float, default=2.0,
+                            help="วินาทีที่รอเมื่อคิวว่าง")
+        parser.add_argument("--once", action="store_true",
+                            help="เคลียร์คิวจนหมดแล้วออก (ไม่วนรอ)")
+        parser.add_argument("--job", default=None,
+                            help="ทำเฉพาะ job id นี้ (ไม่ทำ PDF รวม) แล้วออกเมื่อ job จบ")
+        parser.add_argument("--processes", type=int, default=None,
+                            help="จำนวน process สำหรับ render (default: CERT_RENDER_PROCESSES หรือจำนวน core)")
+
+    def handle(self, *args, **opts):
+        batch_size = max(1, opts["batch_size"])
+        processes = opts["processes"] or default_workers()
+        rendered = failed = exported = 0
+        warm_up_renderers()
+
+        # pool เดียวใช้ตลอดอายุ worker (ฟอนต์ถูกลงทะเบียนครั้งเดียวต่อ process)
+        executor = make_executor(processes) if processes > 1 else None
+        try:
+            while True:
+                certs = claim_certificates(batch_size, job_id=opts["job"])
+                if certs:
+                    results = render_certificates(
+                        certs, executor=executor, max_workers=processes, prerender_images=True
+                    )
+                    rendered += sum(1 for ok in results if ok)
+                    failed += sum(1 for ok in results if not ok)
+
+                    for job_id in {c.render_job_id for c in certs}:
+                        refresh_job(job_id)
+
+                # PDF รวมทีละงานระหว่างรอบ (ใบที่รอ render ยังได้ทำต่อเนื่อง)
+                export = None if opts["job"] else claim_export()
+                if export is not None:
+                    if build_combined_pdf(export):
+                        exported += 1
+                    else:
+                        failed += 1
+
+                if not certs and export is None:
+                    # --job: ออกเมื่อไม่มีใบที่รอ/กำลัง render/รอ retry ของ job นั้นแล้ว
+                    if opts["once"] or (opts["job"] and job_finished(opts["job"])):
+                        break
+                    time.sleep(opts["sleep"])
+        finally:
+            if executor:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"rendered={rendered} exported={exported} failed={failed}"))
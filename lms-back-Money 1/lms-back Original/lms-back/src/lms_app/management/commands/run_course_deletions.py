@@ -0,0 +1,44 @@
+# lms_app/management/commands/run_course_deletions.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms_app.course_deletion import BATCH_SIZE, claim_job, process_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker สำหรับลบคอร์สที่ถูกสั่งลบ (CourseDeletionJob): ลบข้อมูลลูกทีละชุด + ไฟล์ media. "
+        "รันหลายตัวพร้อมกันได้ — การจองงานใช้ SKIP LOCKED"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                            help="จำนวนแถวที่ลบต่อ transaction")
+        parser.add_argument("--sleep", type=float, default=5.0,
+                            help="วินาทีที่รอเมื่อคิวว่าง")
+        parser.add_argument("--once", action="store_true",
+                            help="เคลียร์คิวจนหมดแล้วออก (ไม่วนรอ)")
+        parser.add_argument("--job", default=None,
+                            help="ทำเฉพาะ job id นี้ครั้งเดียวแล้วออก")
+
+    def handle(self, *args, **opts):
+        done = failed = 0
+        while True:
+            job = claim_job(job_id=opts["job"])
+            if job is None:
+                # --job: ไม่มีให้จอง (เสร็จแล้ว / worker อื่นถืออยู่) -> ออกเลย ไม่วนรอ
+                if opts["once"] or opts["job"]:
+                    break
+                time.sleep(opts["sleep"])
+                continue
+
+            self.stdout.write(f"deleting course {job.course_id} ({job.course_title}) job={job.id}")
+            if process_job(job, batch_size=opts["batch_size"]):
+                done += 1
+            else:
+                failed += 1
+            if opts["job"]:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"done={done} failed={failed}"))
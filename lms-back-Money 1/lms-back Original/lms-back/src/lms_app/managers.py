@@ -1,5 +1,6 @@
 
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 class CustomUserManager(BaseUserManager):
@@ -32,3 +33,12 @@ class CustomUserManager(BaseUserManager):
         if extra_fields.get('is_superuser') is not True:
             raise ValueError(_('Superuser must have is_superuser=True.'))
         return self.create_user(email, password, **extra_fields)
+
+
+class CourseManager(models.Manager):
+    """
+    Course.objects: ซ่อนคอร์สที่ถูกสั่งลบแล้ว (deleted_at) — ระหว่างรอ worker ลบจริง
+    งานลบ/แอดมินใช้ Course.all_objects
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
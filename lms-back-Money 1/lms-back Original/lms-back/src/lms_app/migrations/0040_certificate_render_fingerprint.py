@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0039_certificate_render_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='render_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='certificaterenderjob',
+            name='skipped',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0040_certificate_render_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='revoked_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='certificate',
+            name='verification_code',
+            field=models.CharField(db_index=True, max_length=128, unique=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('lms_app', '0041_certificate_signed_verification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-updated_at', '-created_at'], name='course_updated_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursematerial',
+            index=models.Index(fields=['chapter', '-created_at'], name='material_chapter_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='importantdocument',
+            index=models.Index(fields=['-created_at'], name='importantdoc_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['course', '-created_at'], name='review_course_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='universitymember',
+            index=models.Index(fields=['university', '-created_at'], name='unimember_uni_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-date_joined'], name='user_date_joined_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:59
+
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def _normalize(title):
+    # สำเนาของ models.normalize_course_title ณ ตอนเขียน migration (อย่า import จาก models)
+    folded = unicodedata.normalize("NFC", title or "").casefold()
+    return " ".join(unicodedata.normalize("NFC", folded).split())
+
+
+def backfill_normalized_title(apps, schema_editor):
+    Course = apps.get_model("lms_app", "Course")
+    batch = []
+    for course in Course.objects.only("id", "title").iterator(chunk_size=BATCH_SIZE):
+        course.normalized_title = _normalize(course.title)
+        batch.append(course)
+        if len(batch) >= BATCH_SIZE:
+            Course.objects.bulk_update(batch, ["normalized_title"])
+            batch = []
+    if batch:
+        Course.objects.bulk_update(batch, ["normalized_title"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0043_course_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='normalized_title',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_normalized_title, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['university', 'normalized_title'], name='course_uni_normtitle_idx'),
+        ),
+    ]
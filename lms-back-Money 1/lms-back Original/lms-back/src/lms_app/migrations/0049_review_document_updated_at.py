@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0048_course_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importantdocument',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:16
+
+from django.db import migrations, models
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def _spread(n):
+    # สำเนาของ chapter_rank.spread ณ ตอนเขียน migration (อย่า import จากแอป)
+    base, width = len(ALPHABET), 2
+    while base ** width < (n + 1) * base:
+        width += 1
+    step = base ** width // (n + 1)
+    keys = []
+    for i in range(1, n + 1):
+        value, digits = step * i, []
+        for _ in range(width):
+            value, d = divmod(value, base)
+            digits.append(ALPHABET[d])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
+
+
+def backfill_rank(apps, schema_editor):
+    """rank ตามลำดับเดิม (position แล้ว created_at) ทีละคอร์ส"""
+    CourseChapter = apps.get_model("lms_app", "CourseChapter")
+    course_ids = (
+        CourseChapter.objects.order_by("course_id").values_list("course_id", flat=True).distinct()
+    )
+    for course_id in list(course_ids):
+        chapters = list(
+            CourseChapter.objects.filter(course_id=course_id)
+            .order_by("position", "created_at", "id")
+            .only("id", "rank")
+        )
+        for chapter, key in zip(chapters, _spread(len(chapters))):
+            chapter.rank = key
+        CourseChapter.objects.bulk_update(chapters, ["rank"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0049_review_document_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursechapter',
+            name='rank',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='coursechapter',
+            index=models.Index(fields=['course', 'rank'], name='chapter_course_rank_idx'),
+        ),
+    ]
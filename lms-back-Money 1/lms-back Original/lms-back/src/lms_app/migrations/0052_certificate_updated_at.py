@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0051_certificate_export'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
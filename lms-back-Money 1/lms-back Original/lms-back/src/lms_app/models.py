@@ -1,11 +1,14 @@
 # Create your models here.
+import unicodedata
 import uuid 
 from django.db import models
 from django.utils.text import slugify 
 from django.contrib.auth.models import AbstractUser, Group, Permission, UserManager
 from django.conf import settings
-from .managers import CustomUserManager
+from .managers import CourseManager, CustomUserManager
 from django.db.models import UniqueConstraint
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from .storage import NormalizedStorage
 
 
@@ -52,6 +55,10 @@ class User(AbstractUser):
     
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        # sort key ของ cursor pagination (UserViewSet)
+        indexes = [models.Index(fields=["-date_joined"], name="user_date_joined_idx")]
+
     def __str__(self):
         return self.email
 
@@ -69,6 +76,7 @@ class UniversityMember(models.Model):
         constraints = [
             UniqueConstraint(fields=['user', 'university'], name='unique_user_university_role')
         ]
+        indexes = [models.Index(fields=["university", "-created_at"], name="unimember_uni_created_idx")]
 
     def __str__(self):
         return f'{self.user.email} - {self.university.name} ({self.role})'
@@ -132,9 +140,17 @@ class CourseStatus(models.TextChoices):
     ARCHIVED = 'archived'
 
 
+def normalize_course_title(title: str) -> str:
+    """คีย์เทียบชื่อซ้ำ: NFC + casefold + บีบช่องว่าง (" Python  101" == "python 101")"""
+    folded = unicodedata.normalize("NFC", title or "").casefold()
+    return " ".join(unicodedata.normalize("NFC", folded).split())
+
+
 class Course(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255)
+    # normalize_course_title(title) — ตั้งใน save() ใช้ตรวจชื่อซ้ำในมหาวิทยาลัยเดียวกัน
+    normalized_title = models.CharField(max_length=255, editable=False, default="")
     description = models.TextField()
     banner_img = models.ImageField(
         upload_to="courses/banners/",
@@ -190,6 +206,28 @@ class Course(models.Model):
     is_paid = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # tsvector ของชื่อ (A) + คำอธิบาย (B) — ดูแลโดย course_search.py ห้ามแก้ตรง ๆ
+    search_vector = SearchVectorField(null=True, editable=False)
+    # tombstone: ตั้งตอนสั่งลบ แล้ว CourseDeletionJob ลบข้อมูลจริงเบื้องหลัง (course_deletion.py)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
+    objects = CourseManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # sort key ของ cursor pagination (CourseViewSet)
+            models.Index(fields=["-updated_at", "-created_at"], name="course_updated_created_idx"),
+            GinIndex(fields=["search_vector"], name="course_search_vector_gin"),
+            models.Index(fields=["university", "normalized_title"], name="course_uni_normtitle_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_title = normalize_course_title(self.title)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "title" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_title"}
+        super().save(*args, **kwargs)
 
 
 class CourseChapter(models.Model):
@@ -198,7 +236,10 @@ class CourseChapter(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, default="")  # ปล่อยว่างได้
     content = models.TextField(blank=True, default="")      # << เดิมบังคับ, ให้ไม่บังคับ
+    # ลำดับเดิม (เลขจำนวนเต็ม) — เก็บไว้ให้ FE/endpoint reorder เดิม; ลำดับจริงดูจาก rank
     position = models.IntegerField(default=0)
+    # key เรียงลำดับแบบ lexicographic (chapter_rank.py) — ย้ายบท = แก้ rank แถวเดียว
+    rank = models.CharField(max_length=64, default="", editable=False)
     # << เพิ่มฟิลด์ปก
     cover_image = models.ImageField(
         upload_to="chapter_covers/",
@@ -206,6 +247,19 @@ class CourseChapter(models.Model):
         null=True
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["course", "rank"], name="chapter_course_rank_idx")]
+
+    def save(self, *args, **kwargs):
+        if not self.rank:
+            # บทใหม่ที่ไม่ได้กำหนดตำแหน่ง (เช่นสร้างจากแอดมิน) ต่อท้ายคอร์ส
+            from .chapter_rank import key_between, last_rank
+
+            last = last_rank(self.course_id)
+            self.rank = key_between(last[0] if last else None)
+        super().save(*args, **kwargs)
 
 
 class MaterialType(models.TextChoices):
@@ -226,8 +280,12 @@ class CourseMaterial(models.Model):
     type = models.CharField(max_length=20, choices=MaterialType.choices)
     path = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     file = models.FileField(upload_to="chapters/materials/",storage=NormalizedStorage(), blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["chapter", "-created_at"], name="material_chapter_created_idx")]
+
 class CourseFavorite(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -248,6 +306,10 @@ class Enrollment(models.Model):
     status = models.CharField(max_length=20, choices=EnrollmentStatus.choices)
     enrolled_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # "คอร์สของฉัน" (EXISTS ตาม student + course) และรายการคอร์สที่ผู้เรียนลงทะเบียน
+        indexes = [models.Index(fields=["student", "course"], name="enrollment_student_course_idx")]
+
 
 class TestType(models.TextChoices):
     CHAPTER = 'chapter_quiz'
@@ -305,6 +367,31 @@ class Review(models.Model):
     rating = models.IntegerField()
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["course", "-created_at"], name="review_course_created_idx")]
+
+
+class CourseStats(models.Model):
+    """
+    ตัวนับของคอร์ส (denormalized) สำหรับการ์ดคอร์ส — อัปเดตด้วย F() ตาม signal ใน course_stats.py
+    สร้างใหม่ทั้งหมดได้ด้วย: python manage.py rebuild_course_stats
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    # IntegerField (ไม่ใช่ Positive): ถ้าตัวนับเพี้ยน การลบต้องไม่ทำให้ request ล้มเพราะ CHECK constraint
+    enrollment_count = models.IntegerField(default=0)   # ไม่นับ cancelled
+    completion_count = models.IntegerField(default=0)
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.BigIntegerField(default=0)              # เก็บผลรวม (ไม่ใช่ค่าเฉลี่ย) ให้บวก/ลบได้ตรง
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def average_rating(self):
+        return round(self.rating_sum / self.review_count, 2) if self.review_count else None
+
+    def __str__(self):
+        return f"stats:{self.course_id}"
 
 
 class Notification(models.Model):
@@ -429,10 +516,11 @@ class ImportantDocument(models.Model):
         
     )
     created_at = models.DateTimeField(auto_now_add=True)
-    
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["-created_at"], name="importantdoc_created_idx")]
 
     def __str__(self):
         return self.name
@@ -491,6 +579,8 @@ class Quiz(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     course = models.OneToOneField("Course", on_delete=models.CASCADE, related_name="quiz")
     title = models.CharField(max_length=255, blank=True, default="")
+    # แตะทุกครั้งที่ QuizSer แก้คำถาม/ตัวเลือก (ใช้ทำ ETag ของ course bundle)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["course_id"]
@@ -555,8 +645,11 @@ class Certificate(models.Model):
 
     # ⬇️ เพิ่มฟิลด์ที่ views ใช้
     serial_no = models.CharField(max_length=50, unique=True, db_index=True)
-    verification_code = models.CharField(max_length=32, unique=True, db_index=True)
+    # รหัสแบบลงลายเซ็น HMAC (cert_verify.make_verification_code) — ใบเก่าอาจเป็นรหัสสุ่ม 12 ตัว
+    verification_code = models.CharField(max_length=128, unique=True, db_index=True)
     issued_at = models.DateTimeField(auto_now_add=True)
+    # เพิกถอนแล้ว (ตรวจสอบสาธารณะจะตอบว่าไม่ valid)
+    revoked_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
                                 related_name="certificates")
@@ -571,14 +664,134 @@ class Certificate(models.Model):
 
     file = models.FileField(upload_to="certificates/%Y/%m/%d/", null=True, blank=True)
 
-    RENDER_STATUS = (("pending", "Pending"), ("done", "Done"), ("failed", "Failed"))
-    render_status = models.CharField(max_length=10, choices=RENDER_STATUS, default="pending")
+    RENDER_STATUS = (
+        ("pending", "Pending"),
+        ("rendering", "Rendering"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+    render_status = models.CharField(max_length=10, choices=RENDER_STATUS, default="pending", db_index=True)
     render_error = models.TextField(blank=True)
 
+    # คิว render เบื้องหลัง (ดู cert_jobs.py / manage.py run_certificate_jobs)
+    render_job = models.ForeignKey("CertificateRenderJob", on_delete=models.SET_NULL,
+                                   null=True, blank=True, related_name="certificates")
+    render_attempts = models.PositiveSmallIntegerField(default=0)
+    render_started_at = models.DateTimeField(null=True, blank=True)
+    # sha256 ของข้อมูลที่ใช้ render ไฟล์ปัจจุบัน (ดู cert_jobs.render_fingerprint) — ตรงกัน = ไม่ต้อง render ใหม่
+    render_fingerprint = models.CharField(max_length=64, blank=True, default="")
+
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
                                    null=True, blank=True, related_name="issued_certificates")
     created_at = models.DateTimeField(auto_now_add=True)
+    # ข้อมูลบนหน้าใบ (ชื่อ/คอร์ส/template) เปลี่ยนล่าสุด — enqueue ตั้งเองตอน bulk_update
+    # ใช้เป็น version ของ fingerprint PDF รวม (cert_export.combined_fingerprint)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = [("student", "course")]
-        ordering = ["-created_at"]
\ No newline at end of file
+        ordering = ["-created_at"]
+
+
+class CertificateRenderJob(models.Model):
+    """
+    งานออกใบประกาศแบบเบื้องหลัง: 1 job = การกด issue 1 ครั้งของคอร์ส
+    - Certificate ที่ต้อง render จะผูกกับ job ผ่าน Certificate.render_job
+    - worker (manage.py run_certificate_jobs) จองงานจาก render_status แล้วอัปเดตสถานะ job
+    """
+    STATUS = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="certificate_jobs")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                   null=True, blank=True, related_name="certificate_jobs")
+    status = models.CharField(max_length=10, choices=STATUS, default="queued", db_index=True)
+    total = models.PositiveIntegerField(default=0)
+    # ใบที่ข้ามเพราะ fingerprint ไม่เปลี่ยน (ไม่นับใน total)
+    skipped = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"CertificateRenderJob({self.course_id}, {self.status})"
+
+
+class CertificateExport(models.Model):
+    """
+    PDF รวมใบประกาศทั้งคอร์ส (export ?format=pdf) — worker (manage.py run_certificate_jobs) render
+    ลงไฟล์ แล้ว request ถัดไปส่งไฟล์นั้นแบบ stream (cert_export.py)
+    - fingerprint = ข้อมูลที่มีผลต่อ PDF ของทุกใบในคอร์ส; ตรงกับปัจจุบัน = ใช้ไฟล์/งานเดิม
+    """
+    STATUS = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="certificate_exports")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                   null=True, blank=True, related_name="certificate_exports")
+    status = models.CharField(max_length=10, choices=STATUS, default="queued", db_index=True)
+    fingerprint = models.CharField(max_length=64)
+    file = models.FileField(upload_to="certificate_exports/%Y/%m/", null=True, blank=True)
+    pages = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["course", "fingerprint"], name="cert_export_course_fp_idx")]
+
+    def __str__(self) -> str:
+        return f"CertificateExport({self.course_id}, {self.status})"
+
+
+class CourseDeletionJob(models.Model):
+    """
+    งานลบคอร์สแบบเบื้องหลัง: 1 job = การสั่งลบคอร์ส 1 ครั้ง
+    - คอร์สถูก tombstone (Course.deleted_at) ทันที แล้ว worker (manage.py run_course_deletions)
+      ลบแถวลูกทีละชุดและลบไฟล์ media ตามหลัง (course_deletion.py)
+    - course_id ไม่ใช่ FK: แถวคอร์สหายไปตอนจบงาน แต่ job ยังเก็บไว้ดูย้อนหลังในแอดมิน
+    """
+    STATUS = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course_id = models.UUIDField(db_index=True)
+    course_title = models.CharField(max_length=255, blank=True, default="")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                   null=True, blank=True, related_name="course_deletion_jobs")
+    status = models.CharField(max_length=10, choices=STATUS, default="queued", db_index=True)
+    # ขั้นที่กำลังลบ (ชื่อใน course_deletion.STEPS) + ความคืบหน้าสะสม
+    step = models.CharField(max_length=40, blank=True, default="")
+    deleted_rows = models.PositiveIntegerField(default=0)
+    files_deleted = models.PositiveIntegerField(default=0)
+    files_failed = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"CourseDeletionJob({self.course_id}, {self.status})"
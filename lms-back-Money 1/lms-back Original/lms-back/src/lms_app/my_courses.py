@@ -0,0 +1,35 @@
+# lms_app/my_courses.py
+"""
+"คอร์สของฉัน" (GET /api/courses/ ไม่มี filter) = คอร์สที่สอน + คอร์สที่ลงทะเบียน
+
+- แต่ละฝั่งอ่านจาก index (course.instructor_id / enrollment(student, course)) แล้ว lookup คอร์สตาม pk
+- UNION ALL ไม่ใช่ UNION: id ซ้ำไม่มีผลกับ IN -> ไม่ต้องตัดแถวซ้ำ (ไม่มี HashAggregate/Unique)
+- Postgres: id = ANY(ARRAY(...)) แทน id IN (subquery)
+  subquery ทำครั้งเดียวเป็น InitPlan แล้วอ่าน course ตาม pkey
+  (IN ให้ planner เลือก semi join ได้ ซึ่งอาจ unique-ify ด้วย HashAggregate หรือสแกน course ทั้งตาราง)
+"""
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import connections
+from django.db.models import BooleanField, F, Func
+
+from .models import Course, Enrollment
+
+
+class _AnyOf(Func):
+    # <lhs> = ANY(<array>)
+    arg_joiner = " = ANY("
+    template = "%(expressions)s)"
+    output_field = BooleanField()
+
+
+def my_course_ids(user):
+    return Course.objects.filter(instructor=user).values("pk").union(
+        Enrollment.objects.filter(student=user).values("course_id"), all=True
+    )
+
+
+def filter_my_courses(qs, user):
+    ids = my_course_ids(user)
+    if connections[qs.db].vendor == "postgresql":
+        return qs.filter(_AnyOf(F("pk"), ArraySubquery(ids)))
+    return qs.filter(pk__in=ids)
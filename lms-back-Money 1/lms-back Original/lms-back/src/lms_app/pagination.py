@@ -0,0 +1,56 @@
+# lms_app/pagination.py
+"""
+แบ่งหน้าแบบ cursor (keyset) ให้ list endpoint ที่ตารางโตได้ไม่จำกัด
+
+    GET /api/courses/                         -> [...]   (ไม่แบ่งหน้า เหมือนเดิม)
+    GET /api/courses/?page_size=50            -> {"next": ..., "previous": ..., "results": [...]}
+    GET /api/courses/?cursor=<จาก next>
+
+- แบ่งหน้าเฉพาะเมื่อ client ขอเองด้วย ?page_size= หรือ ?cursor= เท่านั้น
+  -> client เดิม (lms-app: listCourses ฯลฯ) ที่อ่าน response เป็น array ยังใช้ได้
+
+- ต้นทุนแต่ละหน้าคงที่ (WHERE <sort key> < ค่าที่ cursor เก็บไว้ + LIMIT) ไม่ใช้ OFFSET เหมือน PageNumber
+  -> ต้องมี index บน sort key (ดู Meta.indexes ของโมเดลที่ใช้)
+- ขนาดหน้าเริ่มต้น API_PAGE_SIZE, ขอเองได้ด้วย ?page_size= ไม่เกิน API_MAX_PAGE_SIZE
+- ถ้า view มี OrderingFilter และส่ง ?ordering= มา cursor จะใช้ field นั้นแทน ordering ของ class
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+from .course_search import RANK
+
+
+class KeysetCursorPagination(CursorPagination):
+    page_size_query_param = "page_size"
+    ordering = "-created_at"
+
+    def __init__(self):
+        # อ่านตอนสร้าง (ต่อ request) เพื่อให้ override_settings / env มีผล
+        self.page_size = getattr(settings, "API_PAGE_SIZE", 20)
+        self.max_page_size = getattr(settings, "API_MAX_PAGE_SIZE", 100)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # ไม่ได้ขอหน้า -> คืน None ให้ view ตอบเป็น list ทั้งหมดแบบเดิม
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class CourseCursorPagination(KeysetCursorPagination):
+    ordering = ("-updated_at", "-created_at")
+
+    def get_ordering(self, request, queryset, view):
+        # ผลค้นหา ?q= เรียงตามความตรง (course_search.search_courses) เว้นแต่ขอ ?ordering= เอง
+        if RANK in queryset.query.annotations and not request.query_params.get("ordering"):
+            return (f"-{RANK}", "-updated_at")
+        return super().get_ordering(request, queryset, view)
+
+
+class UserCursorPagination(KeysetCursorPagination):
+    ordering = "-date_joined"
+
+
+class CreatedAtCursorPagination(KeysetCursorPagination):
+    """Review / CourseMaterial / ImportantDocument / UniversityMember"""
+    ordering = "-created_at"
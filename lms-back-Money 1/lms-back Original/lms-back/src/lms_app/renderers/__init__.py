@@ -1,5 +1,5 @@
 
-from .pdf_renderer import render_certificate_pdf
+from .pdf_renderer import render_certificate_pdf, render_certificates_pdf
 from .image_renderer import render_certificate_image
 
-__all__ = ["render_certificate_pdf", "render_certificate_image"]
+__all__ = ["render_certificate_pdf", "render_certificates_pdf", "render_certificate_image"]
@@ -1,6 +1,12 @@
+import io
+import logging
+from contextlib import redirect_stdout
+from functools import lru_cache
 from pathlib import Path
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 BASE_DIR = Path(__file__).resolve().parent.parent  # -> lms_app/
 TEMPLATE_FILE = BASE_DIR / "templates" / "certificates" / "certificate.html"
 CSS_FILE = BASE_DIR / "static" / "css" / "certificate.css"
@@ -19,3 +25,46 @@ def absolute_media_path(relpath: str) -> str:
     """
     root = Path(getattr(settings, "MEDIA_ROOT", BASE_DIR / "media"))
     return str(root / relpath)
+
+def import_weasyprint():
+    """
+    import weasyprint โดยเก็บข้อความที่มันพิมพ์ลง stdout (เช่นตอนหา pango ไม่เจอ) ไปลง log แทน
+    ไม่ให้ปนกับ output ของคำสั่ง manage.py (เช่น JSON ของ bench_certificates)
+    import ไม่สำเร็จ -> โยน error เดิม (OSError/ImportError) ให้ผู้เรียกจัดการ
+    """
+    out = io.StringIO()
+    try:
+        with redirect_stdout(out):
+            import weasyprint
+    finally:
+        message = " ".join(out.getvalue().split())
+        if message:
+            logger.warning("WeasyPrint: %s", message)
+    return weasyprint
+
+
+@lru_cache(maxsize=1)
+def get_font_config():
+    """
+    FontConfiguration ตัวเดียวต่อ process: @font-face ใน CSS ถูกโหลดครั้งเดียว
+    แล้วใช้ร่วมกันทุกเอกสาร (ต้องส่งตัวเดียวกันทั้งตอนสร้าง CSS และตอน render)
+    """
+    import_weasyprint()
+    from weasyprint.text.fonts import FontConfiguration
+    return FontConfiguration()
+
+
+@lru_cache(maxsize=1)
+def get_stylesheet():
+    """
+    CSS ของ certificate ที่ parse แล้ว (ครั้งเดียวต่อ process)
+    ใช้ร่วมกันทั้ง pdf_renderer / image_renderer แทนการสร้าง CSS(filename=...) ทุกครั้ง
+    """
+    return import_weasyprint().CSS(filename=str(CSS_FILE), font_config=get_font_config())
+
+
+@lru_cache(maxsize=1)
+def get_template():
+    """Django template ของใบประกาศที่ compile แล้ว (ไม่ต้อง parse ไฟล์ใหม่ทุกใบ)"""
+    from django.template.loader import get_template as load_template
+    return load_template(str(TEMPLATE_FILE))
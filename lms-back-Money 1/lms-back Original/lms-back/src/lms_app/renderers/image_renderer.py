@@ -1,7 +1,8 @@
 from io import BytesIO
 from django.template.loader import render_to_string
-from weasyprint import HTML, CSS
-from .base import TEMPLATE_FILE, CSS_FILE, get_base_url
+from .base import TEMPLATE_FILE, get_base_url, get_stylesheet, import_weasyprint
+
+HTML = import_weasyprint().HTML
 
 def render_certificate_image(context: dict, out_path: str | None = None, dpi: int = 300) -> bytes:
     """
@@ -16,7 +17,7 @@ def render_certificate_image(context: dict, out_path: str | None = None, dpi: in
     # WeasyPrint รุ่นใหม่รองรับ write_png โดยตรง
     HTML(string=html, base_url=base_url).write_png(
         png_io,
-        stylesheets=[CSS(filename=str(CSS_FILE))],
+        stylesheets=[get_stylesheet()],
         resolution=dpi,
     )
     data = png_io.getvalue()
@@ -1,24 +1,78 @@
+import re
 from io import BytesIO
-from django.template.loader import render_to_string
-from weasyprint import HTML, CSS
-from .base import TEMPLATE_FILE, CSS_FILE, get_base_url
+from .base import get_base_url, get_font_config, get_stylesheet, get_template, import_weasyprint
 from reportlab.lib import colors
 
+HTML = import_weasyprint().HTML
+
+_BODY_RE = re.compile(r"<body[^>]*>(.*)</body>", re.IGNORECASE | re.DOTALL)
+_PAGE_BREAK = ' style="break-before: page"'
+
 def render_certificate_pdf(context: dict, out_path: str | None = None) -> bytes:
     """
     สร้าง PDF จาก template + context
     - ถ้าให้ out_path -> เขียนไฟล์ลงดิสก์ แล้ว return เนื้อไฟล์ (bytes)
     - ถ้าไม่ให้ -> return เป็น bytes อย่างเดียว
     """
-    html = render_to_string(str(TEMPLATE_FILE), context)
+    html = get_template().render(context)
     base_url = get_base_url()
     pdf_io = BytesIO()
     HTML(string=html, base_url=base_url).write_pdf(
         pdf_io,
-        stylesheets=[CSS(filename=str(CSS_FILE))],
+        stylesheets=[get_stylesheet()],
+        font_config=get_font_config(),
     )
     data = pdf_io.getvalue()
     if out_path:
         with open(out_path, "wb") as f:
             f.write(data)
     return data
+
+
+def _body(html: str) -> str:
+    """เนื้อใน <body> ของ template (ไม่มี <body> = ทั้งก้อน)"""
+    match = _BODY_RE.search(html)
+    return match.group(1) if match else html
+
+
+def render_certificates_document(contexts):
+    """
+    layout ทุก context ใน HTML เอกสารเดียว (รอบ layout เดียว) คั่นด้วย page break
+    ใช้ template ที่ compile แล้ว, CSS ที่ parse แล้ว และ FontConfiguration ตัวเดียวกัน
+    แต่ละใบขึ้นต้นด้วย anchor cert-<ลำดับ> -> คืน (Document, list ของหน้าแยกตามใบ)
+    """
+    template = get_template()
+    sections = "".join(
+        f'<section id="cert-{i}"{_PAGE_BREAK if i else ""}>{_body(template.render(ctx))}</section>'
+        for i, ctx in enumerate(contexts)
+    )
+    document = HTML(
+        string=f"<!DOCTYPE html><html><body>{sections}</body></html>",
+        base_url=get_base_url(),
+    ).render(stylesheets=[get_stylesheet()], font_config=get_font_config())
+
+    # หน้าที่มี anchor cert-i = หน้าแรกของใบที่ i (ใบที่ยาวหลายหน้าได้ทุกหน้าจนถึงใบถัดไป)
+    groups = []
+    for page in document.pages:
+        if any(name.startswith("cert-") for name in page.anchors) or not groups:
+            groups.append([])
+        groups[-1].append(page)
+    return document, groups
+
+
+def render_certificates_pdf(contexts, split: bool = False):
+    """
+    render หลายใบในรอบเดียว
+    - split=False -> bytes ของ PDF เดียว (ทุกหน้าของทุกใบต่อกันตามลำดับ contexts)
+    - split=True  -> list[bytes] PDF แยกรายคน (ตามลำดับ contexts) จาก layout ชุดเดียวกัน
+    """
+    contexts = list(contexts)
+    if not contexts:
+        return [] if split else b""
+
+    document, groups = render_certificates_document(contexts)
+    if not split:
+        return document.write_pdf()
+    if len(groups) != len(contexts):
+        raise ValueError(f"layout ได้ {len(groups)} ใบ จาก {len(contexts)} context")
+    return [document.copy(pages).write_pdf() for pages in groups]
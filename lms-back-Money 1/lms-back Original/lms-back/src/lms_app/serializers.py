@@ -11,6 +11,7 @@ from .models import (
     CoursePricing, InstructorInvitation, Curriculum, InstructorProfile,
     Complaint, Category, CourseMaterial, Scoring, ScoringItem,
     Quiz, QuizQuestion, QuizChoice, CertificateTemplate,AssignmentAttachment,
+    normalize_course_title, CourseStats,
 )
 
 from django.db import transaction, IntegrityError
@@ -22,6 +23,7 @@ from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth.hashers import check_password
 from django.core.validators import RegexValidator
 from django.db.models import Q
+from django.urls import reverse
 
 User = get_user_model()
 
@@ -280,10 +282,11 @@ class CourseChapterSerializer(serializers.ModelSerializer):
             "content",
             "position",       # field จริงใน DB
             "order",          # alias ใช้กับ FE
+            "rank",           # key เรียงลำดับ (chapter_rank.py)
             "cover_image",
             "cover_image_url",
         ]
-        read_only_fields = ["position"]
+        read_only_fields = ["position", "rank"]
 
     def get_cover_image_url(self, obj):
         request = self.context.get("request")
@@ -292,6 +295,14 @@ class CourseChapterSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(url) if request else url
         return None
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # ลำดับที่จริงตาม rank (view annotate/ตั้งไว้) — position ใน DB ไม่อัปเดตตอน move
+        rank_position = getattr(instance, "rank_position", None)
+        if rank_position is not None:
+            data["position"] = data["order"] = rank_position
+        return data
+
 
 # serializers.py
 class CourseMaterialSerializer(serializers.ModelSerializer):
@@ -325,6 +336,11 @@ class CourseMaterialSerializer(serializers.ModelSerializer):
 
 
 
+# FK ที่ CourseSerializer อ่าน (instructor_name / curriculum_name / category_*)
+# queryset ที่ส่งเข้า serializer นี้ควร select_related ไว้ ไม่งั้นเกิด query ต่อแถว
+COURSE_SERIALIZER_RELATED = ("instructor", "curriculum", "category", "stats")
+
+
 class CourseSerializer(serializers.ModelSerializer):
     banner_img = serializers.ImageField(use_url=True, required=False, allow_null=True)
     instructor_name  = serializers.CharField(source='instructor.full_name', read_only=True)
@@ -346,6 +362,9 @@ class CourseSerializer(serializers.ModelSerializer):
     # (ถ้ายังไม่มี) ช่วยให้ FE อ่าน id ของ curriculum ได้ชัดเจนขึ้น
     curriculum_id = serializers.UUIDField(source='curriculum.id', read_only=True)
 
+    # ตัวเลขบนการ์ดคอร์ส — อ่านจาก CourseStats (select_related) ไม่ COUNT/AVG ต่อแถว
+    stats = serializers.SerializerMethodField()
+
     class Meta:
         model = Course
         fields = [
@@ -360,6 +379,7 @@ class CourseSerializer(serializers.ModelSerializer):
 
             'instructor_name', 'curriculum_name',
             "duration_hours",
+            "stats",
         ]
         read_only_fields = ['id','instructor','university','status','created_at','updated_at']
         extra_kwargs = {'curriculum': {'required': False, 'allow_null': True}}
@@ -373,6 +393,19 @@ class CourseSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("The selected curriculum does not belong to your university.")
         return value
 
+    def get_stats(self, obj):
+        try:
+            stats = obj.stats
+        except CourseStats.DoesNotExist:
+            # คอร์สที่ยังไม่ได้ rebuild_course_stats
+            return {"enrollment_count": 0, "completion_count": 0, "review_count": 0, "average_rating": None}
+        return {
+            "enrollment_count": stats.enrollment_count,
+            "completion_count": stats.completion_count,
+            "review_count": stats.review_count,
+            "average_rating": stats.average_rating,
+        }
+
 
 class CourseUpdateSerializer(serializers.ModelSerializer):
     curriculum_id = serializers.PrimaryKeyRelatedField(
@@ -402,15 +435,15 @@ class CourseUpdateSerializer(serializers.ModelSerializer):
         user = getattr(request, 'user', None)
         norm = _norm_title(value)
 
-        qs = Course.objects.all()
-        if getattr(user, 'university', None):
-            qs = qs.filter(university=user.university)
+        qs = Course.objects.filter(normalized_title=normalize_course_title(norm))
+        if getattr(user, 'university_id', None):
+            qs = qs.filter(university_id=user.university_id)
 
         # exclude คอร์สตัวเองเวลาแก้ไข
         if self.instance:
             qs = qs.exclude(pk=self.instance.pk)
 
-        if qs.filter(title__iexact=norm).exists():
+        if qs.exists():
             raise serializers.ValidationError("มีชื่อคอร์สนี้อยู่แล้ว กรุณาใช้ชื่ออื่น")
 
         return norm
@@ -794,9 +827,13 @@ class CourseCreateSerializer(serializers.ModelSerializer):
         if not user or not getattr(user, "university_id", None):
             return norm
 
-        qs = Course.objects.filter(university=user.university)
+        # index (university, normalized_title) -> lookup ครั้งเดียว
+        qs = Course.objects.filter(
+            university_id=user.university_id,
+            normalized_title=normalize_course_title(norm),
+        )
 
-        if qs.filter(title__iexact=norm).exists():
+        if qs.exists():
             raise serializers.ValidationError("มีชื่อคอร์สนี้อยู่แล้ว กรุณาใช้ชื่ออื่น")
 
         return norm
@@ -934,7 +971,8 @@ class ScoringSerializer(serializers.ModelSerializer):
 
         with transaction.atomic():
             instance.pass_score = validated_data.get("pass_score", instance.pass_score)
-            instance.save(update_fields=["pass_score"])
+            # updated_at ต้องระบุเอง (auto_now ไม่ถูกเขียนถ้าไม่อยู่ใน update_fields)
+            instance.save(update_fields=["pass_score", "updated_at"])
 
             if items_provided and items_data is not None:
                 keep_ids = []
@@ -1035,7 +1073,8 @@ class QuizSer(serializers.ModelSerializer):
         with transaction.atomic():
             if title is not None:
                 instance.title = title
-                instance.save(update_fields=["title"])
+            # แตะ updated_at เสมอ (คำถามถูกสร้างใหม่ทั้งชุด) -> ETag ของ course bundle เปลี่ยน
+            instance.save(update_fields=["title", "updated_at"])
 
             # 1) ลบคำถาม/ตัวเลือกเดิมของควิซนี้ทั้งหมด
             #    (ถ้าคุณมี on_delete=CASCADE กับ Choice ก็พอแค่ลบ questions)
@@ -1085,6 +1124,7 @@ class CertificateTemplateSerializer(serializers.ModelSerializer):
 
 class CertificateSerializer(serializers.ModelSerializer):
     file_url = serializers.SerializerMethodField()
+    image_urls = serializers.SerializerMethodField()
     # (ถ้าต้องการ field ย่อยอื่น ๆ เช่น student_email, course_title เพิ่มได้ แต่ไม่บังคับ)
     class Meta:
         model = Certificate
@@ -1098,6 +1138,7 @@ class CertificateSerializer(serializers.ModelSerializer):
             "completion_date",
             "render_status",
             "file_url",
+            "image_urls",
         ]
         read_only_fields = fields
 
@@ -1108,6 +1149,16 @@ class CertificateSerializer(serializers.ModelSerializer):
         url = obj.file.url
         return req.build_absolute_uri(url) if req else url
 
+    def get_image_urls(self, obj):
+        # ลิงก์ lazy (cert_images.py) — ยังไม่ราสเตอร์จนกว่าจะมีคนเปิดรูป
+        from .cert_images import VARIANTS
+        req = self.context.get("request")
+        urls = {}
+        for variant in VARIANTS:
+            url = reverse("certificate-image", kwargs={"cert_id": obj.id, "variant": variant})
+            urls[variant] = req.build_absolute_uri(url) if req else url
+        return urls
+
 
 # ===== Endpoints ฝั่ง “issue” แบบยืดหยุ่น (ให้ตรงกับ views.py) =====
 
@@ -1,3 +1,1391 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.fields.files import FieldFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from reportlab.pdfbase import pdfmetrics
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import catalog_cache, cert_pdf_renderer, chapter_rank, course_deletion, course_search, course_stats
+from .cert_batch import BatchResult
+from .cert_export import build_combined_pdf, claim_export, combined_fingerprint, request_combined_pdf
+from .cert_jobs import (
+    MAX_RENDER_ATTEMPTS, bulk_issue_certificates, claim_certificates, enqueue_course_certificates,
+    ensure_certificate_file, refresh_job, render_certificates, retry_backoff,
+)
+from .cert_templates.layers import LAYERS
+from .cert_verify import REVOKED_CACHE_KEY, is_revoked, make_verification_code, parse_verification_code
+from .course_deletion import claim_job, process_job, schedule_course_deletion
+from .models import (
+    Category, Certificate, CertificateExport, CertificateTemplate, Course, CourseChapter, CourseDeletionJob,
+    CourseMaterial, CourseStats, Curriculum, Enrollment, Quiz, QuizChoice, QuizQuestion, Review, Scoring,
+    ScoringItem, University, User, normalize_course_title,
+)
+from .serializers import CourseCreateSerializer, CourseUpdateSerializer
+from .utils.file_response import serve_file
+from .views import CourseViewSet, UserViewSet
+from .views_course_bundle import CourseBundleView
+
+
+class BenchCertificatesCommandTests(SimpleTestCase):
+    def test_count_one_reports_every_style_as_json(self):
+        out = StringIO()
+        call_command("bench_certificates", "--count", "1", "--warmup", "0", "--fail-on-error", stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["count"], 1)
+        self.assertEqual(
+            [(r["backend"], r["style"]) for r in report["results"]],
+            [("reportlab", style) for style in LAYERS],
+        )
+        for result in report["results"]:
+            self.assertEqual(result["error"], "")
+            self.assertGreater(result["max_bytes"], 0)
+            self.assertGreaterEqual(result["rss_growth_kb"], 0)
+
+
+class CourseListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        Course.objects.bulk_create([
+            Course(title=f"C{i}", description="d", level="beginner", instructor=cls.instructor, status="active")
+            for i in range(5)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.instructor)
+
+    def test_list_without_page_params_is_a_bare_array(self):
+        # lms-app (listCourses / listMyCourses) อ่าน /api/courses/ เป็น CourseDTO[]
+        response = self.client.get("/api/courses/", {"instructor": "me"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 5)
+
+    def test_search_results_are_paginated(self):
+        Course.objects.filter(title__in=["C1", "C3"]).update(description="python basics")
+        ids, url, params = [], "/api/courses/", {"instructor": "me", "q": "python", "page_size": 1}
+        while url:
+            data = self.client.get(url, params).json()
+            ids += [course["id"] for course in data["results"]]
+            url, params = data["next"], None
+        matches = Course.objects.filter(description="python basics").values_list("pk", flat=True)
+        self.assertEqual(sorted(ids), sorted(str(pk) for pk in matches))
+
+    def test_page_size_returns_cursor_pages(self):
+        seen, url, params = [], "/api/courses/", {"instructor": "me", "page_size": 2}
+        while url:
+            data = self.client.get(url, params).json()
+            seen += [course["id"] for course in data["results"]]
+            url, params = data["next"], None
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+
+class ListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email="admin@example.com", password="p", full_name="Admin", is_staff=True
+        )
+        cls.course = Course.objects.create(
+            title="C", description="d", level="beginner", instructor=cls.admin, status="active"
+        )
+        cls.chapter = CourseChapter.objects.create(course=cls.course, title="ch")
+        base = timezone.now()
+        for i in range(5):
+            student = User.objects.create_user(email=f"s{i}@example.com", password="p", full_name=f"S{i}")
+            review = Review.objects.create(student=student, course=cls.course, rating=5, comment=str(i))
+            material = CourseMaterial.objects.create(chapter=cls.chapter, title=f"m{i}", type="pdf")
+            # เวลาไม่ซ้ำกัน -> ลำดับที่คาดไว้แน่นอน
+            Review.objects.filter(pk=review.pk).update(created_at=base - timedelta(minutes=i))
+            CourseMaterial.objects.filter(pk=material.pk).update(created_at=base - timedelta(minutes=i))
+            User.objects.filter(pk=student.pk).update(date_joined=base - timedelta(minutes=i))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def walk(self, url, params):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids += [row["id"] for row in data["results"]]
+            url, params, pages = data["next"], None, pages + 1
+        return ids, pages
+
+    def assertPages(self, url, params, expected_ids):
+        ids, pages = self.walk(url, {**params, "page_size": 2})
+        self.assertEqual(ids, [str(pk) for pk in expected_ids])
+        self.assertEqual(pages, 3)
+
+        bare = self.client.get(url, params).json()
+        self.assertIsInstance(bare, list)
+        self.assertEqual([row["id"] for row in bare], [str(pk) for pk in expected_ids])
+
+    def test_reviews(self):
+        expected = Review.objects.filter(course=self.course).order_by("-created_at").values_list("pk", flat=True)
+        self.assertPages("/api/reviews/", {"course_id": str(self.course.pk)}, list(expected))
+
+    def test_materials(self):
+        expected = CourseMaterial.objects.filter(chapter=self.chapter).order_by("-created_at").values_list("pk", flat=True)
+        self.assertPages("/api/materials/", {"chapter": str(self.chapter.pk)}, list(expected))
+
+    def test_users(self):
+        # UserViewSet ไม่ได้ลง router -> เรียก view ตรง ๆ
+        view = UserViewSet.as_view({"get": "list"})
+        factory = APIRequestFactory()
+
+        def walk(params):
+            ids, url = [], "/users/"
+            while url:
+                request = factory.get(url, params)
+                force_authenticate(request, self.admin)
+                data = view(request).data
+                ids += [str(row["id"]) for row in data["results"]]
+                url, params = data["next"], None
+            return ids
+
+        expected = User.objects.order_by("-date_joined").values_list("pk", flat=True)
+        self.assertEqual(walk({"page_size": 2}), [str(pk) for pk in expected])
+        # ?ordering= -> cursor ใช้ field นั้นแทน
+        expected = User.objects.order_by("full_name").values_list("pk", flat=True)
+        self.assertEqual(walk({"page_size": 4, "ordering": "full_name"}), [str(pk) for pk in expected])
+
+    @override_settings(API_MAX_PAGE_SIZE=3)
+    def test_page_size_is_capped(self):
+        data = self.client.get("/api/reviews/", {"course_id": str(self.course.pk), "page_size": 50}).json()
+        self.assertEqual(len(data["results"]), 3)
+        self.assertIsNotNone(data["next"])
+
+
+class NormalizedTitleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.university = University.objects.create(name="U", email_domain="example.com")
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR",
+            university=cls.university,
+        )
+        cls.course = Course.objects.create(
+            title="  Python   101 ", description="d", level="beginner", instructor=cls.instructor,
+            university=cls.university, status="active",
+        )
+
+    def context(self):
+        request = APIRequestFactory().post("/api/courses/")
+        request.user = self.instructor
+        return {"request": request}
+
+    def test_normalize_course_title(self):
+        self.assertEqual(normalize_course_title("  PYTHON\t 101 "), "python 101")
+        self.assertEqual(normalize_course_title("Stra\u00dfe"), normalize_course_title("STRASSE"))
+        # NFD (e + combining acute) == NFC
+        self.assertEqual(normalize_course_title("Cafe\u0301"), normalize_course_title("Caf\u00e9"))
+
+    def test_save_keeps_the_column_in_sync(self):
+        self.assertEqual(self.course.normalized_title, "python 101")
+        self.course.title = "Python 102"
+        self.course.save(update_fields=["title"])
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.normalized_title, "python 102")
+
+    def test_duplicate_title_is_rejected_in_the_same_university(self):
+        create = CourseCreateSerializer(data={"title": "python 101", "description": "d", "level": "beginner"},
+                                        context=self.context())
+        self.assertFalse(create.is_valid())
+        self.assertIn("title", create.errors)
+
+        update = CourseUpdateSerializer(instance=self.course, data={"title": "PYTHON 101"}, partial=True,
+                                        context=self.context())
+        self.assertTrue(update.is_valid(), update.errors)
+
+        other = University.objects.create(name="V", email_domain="other.example.com")
+        Course.objects.filter(pk=self.course.pk).update(university=other)
+        create = CourseCreateSerializer(data={"title": "python 101", "description": "d", "level": "beginner"},
+                                        context=self.context())
+        self.assertTrue(create.is_valid(), create.errors)
+
+    def test_title_iexact_filter_uses_the_normalized_column(self):
+        self.client.force_login(self.instructor)
+        response = self.client.get("/api/courses/", {"title__iexact": " python  101"})
+        self.assertEqual([c["id"] for c in response.json()], [str(self.course.pk)])
+        self.assertEqual(self.client.get("/api/courses/", {"title__iexact": "python 1"}).json(), [])
+
+
+class CourseSearchTokenTests(SimpleTestCase):
+    def test_thai_is_split_into_bigrams(self):
+        self.assertEqual(
+            course_search.document_tokens("ไพธอน"),
+            [course_search._thai(pair) for pair in ("ไพ", "พธ", "ธอ", "อน")],
+        )
+
+    def test_query_inside_a_thai_word_matches_its_bigrams(self):
+        document = set(course_search.document_tokens("เรียนไพธอนเบื้องต้น"))
+        self.assertLessEqual(set(course_search.query_terms("พธอ")), document)
+        self.assertFalse(set(course_search.query_terms("จาวา")) <= document)
+
+    def test_latin_terms_are_casefolded_prefixes(self):
+        self.assertEqual(course_search.document_tokens("Python 101"), ["python", "101"])
+        self.assertEqual(course_search.query_terms("PYTH pyth 10"), ["pyth:*", "10:*"])
+        self.assertEqual(course_search.query_terms("ก"), [course_search._thai("ก") + ":*"])
+        self.assertEqual(course_search.query_terms(" ,. "), [])
+
+
+@override_settings(QUERY_BUDGET_MODE="raise", CATALOG_CACHE_SECONDS=0)
+class CourseListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        university = University.objects.create(name="U", email_domain="example.com")
+        curriculum = Curriculum.objects.create(name="cur", university=university)
+        categories = [Category.objects.create(name=f"cat{i}") for i in range(5)]
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        courses = Course.objects.bulk_create([
+            Course(
+                title=f"C{i}", description="d", level="beginner", instructor=cls.instructor,
+                category=categories[i % 5], curriculum=curriculum, status="active",
+            )
+            for i in range(100)
+        ])
+        CourseStats.objects.bulk_create([
+            CourseStats(course=course, enrollment_count=i, review_count=1, rating_sum=4)
+            for i, course in enumerate(courses)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.instructor)
+
+    def list_queries(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/courses/", {"instructor": "me", "page_size": page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), page_size)
+        return len(ctx)
+
+    def test_page_of_100_courses_with_stats_is_flat(self):
+        # session + user + หน้าเดียว (instructor/curriculum/category/stats อยู่ใน JOIN; ETag มาจากแถวของหน้า)
+        # ส่วน list() ยังอยู่ใต้ CourseViewSet.list_query_budget ด้วย (QUERY_BUDGET_MODE="raise")
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/courses/", {"instructor": "me", "page_size": 100})
+        courses = response.json()["results"]
+        self.assertEqual(len(courses), 100)
+        self.assertEqual(sorted(course["stats"]["enrollment_count"] for course in courses), list(range(100)))
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.assertEqual(self.list_queries(10), self.list_queries(100))
+
+
+class RunCourseDeletionsCommandTests(TestCase):
+    def test_job_option_exits_without_once(self):
+        instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        course = Course.objects.create(
+            title="C", description="d", level="beginner", instructor=instructor, status="active"
+        )
+        job = schedule_course_deletion(course, actor=instructor)
+
+        out = StringIO()
+        call_command("run_course_deletions", "--job", str(job.id), "--sleep", "0", stdout=out)
+        self.assertIn("done=1 failed=0", out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertFalse(Course.all_objects.filter(pk=course.pk).exists())
+
+        # job เสร็จแล้ว -> จองไม่ได้ ก็ต้องออกเหมือนกัน
+        out = StringIO()
+        call_command("run_course_deletions", "--job", str(job.id), "--sleep", "0", stdout=out)
+        self.assertIn("done=0 failed=0", out.getvalue())
+
+
+class CourseDeletionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        cls.course = Course.objects.create(
+            title="C", description="d", level="beginner", instructor=cls.instructor, status="active"
+        )
+        chapter = CourseChapter.objects.create(course=cls.course, title="ch")
+        for i in range(5):
+            student = User.objects.create_user(email=f"s{i}@example.com", password="p", full_name=f"S{i}")
+            Enrollment.objects.create(student=student, course=cls.course, status="completed")
+            Review.objects.create(student=student, course=cls.course, rating=5, comment="ok")
+            CourseMaterial.objects.create(chapter=chapter, title=f"m{i}", type="pdf")
+
+    def setUp(self):
+        self.client.force_login(self.instructor)
+
+    def test_delete_tombstones_the_course_at_once(self):
+        response = self.client.delete(f"/api/courses/{self.course.pk}/")
+        self.assertEqual(response.status_code, 202)
+        job = CourseDeletionJob.objects.get(pk=response.data["job_id"])
+        self.assertEqual(job.status, "queued")
+
+        self.assertFalse(Course.objects.filter(pk=self.course.pk).exists())
+        self.assertTrue(Course.all_objects.filter(pk=self.course.pk).exists())
+        self.assertEqual(self.client.get(f"/api/courses/{self.course.pk}/").status_code, 404)
+        # ข้อมูลลูกยังอยู่จนกว่า worker จะลบ
+        self.assertEqual(Enrollment.objects.filter(course_id=self.course.pk).count(), 5)
+
+        # ลบซ้ำระหว่างรอ worker -> job เดิม
+        again = self.client.delete(f"/api/courses/{self.course.pk}/cascade/")
+        self.assertEqual(again.status_code, 404)
+        self.assertEqual(schedule_course_deletion(Course.all_objects.get(pk=self.course.pk)).pk, job.pk)
+
+    def test_protected_rows_block_plain_delete(self):
+        blocker = Enrollment.objects.filter(course=self.course).first()
+        with mock.patch("lms_app.views.protected_objects", return_value=[blocker]) as check:
+            response = self.client.delete(f"/api/courses/{self.course.pk}/")
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.data["blocked_by"], [str(blocker)])
+            self.assertTrue(Course.objects.filter(pk=self.course.pk).exists())
+            self.assertFalse(CourseDeletionJob.objects.exists())
+
+            forced = self.client.delete(f"/api/courses/{self.course.pk}/", QUERY_STRING="force=1&cascade=1")
+            self.assertEqual(forced.status_code, 202)
+        check.assert_called_once()
+
+    def test_protected_objects_is_empty_without_protect_relations(self):
+        self.assertEqual(course_deletion.protected_objects(self.course), [])
+
+    def test_worker_deletes_children_in_batches(self):
+        job = schedule_course_deletion(self.course, self.instructor)
+        claimed = claim_job(job.pk)
+
+        with mock.patch("lms_app.course_deletion.delete_batch", wraps=course_deletion.delete_batch) as batch:
+            self.assertTrue(process_job(claimed, batch_size=2))
+
+        # 5 แถว / ชุดละ 2 -> 3 ชุดต่อขั้น (2, 2, 1)
+        calls = [c.args[1] for c in batch.call_args_list]
+        for step in ("materials", "enrollments", "reviews"):
+            self.assertEqual(calls.count(step), 3, step)
+        for step, *_ in course_deletion.STEPS:
+            self.assertIn(step, calls)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.step), ("done", ""))
+        self.assertGreaterEqual(job.deleted_rows, 15)
+        self.assertFalse(Course.all_objects.filter(pk=self.course.pk).exists())
+        for model in (Enrollment, Review, CourseChapter):
+            self.assertFalse(model.objects.filter(course_id=self.course.pk).exists(), model)
+        self.assertFalse(CourseMaterial.objects.filter(chapter__course_id=self.course.pk).exists())
+
+
+class CourseStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        cls.course, cls.other = [
+            Course.objects.create(
+                title=title, description="d", level="beginner", instructor=cls.instructor, status="active"
+            )
+            for title in ("C", "D")
+        ]
+        cls.students = [
+            User.objects.create_user(email=f"s{i}@example.com", password="p", full_name=f"S{i}")
+            for i in range(3)
+        ]
+
+    def counts(self, course=None):
+        stats = CourseStats.objects.get(course=course or self.course)
+        return {field: getattr(stats, field) for field in course_stats.STAT_FIELDS}
+
+    def assertCounts(self, enrolled, completed, reviews, rating_sum, course=None):
+        course = course or self.course
+        self.assertEqual(self.counts(course), {
+            "enrollment_count": enrolled, "completion_count": completed,
+            "review_count": reviews, "rating_sum": rating_sum,
+        })
+        # ตัวนับแบบ incremental ต้องตรงกับการนับใหม่จาก DB
+        self.assertEqual(self.counts(course), course_stats.compute_stats([course.pk])[course.pk])
+
+    def test_new_course_starts_at_zero(self):
+        self.assertCounts(0, 0, 0, 0)
+
+    def test_enrollment_status_changes_apply_deltas(self):
+        enrollments = [Enrollment.objects.create(student=s, course=self.course) for s in self.students]
+        self.assertCounts(3, 0, 0, 0)
+
+        enrollments[0].status = "completed"
+        enrollments[0].save()
+        enrollments[1].status = "cancelled"
+        enrollments[1].save()
+        self.assertCounts(2, 1, 0, 0)
+
+        enrollments[0].delete()
+        self.assertCounts(1, 0, 0, 0)
+
+        # ย้ายคอร์ส: ลบจากคอร์สเดิม บวกให้คอร์สใหม่
+        enrollments[2].course = self.other
+        enrollments[2].save()
+        self.assertCounts(0, 0, 0, 0)
+        self.assertCounts(1, 0, 0, 0, course=self.other)
+
+    def test_updates_use_f_expressions(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        with CaptureQueriesContext(connection) as ctx:
+            Enrollment.objects.create(student=self.students[1], course=self.course)
+        sql = [q["sql"] for q in ctx.captured_queries if "lms_app_coursestats" in q["sql"]]
+        self.assertEqual(len(sql), 1)
+        self.assertIn('"enrollment_count" = ("lms_app_coursestats"."enrollment_count" + 1)', sql[0])
+
+    def test_review_rating_changes(self):
+        review = Review.objects.create(student=self.students[0], course=self.course, rating=4, comment="ok")
+        Review.objects.create(student=self.students[1], course=self.course, rating=2, comment="meh")
+        self.assertCounts(0, 0, 2, 6)
+        self.assertEqual(CourseStats.objects.get(course=self.course).average_rating, 3)
+
+        review.rating = 5
+        review.save()
+        self.assertCounts(0, 0, 2, 7)
+        review.delete()
+        self.assertCounts(0, 0, 1, 2)
+
+    def test_deferred_rows_recount_the_course(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        enrollment = Enrollment.objects.only("id", "course_id").get(student=self.students[0])
+        enrollment.status = "completed"
+        enrollment.save()
+        self.assertCounts(1, 1, 0, 0)
+
+    def test_missing_stats_row_is_rebuilt(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        CourseStats.objects.filter(course=self.course).delete()
+        Enrollment.objects.create(student=self.students[1], course=self.course)
+        self.assertCounts(2, 0, 0, 0)
+
+    def test_rebuild_command_reconciles_drift(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course, status="completed")
+        # bulk_create / update() ไม่ส่ง signal -> ตัวนับเพี้ยน
+        Enrollment.objects.bulk_create([Enrollment(student=self.students[1], course=self.course)])
+        CourseStats.objects.filter(course=self.other).update(review_count=9)
+
+        out = StringIO()
+        call_command("rebuild_course_stats", "--dry-run", stdout=out)
+        self.assertIn("courses=2 would fix=2", out.getvalue())
+        self.assertEqual(self.counts()["enrollment_count"], 1)
+
+        out = StringIO()
+        call_command("rebuild_course_stats", "--batch-size", "1", stdout=out)
+        self.assertIn("courses=2 fixed=2", out.getvalue())
+        self.assertCounts(2, 1, 0, 0)
+        self.assertCounts(0, 0, 0, 0, course=self.other)
+
+
+class ChapterRankKeyTests(SimpleTestCase):
+    def assertValidKeys(self, keys):
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        for key in keys:
+            self.assertTrue(key)
+            self.assertFalse(key.endswith("0"), key)
+            self.assertLessEqual(len(key), chapter_rank.MAX_LENGTH)
+
+    def test_key_between_sorts_between_its_bounds(self):
+        bounds = [(None, None), (None, "1"), ("z", None), ("a", "b"), ("a", "a1"), ("az", "b"), ("1", "2"), ("h", "h01")]
+        for before, after in bounds:
+            key = chapter_rank.key_between(before, after)
+            self.assertFalse(key.endswith("0"), (before, after, key))
+            if before is not None:
+                self.assertLess(before, key)
+            if after is not None:
+                self.assertLess(key, after)
+
+    def test_key_between_rejects_reversed_bounds(self):
+        with self.assertRaises(chapter_rank.RankError):
+            chapter_rank.key_between("b", "a")
+        with self.assertRaises(chapter_rank.RankError):
+            chapter_rank.key_between("a", "a")
+
+    def test_repeated_inserts_at_the_front(self):
+        keys = [chapter_rank.key_between()]
+        for _ in range(200):
+            keys.insert(0, chapter_rank.key_between(None, keys[0]))
+        self.assertValidKeys(keys)
+
+    def test_repeated_inserts_after_the_first(self):
+        keys = [chapter_rank.key_between()]
+        keys.append(chapter_rank.key_between(keys[0]))
+        for _ in range(200):
+            keys.insert(1, chapter_rank.key_between(keys[0], keys[1]))
+        self.assertValidKeys(keys)
+
+    def test_spread_is_unique_and_sorted(self):
+        for n in (0, 1, 2, 35, 36, 37, 1000, 5000):
+            keys = chapter_rank.spread(n)
+            self.assertEqual(len(keys), n)
+            self.assertValidKeys(keys)
+
+
+class ChapterMoveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        cls.course = Course.objects.create(
+            title="C", description="d", level="beginner", instructor=cls.instructor, status="active"
+        )
+        cls.chapters = [CourseChapter.objects.create(course=cls.course, title=f"ch{i}") for i in range(4)]
+
+    def order(self):
+        return list(
+            CourseChapter.objects.filter(course=self.course)
+            .order_by(*chapter_rank.ORDERING)
+            .values_list("title", flat=True)
+        )
+
+    def test_move_between_duplicate_ranks_rebalances(self):
+        a, b, c, d = self.chapters
+        # ย้ายพร้อมกันสองคนได้ key เดียวกัน
+        CourseChapter.objects.filter(pk__in=[a.pk, b.pk]).update(rank=a.rank)
+
+        chapter_rank.move_chapter(d, after_id=a.pk, before_id=b.pk)
+
+        self.assertEqual(self.order(), ["ch0", "ch3", "ch1", "ch2"])
+        ranks = list(CourseChapter.objects.filter(course=self.course).values_list("rank", flat=True))
+        self.assertEqual(len(set(ranks)), len(ranks))
+
+    def test_reorder_endpoint_sets_position_and_rank(self):
+        self.client.force_login(self.instructor)
+        ids = [str(chapter.pk) for chapter in reversed(self.chapters)]
+
+        response = self.client.post("/api/chapters/reorder/", {"ordered_ids": ids}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.order(), ["ch3", "ch2", "ch1", "ch0"])
+        rows = CourseChapter.objects.filter(course=self.course).order_by("position")
+        self.assertEqual([str(row.pk) for row in rows], ids)
+        self.assertEqual([row.position for row in rows], [1, 2, 3, 4])
+        listed = self.client.get("/api/chapters/", {"course": str(self.course.pk)}).json()
+        self.assertEqual([(item["id"], item["order"]) for item in listed], [(pk, i) for i, pk in enumerate(ids, 1)])
+
+
+@override_settings(CATALOG_CACHE_SECONDS=0)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        cls.category = Category.objects.create(name="cat")
+        cls.course = Course.objects.create(
+            title="C", description="d", level="beginner", instructor=cls.instructor,
+            category=cls.category, status="active",
+        )
+        cls.chapter = CourseChapter.objects.create(course=cls.course, title="ch")
+
+    def setUp(self):
+        self.client.force_login(self.instructor)
+
+    def assertRevalidates(self, url, params=None, touch=None):
+        first = self.client.get(url, params)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first["ETag"])
+
+        second = self.client.get(url, params, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertFalse(second.content)
+
+        if touch is not None:
+            touch()
+            third = self.client.get(url, params, HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(third.status_code, 200)
+            self.assertNotEqual(third["ETag"], first["ETag"])
+        return first
+
+    def rename_chapter(self):
+        self.chapter.title = "renamed"
+        self.chapter.save()
+
+    def rename_category(self):
+        self.category.name = "renamed"
+        self.category.save()
+
+    def rename_instructor(self):
+        self.instructor.full_name = "Renamed"
+        self.instructor.save()
+
+    def test_course_list_and_retrieve(self):
+        self.assertRevalidates("/api/courses/", {"instructor": "me"}, touch=self.rename_category)
+        first = self.assertRevalidates(f"/api/courses/{self.course.pk}/", touch=self.rename_instructor)
+        # ชื่อจากแถวอื่นไม่มีเวลาให้เทียบ -> ไม่ส่ง Last-Modified
+        self.assertFalse(first.has_header("Last-Modified"))
+
+    def test_list_etag_follows_rows_on_the_page(self):
+        params = {"instructor": "me", "page_size": 1}
+        first = self.client.get("/api/courses/", params)
+        Course.objects.create(title="D", description="d", level="beginner", instructor=self.instructor, status="active")
+        second = self.client.get("/api/courses/", params, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual([course["title"] for course in second.json()["results"]], ["D"])
+
+    def test_chapter_list_and_retrieve(self):
+        params = {"course": str(self.course.pk)}
+        self.assertRevalidates("/api/chapters/", params, touch=self.rename_chapter)
+        self.assertRevalidates(f"/api/chapters/{self.chapter.pk}/", touch=self.rename_chapter)
+
+        # บทอื่นถูกย้ายมาไว้ก่อน -> ลำดับของบทนี้เปลี่ยน
+        first = self.client.get(f"/api/chapters/{self.chapter.pk}/")
+        other = CourseChapter.objects.create(course=self.course, title="other")
+        chapter_rank.move_chapter(other, before_id=self.chapter.pk)
+        second = self.client.get(f"/api/chapters/{self.chapter.pk}/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()["order"], 2)
+
+    def test_retrieve_honours_if_modified_since(self):
+        material = CourseMaterial.objects.create(chapter=self.chapter, title="m", type="pdf")
+        url = f"/api/materials/{material.pk}/"
+        first = self.client.get(url)
+        second = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(second.status_code, 304)
+
+
+class CourseBundleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        cls.course = Course.objects.create(
+            title="C", description="d", level="beginner", instructor=cls.instructor, status="active"
+        )
+        cls.quiz = Quiz.objects.create(course=cls.course, title="q")
+        cls.scoring = Scoring.objects.create(course=cls.course, pass_score=50)
+        cls.grow(2)
+
+    @classmethod
+    def grow(cls, n):
+        """เพิ่มบทละ 2 สื่อ, คำถามละ 2 ตัวเลือก และรายการเกณฑ์ อย่างละ n"""
+        start = QuizQuestion.objects.filter(quiz=cls.quiz).count()
+        for i in range(start, start + n):
+            chapter = CourseChapter.objects.create(course=cls.course, title=f"ch{i}")
+            for j in range(2):
+                CourseMaterial.objects.create(chapter=chapter, title=f"m{i}.{j}", type="pdf")
+            question = QuizQuestion.objects.create(quiz=cls.quiz, order=i + 1, type="single", title=f"q{i}")
+            for j in range(2):
+                QuizChoice.objects.create(question=question, order=j + 1, text=f"c{j}")
+            ScoringItem.objects.create(scoring=cls.scoring, description=f"s{i}", order=i)
+
+    def get(self, user=None, **headers):
+        request = APIRequestFactory().get(f"/api/courses/{self.course.pk}/bundle/", headers=headers)
+        force_authenticate(request, user or self.instructor)
+        with CaptureQueriesContext(connection) as ctx:
+            response = CourseBundleView.as_view()(request, course_id=self.course.pk)
+        if hasattr(response, "render"):
+            response.render()
+        return response, len(ctx.captured_queries)
+
+    def test_bundle_contains_the_whole_tree(self):
+        response, _ = self.get()
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data["course"]["id"], str(self.course.pk))
+        self.assertEqual([c["title"] for c in data["chapters"]], ["ch0", "ch1"])
+        self.assertEqual([len(c["materials"]) for c in data["chapters"]], [2, 2])
+        self.assertIsNotNone(data["quiz"])
+        self.assertIsNotNone(data["scoring"])
+
+    def test_query_count_does_not_grow_with_the_course(self):
+        _, small = self.get()
+        self.grow(5)
+        response, large = self.get()
+        self.assertEqual(len(response.data["chapters"]), 7)
+        self.assertEqual(small, large)
+        # version + คอร์ส + prefetch 5 ชั้น
+        self.assertEqual(large, 7)
+
+    def test_if_none_match_returns_304_after_one_query(self):
+        first, _ = self.get()
+        etag = first["ETag"]
+        second, queries = self.get(**{"If-None-Match": etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], etag)
+        self.assertEqual(queries, 1)
+
+    def test_etag_follows_every_level(self):
+        def etag():
+            return self.get()[0]["ETag"]
+
+        seen = {etag()}
+        changes = (
+            lambda: CourseMaterial.objects.filter(chapter__course=self.course).first().save(),
+            lambda: QuizChoice.objects.filter(question__quiz=self.quiz).first().delete(),
+            lambda: ScoringItem.objects.create(scoring=self.scoring, description="new", order=99),
+            lambda: CourseChapter.objects.filter(course=self.course).first().delete(),
+        )
+        for change in changes:
+            change()
+            current = etag()
+            self.assertNotIn(current, seen)
+            seen.add(current)
+
+    def test_only_the_instructor_or_staff(self):
+        other = User.objects.create_user(email="o@example.com", password="p", full_name="O")
+        self.assertEqual(self.get(other)[0].status_code, 403)
+        other.is_staff = True
+        other.save()
+        self.assertEqual(self.get(other)[0].status_code, 200)
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.university = University.objects.create(name="U", email_domain="example.com")
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        cls.other = User.objects.create_user(email="other@example.com", password="p", full_name="Other")
+        cls.course = Course.objects.create(
+            title="C", description="d", level="beginner", instructor=cls.instructor,
+            university=cls.university, status="active",
+        )
+
+    def setUp(self):
+        # cache ที่แชร์ข้ามโปรเซสได้ (แทน Redis ของ production)
+        location = self.enterContext(tempfile.TemporaryDirectory())
+        shared = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location}
+        self.enterContext(override_settings(CACHES={**settings.CACHES, "catalog": shared}))
+        self.client.force_login(self.instructor)
+
+    def titles(self, params=None):
+        return [course["title"] for course in self.client.get("/api/courses/", params).json()]
+
+    def test_disabled_without_shared_backend(self):
+        self.assertTrue(catalog_cache.enabled())
+        local = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        with override_settings(CACHES={**settings.CACHES, "catalog": local}):
+            self.assertFalse(catalog_cache.enabled())
+        with override_settings(CATALOG_CACHE_SECONDS=0):
+            self.assertFalse(catalog_cache.enabled())
+
+    def test_hit_answers_without_touching_the_course_tables(self):
+        first = self.client.get("/api/courses/")
+        self.assertEqual(first.status_code, 200)
+
+        # เหลือแค่ session + user ของการ login
+        with self.assertNumQueries(2):
+            second = self.client.get("/api/courses/")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+        with self.assertNumQueries(2):
+            revalidated = self.client.get("/api/courses/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_shared_listing_is_reused_across_users(self):
+        params = {"university_id": str(self.university.pk)}
+        first = self.client.get("/api/courses/", params)
+
+        self.client.force_login(self.other)
+        with self.assertNumQueries(2):
+            second = self.client.get("/api/courses/", params)
+        self.assertEqual(second.json(), first.json())
+
+    def test_my_courses_is_isolated_between_users(self):
+        self.assertEqual(self.titles(), ["C"])
+        self.client.force_login(self.other)
+        self.assertEqual(self.titles(), [])
+
+    def test_save_invalidates(self):
+        self.assertEqual(self.titles(), ["C"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = "Renamed"
+            self.course.save()
+        self.assertEqual(self.titles(), ["Renamed"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.instructor.full_name = "New name"
+            self.instructor.save()
+        names = [course["instructor_name"] for course in self.client.get("/api/courses/").json()]
+        self.assertEqual(names, ["New name"])
+
+
+class FontRegistrationTests(SimpleTestCase):
+    DATA = {
+        "student_name": "นักเรียน ทดสอบ", "course_name": "คอร์ส", "instructor_name": "ผู้สอน",
+        "completion_date": "01/01/2026", "style": "classic",
+        "primary_color": "#881337", "secondary_color": "#1f2937",
+    }
+
+    def setUp(self):
+        # ทะเบียนฟอนต์ของ reportlab และสถานะใน module เป็นของทั้ง process -> คืนค่าหลังจบเทสต์
+        self.enterContext(mock.patch.dict(pdfmetrics._fonts))
+        self.enterContext(mock.patch.dict(
+            cert_pdf_renderer._font_state, {"registered": False, "fallback": False, "error": ""}
+        ))
+
+    def test_fonts_are_parsed_once_per_process(self):
+        with mock.patch("lms_app.cert_pdf_renderer.TTFont", wraps=cert_pdf_renderer.TTFont) as ttf:
+            threads = [threading.Thread(target=cert_pdf_renderer.register_fonts) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertTrue(cert_pdf_renderer.register_fonts())
+        self.assertEqual(ttf.call_count, len(cert_pdf_renderer.FONT_FILES))
+        self.assertEqual(cert_pdf_renderer.font_status(), {"registered": True, "fallback": False, "error": ""})
+        self.assertIsInstance(pdfmetrics.getFont("Sarabun"), cert_pdf_renderer.TTFont)
+
+    def test_missing_ttf_falls_back_to_helvetica(self):
+        missing = {name: "missing.ttf" for name in cert_pdf_renderer.FONT_FILES}
+        with mock.patch.dict(cert_pdf_renderer.FONT_FILES, missing):
+            with self.assertLogs("lms_app.cert_pdf_renderer", "WARNING"):
+                self.assertFalse(cert_pdf_renderer.register_fonts())
+        status = cert_pdf_renderer.font_status()
+        self.assertTrue(status["registered"] and status["fallback"])
+        self.assertIn("missing.ttf", status["error"])
+        for name, face in cert_pdf_renderer.FALLBACK_FACES.items():
+            self.assertEqual(pdfmetrics.getFont(name).face.name, face)
+
+        # template ยังวาดได้ด้วยฟอนต์สำรอง
+        pdf = cert_pdf_renderer.render_certificate_bytes(self.DATA, invariant=True)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+
+class ServeFileTests(SimpleTestCase):
+    DATA = bytes(range(256)) * 4
+
+    def setUp(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        name = default_storage.save("exports/data.bin", ContentFile(self.DATA))
+        self.file = FieldFile(None, CertificateExport._meta.get_field("file"), name)
+        self.factory = RequestFactory()
+        full = self.serve()
+        self.etag, self.last_modified = full["ETag"], full["Last-Modified"]
+
+    def serve(self, **headers):
+        request = self.factory.get("/file", headers=headers)
+        return serve_file(request, self.file, filename="data.bin", content_type="application/octet-stream")
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_response(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.DATA)
+        self.assertEqual(response["Content-Length"], str(len(self.DATA)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="data.bin"')
+
+    def test_ranges(self):
+        size = len(self.DATA)
+        for header, start, end in (
+            ("bytes=0-99", 0, 99),
+            ("bytes=1000-", 1000, size - 1),
+            ("bytes=-24", size - 24, size - 1),
+            ("bytes=1000-5000", 1000, size - 1),
+        ):
+            response = self.serve(Range=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/{size}")
+            self.assertEqual(response["Content-Length"], str(end - start + 1))
+            self.assertEqual(self.body(response), self.DATA[start:end + 1])
+
+    def test_multiple_ranges_send_the_whole_file(self):
+        response = self.serve(Range="bytes=0-1,5-6")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.DATA)
+
+    def test_unsatisfiable_range(self):
+        for header in ("bytes=5000-", "bytes=-0", "bytes=-", "bytes=20-10"):
+            response = self.serve(Range=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response["Content-Range"], f"bytes */{len(self.DATA)}")
+
+    def test_if_range(self):
+        for validator in (self.etag, self.last_modified):
+            self.assertEqual(self.serve(Range="bytes=0-9", **{"If-Range": validator}).status_code, 206)
+
+        for stale in ('"stale"', http_date(0)):
+            response = self.serve(Range="bytes=0-9", **{"If-Range": stale})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.body(response), self.DATA)
+
+    def test_not_modified(self):
+        for headers in ({"If-None-Match": self.etag}, {"If-Modified-Since": self.last_modified}):
+            response = self.serve(**headers)
+            self.assertEqual(response.status_code, 304, headers)
+            self.assertEqual(response["ETag"], self.etag)
+            self.assertFalse(response.content)
+
+        self.assertEqual(self.serve(**{"If-None-Match": '"other"'}).status_code, 200)
+
+    def test_rewritten_file_gets_a_new_etag(self):
+        with open(self.file.path, "ab") as f:
+            f.write(b"more")
+        response = self.serve(**{"If-None-Match": self.etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], self.etag)
+
+
+class CertificateTestCase(TestCase):
+    """คอร์ส + ผู้เรียนที่จบแล้ว 3 คน; ไฟล์ที่ render ลง MEDIA_ROOT ชั่วคราว"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            email="inst@example.com", password="p", full_name="Inst", role="INSTRUCTOR"
+        )
+        cls.course = Course.objects.create(
+            title="Course", description="d", level="beginner", instructor=cls.instructor, status="active"
+        )
+        cls.students = [
+            User.objects.create_user(email=f"s{i}@example.com", password="p", full_name=f"Student {i}")
+            for i in range(3)
+        ]
+        for student in cls.students:
+            Enrollment.objects.create(student=student, course=cls.course, status="completed")
+
+    def setUp(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+
+    def issue(self, students=None):
+        students = self.students if students is None else students
+        job, ids = bulk_issue_certificates(self.course, [s.id for s in students], self.instructor)
+        return job, list(Certificate.objects.filter(pk__in=ids).order_by("created_at"))
+
+    def run_worker(self, *args):
+        out = StringIO()
+        call_command("run_certificate_jobs", "--once", "--processes", "1", "--sleep", "0", *args, stdout=out)
+        return out.getvalue()
+
+
+class CertificateImagePrerenderTests(CertificateTestCase):
+    def test_download_path_renders_the_pdf_only(self):
+        _, (cert,) = self.issue(self.students[:1])
+        with mock.patch("lms_app.cert_images.generate_variants") as generate:
+            self.assertTrue(ensure_certificate_file(cert))
+        generate.assert_not_called()
+        cert.refresh_from_db()
+        self.assertEqual(cert.render_status, "done")
+
+    def test_worker_prerenders_images(self):
+        self.issue(self.students[:2])
+        with mock.patch("lms_app.cert_images.generate_variants") as generate:
+            self.assertIn("rendered=2", self.run_worker())
+        self.assertEqual(generate.call_count, 2)
+
+
+def failing_batch(payloads, **kwargs):
+    return [BatchResult(i, None, "boom") for i in range(len(payloads))]
+
+
+class CertificateQueueTests(CertificateTestCase):
+    def test_claim_hands_out_each_certificate_once(self):
+        job, certs = self.issue()
+        first = claim_certificates(2)
+        second = claim_certificates(2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(claim_certificates(2), [])
+        self.assertEqual({c.pk for c in first + second}, {c.pk for c in certs})
+        for cert in first + second:
+            self.assertEqual((cert.render_status, cert.render_attempts), ("rendering", 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "running")
+
+    def test_claim_filters_by_job(self):
+        job, _ = self.issue(self.students[:1])
+        self.issue(self.students[1:])
+        self.assertEqual([c.render_job_id for c in claim_certificates(10, job_id=job.pk)], [job.pk])
+
+    def test_stale_rendering_is_claimed_again(self):
+        self.issue(self.students[:1])
+        (cert,) = claim_certificates(1)
+        self.assertEqual(claim_certificates(1), [])
+        Certificate.objects.filter(pk=cert.pk).update(render_started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual([c.pk for c in claim_certificates(1)], [cert.pk])
+
+    def age(self, cert, attempts):
+        # เลื่อนเวลาเริ่ม render ถอยไปให้พ้น backoff ของรอบนั้น
+        started = timezone.now() - retry_backoff(attempts) - timedelta(seconds=1)
+        Certificate.objects.filter(pk=cert.pk).update(render_started_at=started)
+
+    def test_failures_back_off_then_exhaust(self):
+        job, (cert,) = self.issue(self.students[:1])
+        with mock.patch("lms_app.cert_jobs.render_batch", failing_batch):
+            for attempt in range(1, MAX_RENDER_ATTEMPTS + 1):
+                claimed = claim_certificates(1)
+                self.assertEqual([c.pk for c in claimed], [cert.pk])
+                self.assertEqual(render_certificates(claimed), [False])
+                refresh_job(job.pk)
+                cert.refresh_from_db()
+                self.assertEqual((cert.render_status, cert.render_attempts), ("failed", attempt))
+                # ล้มแล้วยังไม่พ้น backoff -> ไม่จองซ้ำทันที
+                self.assertEqual(claim_certificates(1), [])
+                self.age(cert, attempt)
+
+        self.assertEqual(claim_certificates(1), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIsNotNone(job.finished_at)
+
+    def test_refresh_job_waits_for_every_certificate(self):
+        job, certs = self.issue()
+        claimed = claim_certificates(1)
+        render_certificates(claimed)
+        refresh_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "running")
+
+        render_certificates(claim_certificates(10))
+        refresh_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertEqual(set(job.certificates.values_list("render_status", flat=True)), {"done"})
+
+    def test_retryable_failure_keeps_the_job_open(self):
+        job, _ = self.issue(self.students[:1])
+        with mock.patch("lms_app.cert_jobs.render_batch", failing_batch):
+            render_certificates(claim_certificates(1))
+        refresh_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "running")
+
+    def test_worker_with_job_exits_when_the_job_is_finished(self):
+        job, _ = self.issue(self.students[:2])
+        self.issue(self.students[2:])
+
+        out = StringIO()
+        call_command("run_certificate_jobs", "--job", str(job.pk), "--processes", "1", "--sleep", "0", stdout=out)
+        self.assertIn("rendered=2", out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        # job อื่นไม่ถูกแตะ
+        self.assertEqual(Certificate.objects.filter(render_status="pending").count(), 1)
+
+
+    def test_failed_export_waits_for_backoff(self):
+        self.issue()
+        export = request_combined_pdf(self.course, self.instructor)
+        self.assertEqual(claim_export().pk, export.pk)
+        self.assertIsNone(claim_export())
+
+        CertificateExport.objects.filter(pk=export.pk).update(status="failed", updated_at=timezone.now())
+        self.assertIsNone(claim_export())
+        CertificateExport.objects.filter(pk=export.pk).update(
+            updated_at=timezone.now() - retry_backoff(1) - timedelta(seconds=1)
+        )
+        claimed = claim_export()
+        self.assertEqual((claimed.pk, claimed.attempts), (export.pk, 2))
+
+class CertificateReissueTests(CertificateTestCase):
+    def setUp(self):
+        super().setUp()
+        self.issue()
+        self.run_worker()
+
+    def statuses(self):
+        return dict(Certificate.objects.values_list("student_id", "render_status"))
+
+    def test_unchanged_certificates_are_skipped(self):
+        files = dict(Certificate.objects.values_list("pk", "file"))
+        job = enqueue_course_certificates(self.course, self.instructor)
+        self.assertEqual((job.total, job.skipped, job.status), (0, 3, "done"))
+        self.assertEqual(set(self.statuses().values()), {"done"})
+        self.assertEqual(dict(Certificate.objects.values_list("pk", "file")), files)
+
+    def test_name_change_renders_only_that_certificate(self):
+        renamed = self.students[0]
+        User.objects.filter(pk=renamed.pk).update(full_name="Renamed")
+
+        job = enqueue_course_certificates(self.course, self.instructor)
+        self.assertEqual((job.total, job.skipped, job.status), (1, 2, "queued"))
+        statuses = self.statuses()
+        self.assertEqual(statuses.pop(renamed.pk), "pending")
+        self.assertEqual(set(statuses.values()), {"done"})
+        cert = Certificate.objects.get(student=renamed)
+        self.assertEqual((cert.student_name, cert.render_job_id), ("Renamed", job.pk))
+
+        self.assertIn("rendered=1", self.run_worker())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertEqual(enqueue_course_certificates(self.course, self.instructor).skipped, 3)
+
+    def test_template_change_renders_every_certificate(self):
+        CertificateTemplate.objects.create(course=self.course, style="classic", primary_color="#000000")
+        job = enqueue_course_certificates(self.course, self.instructor)
+        self.assertEqual((job.total, job.skipped), (3, 0))
+        self.assertEqual(set(self.statuses().values()), {"pending"})
+
+
+class CertificateVerifyTests(CertificateTestCase):
+    def setUp(self):
+        super().setUp()
+        caches["cert_verify"].clear()
+        _, (self.cert,) = self.issue(self.students[:1])
+
+    def verify(self, code):
+        return self.client.get(f"/api/certificates/verify/{code}/")
+
+    def test_signed_code_round_trip_without_db(self):
+        info = parse_verification_code(self.cert.verification_code)
+        self.assertEqual((info.id, info.serial_no, info.issued), (self.cert.id, self.cert.serial_no, self.cert.completion_date))
+
+        self.verify(self.cert.verification_code)  # เติมชุด id ที่ถูกเพิกถอนลง cache
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.verify(self.cert.verification_code)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "valid": True, "id": str(self.cert.id), "serial_no": self.cert.serial_no,
+            "issued": self.cert.completion_date.isoformat(),
+        })
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_tampered_code_is_rejected(self):
+        body, sig = self.cert.verification_code.split(".")
+        forged = make_verification_code(self.cert.id, "FORGED-0001", self.cert.completion_date).split(".")[0]
+        flipped = ("A" if sig[0] != "A" else "B") + sig[1:]
+        for code in (f"{forged}.{sig}", f"{body}.{flipped}", body, "not-a-code"):
+            response = self.verify(code)
+            self.assertEqual(response.status_code, 404, code)
+            self.assertEqual(response.json(), {"valid": False})
+
+    def test_revoked_certificate_is_gone(self):
+        self.assertEqual(self.verify(self.cert.verification_code).status_code, 200)
+        self.cert.revoked_at = timezone.now()
+        self.cert.save(update_fields=["revoked_at"])
+
+        response = self.verify(self.cert.verification_code)
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual((response.json()["valid"], response.json()["revoked"]), (False, True))
+
+    def test_render_saves_keep_the_revoked_cache(self):
+        self.assertFalse(is_revoked(self.cert.id))
+        self.cert.save(update_fields=["render_status"])
+        self.assertIsNotNone(caches["cert_verify"].get(REVOKED_CACHE_KEY))
+
+    def test_unsignalled_revocation_waits_for_cache_expiry(self):
+        # revoke ที่ไม่ผ่าน signal (เทียบเท่า process อื่นที่ใช้ locmem) เห็นช้าสุดเท่าอายุ cache
+        with mock.patch.object(caches["cert_verify"], "get_or_set", wraps=caches["cert_verify"].get_or_set) as get_or_set:
+            self.assertFalse(is_revoked(self.cert.id))
+        self.assertEqual(get_or_set.call_args.kwargs["timeout"], settings.CERT_VERIFY_REVOKED_CACHE_SECONDS)
+
+        Certificate.objects.filter(pk=self.cert.pk).update(revoked_at=timezone.now())
+        self.assertFalse(is_revoked(self.cert.id))
+        caches["cert_verify"].delete(REVOKED_CACHE_KEY)  # หมดอายุ
+        self.assertTrue(is_revoked(self.cert.id))
+
+    def test_legacy_code_falls_back_to_db(self):
+        Certificate.objects.filter(pk=self.cert.pk).update(verification_code="LEGACY123456")
+        response = self.verify("LEGACY123456")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], str(self.cert.id))
+
+        Certificate.objects.filter(pk=self.cert.pk).update(revoked_at=timezone.now())
+        self.assertEqual(self.verify("LEGACY123456").status_code, 410)
+        self.assertEqual(self.verify("UNKNOWN12345").status_code, 404)
+
+
+class CertificateExportTests(CertificateTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_login(self.instructor)
+        self.url = f"/api/courses/{self.course.pk}/certificates/export/"
+
+    def rendered(self):
+        _, certs = self.issue()
+        self.run_worker()
+        return sorted(Certificate.objects.filter(pk__in=[c.pk for c in certs]), key=lambda c: c.serial_no)
+
+    def download(self, fmt):
+        response = self.client.get(self.url, {"format": fmt})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_csv_streams_one_row_per_certificate(self):
+        certs = self.rendered()
+        body = self.download("csv").decode("utf-8")
+        self.assertTrue(body.startswith("\ufeff"))
+        rows = list(csv.reader(io.StringIO(body[1:])))
+        self.assertEqual(rows[0], ["serial_no", "verification_code", "student_name", "course_name", "completion_date", "file"])
+        self.assertEqual([r[0] for r in rows[1:]], [c.serial_no for c in certs])
+        self.assertEqual([r[5] for r in rows[1:]], [f"certificates/{c.serial_no}.pdf" for c in certs])
+
+    def test_zip_streams_stored_pdfs_and_manifest(self):
+        certs = self.rendered()
+        # ใบที่ยังไม่มีไฟล์: อยู่ใน manifest แต่ไม่อยู่ใน ZIP
+        Certificate.objects.filter(pk=certs[0].pk).update(file="")
+
+        archive = zipfile.ZipFile(io.BytesIO(self.download("zip")))
+        self.assertIsNone(archive.testzip())
+        names = archive.namelist()
+        self.assertEqual(names, [f"certificates/{c.serial_no}.pdf" for c in certs[1:]] + ["manifest.csv"])
+        for cert in certs[1:]:
+            with cert.file.open("rb") as f:
+                self.assertEqual(archive.read(f"certificates/{cert.serial_no}.pdf"), f.read())
+
+        manifest = list(csv.reader(io.StringIO(archive.read("manifest.csv").decode("utf-8-sig"))))
+        self.assertEqual([r[0] for r in manifest[1:]], [c.serial_no for c in certs])
+        self.assertEqual(manifest[1][5], "")
+
+    def test_combined_pdf_state_machine(self):
+        self.issue()
+        first = self.client.get(self.url, {"format": "pdf"})
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.data["status"], "queued")
+        export = CertificateExport.objects.get(pk=first.data["id"])
+
+        claimed = claim_export()
+        self.assertEqual(claimed.pk, export.pk)
+        self.assertEqual(self.client.get(self.url, {"format": "pdf"}).data, {"id": str(export.pk), "status": "running", "error": None})
+
+        self.assertTrue(build_combined_pdf(claimed))
+        export.refresh_from_db()
+        self.assertEqual((export.status, export.pages, export.attempts), ("done", 3, 1))
+        done = self.client.get(self.url, {"format": "pdf"})
+        self.assertEqual(done.status_code, 200)
+        self.assertEqual(done["Content-Type"], "application/pdf")
+        self.assertEqual(CertificateExport.objects.count(), 1)
+
+        # ชื่อผู้เรียนเปลี่ยน -> fingerprint ใหม่ -> งานใหม่
+        User.objects.filter(pk=self.students[0].pk).update(full_name="Renamed")
+        enqueue_course_certificates(self.course, self.instructor)
+        again = self.client.get(self.url, {"format": "pdf"})
+        self.assertEqual(again.status_code, 202)
+        self.assertNotEqual(again.data["id"], str(export.pk))
+
+    def test_finished_export_only_replaces_finished_older_exports(self):
+        self.issue()
+        fingerprint = combined_fingerprint(self.course)
+        older = {
+            name: CertificateExport.objects.create(course=self.course, fingerprint=f"old-{name}", status=status, attempts=attempts)
+            for name, status, attempts in (
+                ("done", "done", 1),
+                ("exhausted", "failed", MAX_RENDER_ATTEMPTS),
+                ("retrying", "failed", 1),
+                ("running", "running", 1),
+                ("queued", "queued", 0),
+            )
+        }
+        CertificateExport.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+
+        export = CertificateExport.objects.create(course=self.course, fingerprint=fingerprint, status="running", attempts=1)
+        self.assertTrue(build_combined_pdf(export))
+
+        left = set(CertificateExport.objects.exclude(pk=export.pk).values_list("pk", flat=True))
+        self.assertEqual(left, {older[n].pk for n in ("retrying", "running", "queued")})
+
+    def test_fingerprint_is_cached_per_data_version(self):
+        _, certs = self.issue()
+        fingerprint = combined_fingerprint(self.course)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(combined_fingerprint(self.course), fingerprint)
+        # aggregate query เดียว ไม่ไล่อ่านทุกใบ
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        tpl = CertificateTemplate.objects.create(course=self.course, style="classic")
+        Certificate.objects.filter(course=self.course).update(template=tpl, updated_at=timezone.now())
+        with_template = combined_fingerprint(self.course)
+        self.assertNotEqual(with_template, fingerprint)
+
+        tpl.primary_color = "#000000"
+        tpl.save()
+        self.assertNotEqual(combined_fingerprint(self.course), with_template)
+
+        certs[0].delete()
+        self.assertNotEqual(combined_fingerprint(self.course), with_template)
+
+
+@skipUnless(connection.vendor == "postgresql", "SKIP LOCKED ต้องใช้ Postgres")
+class CertificateClaimLockTests(TransactionTestCase):
+    def test_locked_rows_are_skipped(self):
+        instructor = User.objects.create_user(email="inst@example.com", password="p", full_name="Inst")
+        course = Course.objects.create(
+            title="C", description="d", level="beginner", instructor=instructor, status="active"
+        )
+        students = [User.objects.create_user(email=f"s{i}@example.com", password="p", full_name="S") for i in range(2)]
+        _, ids = bulk_issue_certificates(course, [s.id for s in students], instructor)
+
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_first_row():
+            try:
+                with transaction.atomic():
+                    list(Certificate.objects.select_for_update().filter(pk=ids[0]))
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_first_row)
+        holder.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            self.assertEqual([c.pk for c in claim_certificates(10)], [ids[1]])
+        finally:
+            release.set()
+            holder.join()
+
+
+@skipUnless(connection.vendor == "postgresql", "ตรวจ EXPLAIN ของ Postgres")
+class MyCoursesPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructors = User.objects.bulk_create([
+            User(email=f"inst{i}@example.com", full_name=f"Inst{i}", role="INSTRUCTOR") for i in range(50)
+        ])
+        courses = Course.objects.bulk_create([
+            Course(title=f"C{i}", description="d", level="beginner", instructor=instructors[i % 50], status="active")
+            for i in range(5000)
+        ])
+        cls.user = instructors[0]
+        # courses[0] เป็นคอร์สที่สอนเองด้วย -> id ซ้ำใน UNION ALL
+        cls.enrolled = courses[0:500:50] + courses[1:500:50]
+        Enrollment.objects.bulk_create([
+            Enrollment(student=cls.user, course=course, status="enrolled") for course in cls.enrolled
+        ])
+        # ให้ planner เห็นขนาดตารางจริง (ตารางเล็ก/ไม่มี stats -> Seq Scan ถูกกว่าเสมอ)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Course._meta.db_table}")
+            cursor.execute(f"ANALYZE {Enrollment._meta.db_table}")
+
+    def my_courses(self):
+        request = Request(APIRequestFactory().get("/api/courses/"))
+        request.user = self.user
+        view = CourseViewSet(request=request, action="list", format_kwarg=None, args=(), kwargs={})
+        return view.get_queryset()
+
+    def test_my_courses_does_not_scan_or_dedupe_courses(self):
+        qs = self.my_courses()
+        expected = set(Course.objects.filter(instructor=self.user).values_list("pk", flat=True))
+        expected |= {course.pk for course in self.enrolled}
+        self.assertEqual(set(qs.values_list("pk", flat=True)), expected)
+
+        plan = qs[:21].explain()
+        for node in ("Seq Scan on lms_app_course", "HashAggregate", "Unique"):
+            self.assertNotIn(node, plan)
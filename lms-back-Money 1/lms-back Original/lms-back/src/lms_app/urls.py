@@ -2,6 +2,7 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from .views_scoring import CourseScoringView
+from .views_course_bundle import CourseBundleView
 from .views import (
     UserMeView, InstructorMeView, InstructorProfileView,
     UniversityViewSet, CourseViewSet, CourseChapterViewSet, ReviewViewSet,
@@ -20,6 +21,10 @@ from .views_certificate_issue import (
     CertificatePreviewAPIView,    # GET preview pdf
     IssueCertificates,            # POST issue certs
     SaveTemplateAndIssue,         # POST save template + issue
+    CertificateRenderJobView,     # GET issue job status
+    CertificateExportView,        # GET export pdf/zip/csv
+    CertificateImageView,         # GET png thumb/social/print
+    CertificateVerifyView,        # GET verify code (public)
 )
 from .views_assignment import AssignmentViewSet
 
@@ -65,6 +70,7 @@ urlpatterns = [
     path("materials/upload/", CourseMaterialUploadView.as_view(), name="materials-upload"),
     path("courses/<uuid:course_id>/scoring/", CourseScoringView.as_view(), name="course-scoring"),
     path("courses/<uuid:course_id>/quiz/", CourseQuizView.as_view(), name="course-quiz"),
+    path("courses/<uuid:course_id>/bundle/", CourseBundleView.as_view(), name="course-bundle"),
 
     # Certificates
     #path("courses/<uuid:course_id>/certificates/", cert_list, name="cert-list"),
@@ -72,10 +78,14 @@ urlpatterns = [
     path("courses/<uuid:course_id>/certificates/preview/",  CertificatePreviewAPIView.as_view(), name="cert-preview"),
     path("courses/<uuid:course_id>/certificates/issue/",    IssueCertificates.as_view(), name="cert-issue"),
     path("courses/<uuid:course_id>/certificates/save-and-issue/", SaveTemplateAndIssue.as_view(), name="cert-save-and-issue"),
+    path("courses/<uuid:course_id>/certificates/jobs/<uuid:job_id>/", CertificateRenderJobView.as_view(), name="cert-job-status"),
+    path("courses/<uuid:course_id>/certificates/export/", CertificateExportView.as_view(), name="cert-export"),
     
     # Public/Download
     path("certificates/<uuid:pk>/public/", certificate_public_detail, name="certificate-public"),
     path("certificates/<uuid:cert_id>/download/", CertificateRenderAPIView.as_view(), name="certificate-download"),
+    path("certificates/<uuid:cert_id>/images/<str:variant>/", CertificateImageView.as_view(), name="certificate-image"),
+    path("certificates/verify/<str:code>/", CertificateVerifyView.as_view(), name="certificate-verify"),
 ]
 
 urlpatterns += router.urls
@@ -0,0 +1,105 @@
+"""
+Conditional GET (ETag / Last-Modified) ของ ViewSet — ข้อมูลไม่เปลี่ยนได้ 304 โดยไม่ serialize
+
+    class CourseMaterialViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+        conditional_fields = ("updated_at",)
+
+- list: validator จากแถวของหน้าที่จะตอบ (query หน้าเดิมที่ต้องรันอยู่แล้ว ไม่มี aggregate ทั้งตาราง)
+  = pk ตามลำดับ + conditional_fields ของแต่ละแถว + ลิงก์ next/previous
+  (แก้แถว -> field ขยับ, เพิ่ม/ลบ/ย้ายลำดับ -> รายการ pk เปลี่ยน) ส่งเฉพาะ ETag
+- retrieve: validator จาก object ที่ get_object() โหลดอยู่แล้ว (ไม่มี query เพิ่ม)
+  + Last-Modified เมื่อทุก field เป็นเวลา (ชื่อของแถวที่เกี่ยวข้องไม่มีเวลาให้เทียบ)
+- ETag ผูกกับผู้ใช้ (ปิดได้ด้วย conditional_per_user) + URL เต็ม (query string / cursor) + media type
+  เพราะเนื้อหาขึ้นกับทั้งหมดนี้ (เช่น serializer ที่ดูมหาวิทยาลัยของผู้ใช้)
+
+field ข้ามความสัมพันธ์ได้ เช่น "stats__updated_at", "category__name" — ใส่ทุกอย่างที่ serializer
+แสดงจากแถวอื่น และ select_related ไว้ (ไม่งั้นเกิด query ต่อแถว)
+"""
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def _resolve(obj, path: str):
+    for name in path.split("__"):
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return None
+    return obj
+
+
+class ConditionalGetMixin:
+    conditional_fields = ("updated_at",)
+    # False เมื่อ body ไม่ขึ้นกับผู้ใช้ -> ETag เดียวกันทุกคน (เก็บใน cache ร่วมกันได้)
+    conditional_per_user = True
+
+    # ---------- validators ----------
+    def _etag(self, values) -> str:
+        request = self.request
+        raw = json.dumps(
+            [
+                str(getattr(request.user, "pk", "") or "") if self.conditional_per_user else "",
+                request.build_absolute_uri(),
+                getattr(request, "accepted_media_type", ""),
+                values,
+            ],
+            default=str,
+            separators=(",", ":"),
+        )
+        return quote_etag(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+    def _row(self, obj) -> list:
+        return [str(obj.pk), *(_resolve(obj, f) for f in self.conditional_fields)]
+
+    def page_etag(self, rows, links=()) -> str:
+        return self._etag([[self._row(obj) for obj in rows], list(links)])
+
+    def object_validators(self, instance):
+        """(etag, last_modified เป็น timestamp หรือ None)"""
+        values = self._row(instance)[1:]
+        etag = self._etag([str(instance.pk), *values])
+        # ค่าที่ไม่ใช่เวลา (เช่นชื่อหมวดหมู่) เปลี่ยนได้โดยเวลาไม่ขยับ -> ไม่ส่ง Last-Modified
+        if any(v is not None and not hasattr(v, "timestamp") for v in values):
+            return etag, None
+        stamps = [v.timestamp() for v in values if v is not None]
+        return etag, (int(max(stamps)) if stamps else None)
+
+    def _finish(self, response, etag: str, last_modified=None):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        # ให้ client ถามทุกครั้ง (ได้ 304 ถ้าไม่เปลี่ยน)
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def conditional_response(self, request, etag: str, build, last_modified=None):
+        """304 ถ้า validator ตรงกับที่ client ส่งมา ไม่งั้น build() (serialize) แล้วแนบ validator"""
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        response = not_modified if not_modified is not None else build()
+        return self._finish(response, etag, last_modified)
+
+    # ---------- actions ----------
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            rows, links = list(queryset), ()
+        else:
+            rows, links = page, (self.paginator.get_next_link(), self.paginator.get_previous_link())
+        etag = self.page_etag(rows, links)
+
+        def build():
+            data = self.get_serializer(rows, many=True).data
+            return Response(data) if page is None else self.get_paginated_response(data)
+
+        return self.conditional_response(request, etag, build)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.object_validators(instance)
+        return self.conditional_response(
+            request, etag, lambda: Response(self.get_serializer(instance).data), last_modified
+        )
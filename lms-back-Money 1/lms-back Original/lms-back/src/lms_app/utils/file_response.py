@@ -0,0 +1,119 @@
+"""
+ส่งไฟล์จาก FileField แบบ stream พร้อม ETag / Last-Modified / Range (ช่วงเดียว)
+
+    return serve_file(request, cert.file, filename="CERT-xxx.pdf", content_type="application/pdf")
+
+- ETag/Last-Modified มาจาก stat ของไฟล์ (FileSystemStorage ใช้ os.stat ครั้งเดียว)
+- If-None-Match / If-Modified-Since ตรง -> 304 โดยไม่เปิดไฟล์
+- Range: bytes=a-b | a- | -n -> 206 ; ช่วงผิด -> 416 ; If-Range ไม่ตรง -> ส่งทั้งไฟล์
+"""
+import os
+import re
+from datetime import timezone as dt_timezone
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def stat_file(field_file):
+    """(size, mtime เป็น unix timestamp แบบทศนิยม) — ใช้ os.stat ถ้า storage มี path จริง"""
+    try:
+        st = os.stat(field_file.path)
+        return st.st_size, st.st_mtime
+    except NotImplementedError:
+        storage, name = field_file.storage, field_file.name
+        modified = storage.get_modified_time(name)
+        if modified.tzinfo is None:
+            modified = modified.replace(tzinfo=dt_timezone.utc)
+        return storage.size(name), modified.timestamp()
+
+
+def file_etag(size: int, mtime: float) -> str:
+    # ใช้ระดับ microsecond: render ใหม่ในวินาทีเดียวกันยังได้ ETag ต่างกัน
+    return quote_etag(f"{int(mtime * 1_000_000):x}-{size:x}")
+
+
+def _parse_range(header: str, size: int):
+    """คืน (start, end) แบบรวมปลาย, None = ไม่ใช้ range, False = ช่วงใช้ไม่ได้ (416)"""
+    m = RANGE_RE.match(header.strip())
+    if not m:
+        # หลายช่วง (a-b,c-d) หรือรูปแบบอื่น -> ส่งทั้งไฟล์ตาม RFC 9110
+        return None
+    first, last = m.groups()
+    if not first and not last:
+        return False
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return False
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(f, start: int, length: int):
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def serve_file(request, field_file, filename: str, content_type: str, disposition: str = "attachment"):
+    size, mtime_exact = stat_file(field_file)
+    etag = file_etag(size, mtime_exact)
+    mtime = int(mtime_exact)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if not_modified is not None:
+        # 304 ต้องมี validator ชุดเดียวกับ 200 (RFC 9110 15.4.5)
+        return _with_validators(not_modified, etag, mtime)
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.method in ("GET", "HEAD"):
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == mtime:
+            byte_range = _parse_range(range_header, size)
+
+    if byte_range is False:
+        resp = HttpResponse(status=416)
+        resp["Content-Range"] = f"bytes */{size}"
+    elif byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        resp = StreamingHttpResponse(
+            _iter_range(field_file.storage.open(field_file.name, "rb"), start, length),
+            status=206,
+            content_type=content_type,
+        )
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+        resp["Content-Length"] = str(length)
+    else:
+        resp = FileResponse(field_file.storage.open(field_file.name, "rb"), content_type=content_type)
+        resp["Content-Length"] = str(size)
+
+    resp["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    resp["Accept-Ranges"] = "bytes"
+    return _with_validators(resp, etag, mtime)
+
+
+def _with_validators(resp, etag: str, mtime: int):
+    resp["ETag"] = etag
+    resp["Last-Modified"] = http_date(mtime)
+    # browser ต้องถามใหม่ทุกครั้ง (ได้ 304 ถ้าไฟล์ไม่เปลี่ยน)
+    resp["Cache-Control"] = "private, no-cache"
+    return resp
@@ -0,0 +1,108 @@
+"""
+เซิร์ฟเวอร์จำลอง /api/render-cert ของ Next.js สำหรับทดสอบ backend "next" (cert_backends.NextBackend)
+โดยไม่ต้องรัน frontend จริง
+
+    with NextRenderStub(token=settings.CERT_RENDER_TOKEN) as stub:
+        with override_settings(FRONTEND_BASE_URL=stub.url, CERT_RENDER_BACKENDS=["next", "reportlab"]):
+            BACKENDS["next"].reset()
+            ...
+        stub.requests   # certId ที่ถูกเรียก
+        stub.fail = True  # ให้ตอบ 503 เพื่อทดสอบ fallback
+
+รันเดี่ยว ๆ ได้ด้วย: python -m lms_app.utils.next_render_stub 3100
+"""
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+# PDF หน้าเปล่าที่เล็กที่สุดที่ viewer ทั่วไปเปิดได้
+BLANK_PDF = (
+    b"%PDF-1.4\n"
+    b"1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 842 595]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+class NextRenderStub:
+    def __init__(self, token: str = "", host: str = "127.0.0.1", port: int = 0, pdf: bytes = BLANK_PDF):
+        self.token = token
+        self.pdf = pdf
+        self.fail = False
+        self.delay = 0.0
+        self.requests = []
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive ให้ทดสอบ connection pool ได้
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                qs = parse_qs(parsed.query)
+                if parsed.path != "/api/render-cert":
+                    return self._reply(404, b"not found", "text/plain")
+                if stub.token and qs.get("token", [""])[0] != stub.token:
+                    return self._reply(401, b"bad token", "text/plain")
+
+                stub.requests.append(qs.get("certId", [""])[0])
+                if stub.delay:
+                    threading.Event().wait(stub.delay)
+                if stub.fail:
+                    return self._reply(503, b"unavailable", "text/plain")
+                return self._reply(200, stub.pdf, "application/pdf")
+
+            def _reply(self, code, body, content_type):
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        """รันใน thread ปัจจุบันจนกว่าจะ stop() (ใช้ตอนรันเดี่ยว ๆ)"""
+        self._server.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    stub = NextRenderStub(port=int(sys.argv[1]) if len(sys.argv) > 1 else 3100)
+    logger.info("Next render stub on %s", stub.url)
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
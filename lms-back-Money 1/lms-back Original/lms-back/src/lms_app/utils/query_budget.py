@@ -0,0 +1,67 @@
+"""
+กำหนด "งบ" จำนวน query ของ endpoint — จับ N+1 ตั้งแต่ตอนพัฒนา
+
+ใช้ตรง ๆ (เช่นใน shell / test):
+
+    with query_budget(4, label="course list"):
+        client.get("/api/courses/?page_size=100")
+
+หรือใส่ใน ViewSet (ตรวจเฉพาะ action list):
+
+    class CourseViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+        list_query_budget = 3
+
+QUERY_BUDGET_MODE ใน settings: "raise" = โยน QueryBudgetExceeded, "warn" = log warning,
+"off" = ไม่ตรวจ (default: "warn" เมื่อ DEBUG ไม่งั้น "off")
+นับเฉพาะ query ที่เกิดใน list() — auth/permission ก่อนหน้านั้นไม่รวม
+"""
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def budget_mode() -> str:
+    return getattr(settings, "QUERY_BUDGET_MODE", "warn" if settings.DEBUG else "off")
+
+
+@contextmanager
+def query_budget(max_queries: int, using: str = DEFAULT_DB_ALIAS, label: str = "", mode: str = "raise"):
+    """นับ query ใน block; เกิน max_queries -> raise หรือ warn ตาม mode"""
+    if mode == "off":
+        yield None
+        return
+
+    with CaptureQueriesContext(connections[using]) as ctx:
+        yield ctx
+
+    if len(ctx) <= max_queries:
+        return
+    sqls = "\n".join(f"  {i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, 1))
+    message = f"{label or 'block'}: {len(ctx)} queries (budget {max_queries})\n{sqls}"
+    if mode == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class QueryBudgetMixin:
+    list_query_budget = None
+
+    def list(self, request, *args, **kwargs):
+        mode = budget_mode()
+        if self.list_query_budget is None or mode == "off":
+            return super().list(request, *args, **kwargs)
+
+        label = f"{self.__class__.__name__}.list"
+        with query_budget(self.list_query_budget, label=label, mode=mode):
+            response = super().list(request, *args, **kwargs)
+            # serializer ทำงานตอนนี้แล้ว (response.data) — query ของ nested field ถูกนับครบ
+        return response
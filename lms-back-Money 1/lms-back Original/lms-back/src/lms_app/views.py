@@ -8,8 +8,9 @@ import logging
 from django.conf import settings 
 
 # ===== Django & DRF Core =====
-from django.db import transaction, IntegrityError
-from django.db.models import Max, Count, Q
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Count, Q
 from django.http import FileResponse, Http404,HttpResponse   
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -31,9 +32,17 @@ from rest_framework_simplejwt.tokens import RefreshToken
 # ===== drf-spectacular (Swagger/OpenAPI) =====
 from drf_spectacular.utils import extend_schema, OpenApiParameter, extend_schema_view
 from drf_spectacular.types import OpenApiTypes
-from django.db.models.deletion import ProtectedError, RestrictedError
 import secrets
-from .utils.cert_pdf import render_and_attach_pdf
+from .cert_jobs import bulk_issue_certificates, ensure_certificate_file
+from .utils.file_response import serve_file
+from .utils.conditional import ConditionalGetMixin
+from .utils.query_budget import QueryBudgetMixin
+from .pagination import CourseCursorPagination, CreatedAtCursorPagination, UserCursorPagination
+from .course_search import RANK, search_courses
+from .my_courses import filter_my_courses
+from . import catalog_cache
+from .course_deletion import protected_objects, schedule_course_deletion
+from . import chapter_rank
 
 # ===== Django Filters =====
 from django_filters.rest_framework import DjangoFilterBackend
@@ -45,10 +54,12 @@ from .models import (
     InstructorProfile, ImportantDocument, Education, TeachingExperience,
     RoleChoices, CourseStatus, Category, CourseMaterial, Quiz,
     EnrollmentStatus, Certificate, CertificateTemplate,
+    normalize_course_title,
 )
 from django.shortcuts import get_object_or_404
 
 from .serializers import (
+    COURSE_SERIALIZER_RELATED,
     LoginSerializer,
     TokenPairSerializer,
     UserMeSerializer,
@@ -98,7 +109,6 @@ from .permissions import (
 from django.utils import timezone
 import os
 
-from .renderers.pdf_renderer import render_certificate_pdf
 FONT_DIR = os.path.join(settings.BASE_DIR, "lms_app", "fonts")
 
 
@@ -465,8 +475,13 @@ class UniversityViewSet(viewsets.ModelViewSet):
         members = UniversityMember.objects.filter(university=university).select_related(
             "user"
         )
-        serializer = UniversityMemberSerializer(members, many=True)
-        return Response(serializer.data)
+        paginator = CreatedAtCursorPagination()
+        page = paginator.paginate_queryset(members, request, view=self)
+        if page is None:
+            members = members.order_by("-created_at")
+            return Response(UniversityMemberSerializer(members, many=True).data)
+        serializer = UniversityMemberSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=["get"], url_path="stats")
     def stats(self, request, pk=None):
@@ -504,6 +519,10 @@ class UniversityViewSet(viewsets.ModelViewSet):
         return Response(stats_data, status=status.HTTP_200_OK)
 
 
+# ?status= ที่ CourseViewSet.get_queryset รับ
+COURSE_LIST_STATUSES = {"DRAFT", "PENDING", "APPROVED", "REJECTED", "ACTIVE", "DENIED", "ARCHIVED"}
+
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -530,14 +549,14 @@ class UniversityViewSet(viewsets.ModelViewSet):
             ),
             OpenApiParameter(
                 name="q",
-                description="Search by title/description (icontains).",
+                description="Full-text search on title/description (Thai bigram), ranked by relevance.",
                 required=False,
                 type=OpenApiTypes.STR,
                 location=OpenApiParameter.QUERY,
             ),
             OpenApiParameter(
                 name="title__iexact",
-                description="Exact (case-insensitive) title match for duplicate check (normalized by collapsing spaces).",
+                description="Duplicate-title check: matches Course.normalized_title (NFC, casefolded, spaces collapsed).",
                 required=False,
                 type=OpenApiTypes.STR,
                 location=OpenApiParameter.QUERY,
@@ -545,14 +564,24 @@ class UniversityViewSet(viewsets.ModelViewSet):
         ]
     ),
 )
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(QueryBudgetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    pagination_class = CourseCursorPagination
+    # ทุกอย่างที่ CourseSerializer แสดงจากแถวอื่น: ตัวนับ (stats) + ชื่อหมวดหมู่/หลักสูตร/ผู้สอน
+    conditional_fields = (
+        "updated_at", "stats__updated_at", "category__name", "curriculum__name", "instructor__full_name",
+    )
+    # body ไม่ขึ้นกับผู้ใช้ (รายการ "คอร์สของฉัน" ต่างกันที่แถวอยู่แล้ว) -> ETag ใช้ร่วมกับ cache ได้
+    conditional_per_user = False
+    # คอร์ส 1 หน้า (มี instructor/curriculum/category ใน JOIN) ไม่ว่ากี่แถว
+    list_query_budget = 2
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = {
-        "title": ["exact", "iexact"],
+        # title__iexact จัดการเองใน get_queryset (normalized_title)
+        "title": ["exact"],
         "curriculum": ["exact"],
         "category": ["exact"],
         "status": ["exact"],
@@ -561,6 +590,19 @@ class CourseViewSet(viewsets.ModelViewSet):
     search_fields = ["title", "description"]
     ordering_fields = ["updated_at", "created_at", "title"]
 
+    def list(self, request, *args, **kwargs):
+        # read-through cache ก่อนแตะ DB: hit -> 304/200 จาก ETag + body ที่เก็บไว้ (ดู catalog_cache.py)
+        key = catalog_cache.list_cache_key(request, self.is_my_courses())
+        cached = catalog_cache.get_list(key) if key else None
+        if cached is not None:
+            etag, data = cached
+            return self.conditional_response(request, etag, lambda: Response(data))
+
+        response = super().list(request, *args, **kwargs)
+        if key and response.status_code == 200:
+            catalog_cache.set_list(key, response["ETag"], response.data)
+        return response
+
     def get_serializer_class(self):
         if self.action == "create":
             return CourseCreateSerializer
@@ -589,18 +631,28 @@ class CourseViewSet(viewsets.ModelViewSet):
         # ให้ serializer.create() จัดการเรื่อง instructor / university / status เอง
         serializer.save()
 
+    def is_my_courses(self) -> bool:
+        """ไม่ได้กรองด้วยเงื่อนไขของ get_queryset เลย -> รายการ default "คอร์สของฉัน" (ผูกกับผู้ใช้)"""
+        params = self.request.query_params
+        stat = (params.get("status") or "").strip().upper()
+        return not (
+            any(params.get(p) for p in ("instructor", "university_id", "q", "title__iexact"))
+            or stat in COURSE_LIST_STATUSES
+        )
+
     def get_queryset(self):
         """
         Filters:
           - ?instructor=<uuid>|me
           - ?university_id=<uuid>
           - ?status=DRAFT|PENDING|APPROVED|REJECTED|ACTIVE|DENIED|ARCHIVED
-          - ?q=<text>
+          - ?q=<text>          (full-text, เรียงตามความตรง — ดู course_search.py)
           - ?title__iexact=<title>
         Default: only current user's owned or enrolled.
         """
         user = self.request.user
-        qs = Course.objects.all()
+        # search_vector ใช้แค่ใน WHERE/ranking ไม่ต้องดึงกลับมาทุกแถว
+        qs = Course.objects.select_related(*COURSE_SERIALIZER_RELATED).defer("search_vector")
 
         instr = self.request.query_params.get("instructor")
         uni = self.request.query_params.get("university_id")
@@ -617,37 +669,26 @@ class CourseViewSet(viewsets.ModelViewSet):
         if uni:
             qs = qs.filter(university_id=uni)
 
-        allowed_status = {
-            "DRAFT",
-            "PENDING",
-            "APPROVED",
-            "REJECTED",
-            "ACTIVE",
-            "DENIED",
-            "ARCHIVED",
-        }
-        if stat in allowed_status:
+        if stat in COURSE_LIST_STATUSES:
             qs = qs.filter(status=stat)
 
         if q:
-            qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q))
+            qs = search_courses(qs, q)
 
         if title_iexact:
             if user.is_authenticated and getattr(user, "university_id", None):
                 qs = qs.filter(university_id=user.university_id)
-            qs = qs.filter(title__iexact=" ".join(title_iexact.split()))
+            qs = qs.filter(normalized_title=normalize_course_title(title_iexact))
 
-        applied_any_filter = bool(
-            instr or uni or (stat in allowed_status) or q or title_iexact
-        )
-        if not applied_any_filter:
+        if self.is_my_courses():
             if user.is_authenticated:
-                qs = qs.filter(
-                    Q(instructor=user) | Q(enrollments__student=user)
-                ).distinct()
+                # id ของ (สอน UNION ALL ลงทะเบียน) แทน JOIN + DISTINCT — ดู my_courses.py
+                qs = filter_my_courses(qs, user)
             else:
                 qs = qs.none()
 
+        if RANK in qs.query.annotations:
+            return qs.order_by(f"-{RANK}", "-updated_at")
         return qs.order_by("-updated_at", "-created_at")
 
     def perform_update(self, serializer):
@@ -752,7 +793,11 @@ class CourseViewSet(viewsets.ModelViewSet):
 
         # --------- GET: list members ----------
         if request.method.lower() == "get":
-            enrollments = Enrollment.objects.filter(course=course)
+            enrollments = (
+                Enrollment.objects.filter(course=course)
+                .select_related("student", *(f"course__{f}" for f in COURSE_SERIALIZER_RELATED))
+                .prefetch_related("student__groups", "student__user_permissions")
+            )
             serializer = EnrollmentSerializer(enrollments, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -792,61 +837,45 @@ class CourseViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def destroy(self, request, *args, **kwargs):
+        """
+        ลบแบบเบื้องหลัง: tombstone คอร์สทันทีแล้วคืน 202 + job (เดิม 204)
+        worker (manage.py run_course_deletions) ลบข้อมูลลูกทีละชุดและไฟล์ media ตามหลัง
+        - ไม่ส่ง ?force=1&cascade=1 และมีแถวที่อ้างคอร์สแบบ PROTECT/RESTRICT -> 409 แบบเดิม
+        - ?force=1&cascade=1 / DELETE .../cascade/ -> ลบทั้งหมดโดยไม่เช็ค
+        """
         force = request.query_params.get("force") in ("1", "true", "yes")
         cascade = request.query_params.get("cascade") in ("1", "true", "yes")
         course = self.get_object()
 
-        if force and cascade:
-            return self._cascade_delete(course)
-
-        try:
-            return super().destroy(request, *args, **kwargs)
-
-        # ⬇️  กรณีมีความสัมพันธ์คุ้มกันการลบ
-        except (ProtectedError, RestrictedError) as e:
-            objs = getattr(e, "protected_objects", None) or getattr(
-                e, "restricted_objects", None
-            )
-            return Response(
-                {
-                    "detail": "ไม่สามารถลบคอร์สได้ เนื่องจากยังมีข้อมูลที่อ้างอิงอยู่",
-                    "type": e.__class__.__name__,
-                    "blocked_by": [str(o) for o in (objs or [])],
-                },
-                status=status.HTTP_409_CONFLICT,
-            )
-
-        # ⬇️  กัน constraint อื่น ๆ
-        except IntegrityError as e:
-            return Response(
-                {"detail": str(e), "type": "IntegrityError"},
-                status=status.HTTP_409_CONFLICT,
-            )
-
-        # ⬇️  กันทุกกรณีไม่ให้เป็น HTML 500
-        except Exception as e:
-            logger.exception("Course destroy failed")
-            return Response(
-                {"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        if not (force and cascade):
+            blocked = protected_objects(course)
+            if blocked:
+                return Response(
+                    {
+                        "detail": "ไม่สามารถลบคอร์สได้ เนื่องจากยังมีข้อมูลที่อ้างอิงอยู่",
+                        "type": "ProtectedError",
+                        "blocked_by": [str(o) for o in blocked],
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+        return self._schedule_delete(course)
 
     # ===== helpers & action สำหรับลบแบบเคสเคด =====
-    def _cascade_delete(self, course):
-        from .models import CourseMaterial, CourseChapter, Enrollment, Review, Quiz
-
-        with transaction.atomic():
-            CourseMaterial.objects.filter(chapter__course=course).delete()
-            Quiz.objects.filter(course=course).delete()
-            Enrollment.objects.filter(course=course).delete()
-            Review.objects.filter(course=course).delete()
-            CourseChapter.objects.filter(course=course).delete()
-            course.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    def _schedule_delete(self, course):
+        job = schedule_course_deletion(course, self.request.user)
+        return Response(
+            {
+                "detail": "Course deletion scheduled.",
+                "job_id": str(job.id),
+                "status": job.status,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
 
     @action(detail=True, methods=["delete"], url_path="cascade")
     def cascade_delete(self, request, pk=None):
         course = self.get_object()
-        return self._cascade_delete(course)
+        return self._schedule_delete(course)
 
 
 class UniversityMemberViewSet(
@@ -913,11 +942,13 @@ class UniversityMemberViewSet(
         ]
     ),
 )
-class CourseChapterViewSet(viewsets.ModelViewSet):
+class CourseChapterViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     parser_classes = [MultiPartParser, FormParser, JSONParser]
-    queryset = CourseChapter.objects.all().order_by("position")
+    queryset = CourseChapter.objects.all().order_by(*chapter_rank.ORDERING)
     serializer_class = CourseChapterSerializer
     permission_classes = [IsAuthenticated]
+    # "order" ของบทเดี่ยวขยับได้เมื่อบทอื่นถูกย้าย (updated_at ของบทนี้ไม่เปลี่ยน)
+    conditional_fields = ("updated_at", "rank_position")
     # ถ้า id เป็น UUID field แนะนำให้ระบุเพื่อความชัด
     # lookup_field = "id"
 
@@ -955,19 +986,25 @@ class CourseChapterViewSet(viewsets.ModelViewSet):
         if not course:
             return CourseChapter.objects.none()
 
-        qs = qs.filter(course=course)
+        qs = chapter_rank.with_rank_position(qs.filter(course=course))
 
-        # map ordering=order -> position
+        # map ordering=order/position -> rank (position ใน DB ไม่อัปเดตตอน move)
         ordering_param = self.request.query_params.get("ordering")
-        if ordering_param and ordering_param.lstrip("-") == "order":
-            qs = qs.order_by(
-                "-position" if ordering_param.startswith("-") else "position"
-            )
+        if ordering_param and ordering_param.lstrip("-") in ("order", "position", "rank"):
+            if ordering_param.startswith("-"):
+                qs = qs.order_by(*(f"-{f}" for f in chapter_rank.ORDERING))
         elif ordering_param:
             qs = qs.order_by(ordering_param)
 
         return qs
 
+    def get_object(self):
+        obj = super().get_object()
+        # ลำดับที่จริงสำหรับคำตอบของรายการเดี่ยว (list ได้จาก window ใน get_queryset)
+        if self.action in ("retrieve", "update", "partial_update", "move"):
+            obj.rank_position = chapter_rank.position_of(obj)
+        return obj
+
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx["request"] = self.request
@@ -976,8 +1013,8 @@ class CourseChapterViewSet(viewsets.ModelViewSet):
     # ----- Create / Update -----
     def perform_create(self, serializer):
         """
-        ใส่ค่า position เองถ้าไม่ได้ส่งมา + ตรวจสิทธิ์
-        รองรับ body ที่ส่ง order (map → position)
+        ใส่ค่า position/rank เองถ้าไม่ได้ส่งมา (ต่อท้าย) + ตรวจสิทธิ์
+        รองรับ body ที่ส่ง order (map → position) = แทรกเป็นบทลำดับที่ order
         """
         course = serializer.validated_data["course"]
         self._assert_course_permission(course)
@@ -985,13 +1022,14 @@ class CourseChapterViewSet(viewsets.ModelViewSet):
         # order ถูก map เป็น position ผ่าน serializer (source="position")
         position = serializer.validated_data.get("position")
         if position in (None, ""):
-            # auto set next position ภายในคอร์สเดียวกัน
-            max_pos = CourseChapter.objects.filter(course=course).aggregate(
-                m=Max("position")
-            )["m"]
-            position = (max_pos or 0) + 1
+            # ต่อท้ายคอร์ส: บทสุดท้ายตาม index (course, rank) ไม่ต้อง aggregate
+            last = chapter_rank.last_rank(course.id)
+            rank = chapter_rank.key_between(last[0] if last else None)
+            position = (last[1] if last else 0) + 1
+        else:
+            rank = chapter_rank.rank_at_index(course.id, position - 1)
 
-        serializer.save(position=position)
+        serializer.save(position=position, rank=rank)
 
     def update(self, request, *args, **kwargs):
         """
@@ -1011,10 +1049,16 @@ class CourseChapterViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance, data=data, partial=partial)
         serializer.is_valid(raise_exception=True)
 
-        # ถ้าไม่ได้ส่ง position มา ก็ใช้ค่าเดิม
-        serializer.save(
-            position=serializer.validated_data.get("position", instance.position)
-        )
+        # ถ้าไม่ได้ส่ง position มา ก็ใช้ค่าเดิม; ส่งมา = ย้ายไปเป็นบทลำดับที่นั้น (แก้ rank แถวนี้แถวเดียว)
+        position = serializer.validated_data.get("position", instance.position)
+        extra = {}
+        if order_val is not None and order_val != "":
+            extra["rank"] = chapter_rank.rank_at_index(
+                instance.course_id, position - 1, exclude=instance.pk
+            )
+        chapter = serializer.save(position=position, **extra)
+        if extra:
+            chapter.rank_position = chapter_rank.position_of(chapter)
         return Response(serializer.data)
 
     # ----- Delete -----
@@ -1029,8 +1073,9 @@ class CourseChapterViewSet(viewsets.ModelViewSet):
         """
         POST /api/chapters/reorder/
         Body: { "ordered_ids": ["uuidA","uuidB", ...] }
-        * จะอัปเดต position ตามลำดับ array เริ่มจาก 1
+        * จะอัปเดต position ตามลำดับ array เริ่มจาก 1 (+ เกลี่ย rank ใหม่ตามลำดับเดียวกัน)
         * ตรวจสิทธิ์ด้วยว่าเป็นเจ้าของคอร์ส
+        * ย้ายทีละบทใช้ POST /api/chapters/<id>/move/ แทน (แก้แถวเดียว)
         """
         ordered_ids: List[str] = request.data.get("ordered_ids", [])
         if not ordered_ids or not isinstance(ordered_ids, list):
@@ -1056,11 +1101,15 @@ class CourseChapterViewSet(viewsets.ModelViewSet):
 
         try:
             with transaction.atomic():
+                now = timezone.now()
+                ranks = chapter_rank.spread(len(ordered_ids))
                 for idx, ch_id in enumerate(ordered_ids, start=1):
                     ch = ch_map.get(ch_id)
                     if ch:
                         ch.position = idx
-                CourseChapter.objects.bulk_update(chapters, ["position"])
+                        ch.rank = ranks[idx - 1]
+                        ch.updated_at = now
+                CourseChapter.objects.bulk_update(chapters, ["position", "rank", "updated_at"])
         except Exception as e:
             return Response(
                 {"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1070,8 +1119,41 @@ class CourseChapterViewSet(viewsets.ModelViewSet):
             {"status": "Chapters reordered successfully"}, status=status.HTTP_200_OK
         )
 
+    # ----- Move (แก้แถวเดียว) -----
+    @action(detail=True, methods=["post"], url_path="move")
+    def move(self, request, *args, **kwargs):
+        """
+        POST /api/chapters/<id>/move/
+        Body: { "after": "uuidA" | null, "before": "uuidB" | null }
+        * วางบทนี้ต่อจาก after และ/หรือก่อน before (ระบุอย่างน้อยหนึ่งฝั่ง, ต้องเป็นบทในคอร์สเดียวกัน)
+        * UPDATE เฉพาะ rank/updated_at ของบทนี้ (chapter_rank.move_chapter)
+        """
+        instance: CourseChapter = self.get_object()
+        self._assert_course_permission(instance.course)
+
+        after_id = request.data.get("after") or None
+        before_id = request.data.get("before") or None
+        if after_id is None and before_id is None:
+            return Response(
+                {"detail": "after or before is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            chapter = chapter_rank.move_chapter(instance, after_id, before_id)
+        except (CourseChapter.DoesNotExist, DjangoValidationError) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except chapter_rank.RankError:
+            return Response(
+                {"detail": "after must come before before."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        chapter.rank_position = chapter_rank.position_of(chapter)
+        return Response(self.get_serializer(chapter).data)
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for creating, viewing, and managing course reviews.
     """
@@ -1079,6 +1161,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
     queryset = Review.objects.all().select_related("student").order_by("-created_at")
     serializer_class = ReviewSerializer
     permission_classes = [IsOwnerOrReadOnly]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         """
@@ -1105,6 +1188,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all().select_related("university").order_by("-date_joined")
     serializer_class = UserManagementSerializer
     permission_classes = [permissions.IsAdminUser]  # อนุญาตเฉพาะ is_staff=True
+    pagination_class = UserCursorPagination
 
     # --- ตั้งค่าการกรอง, ค้นหา, และจัดเรียง ---
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -1161,7 +1245,7 @@ class IsStaffAdmin(permissions.BasePermission):
         )
 
 
-class ImportantDocumentViewSet(viewsets.ModelViewSet):
+class ImportantDocumentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ImportantDocument.objects.all()
     serializer_class = ImportantDocumentSerializer
     permission_classes = [IsStaffAdmin]
@@ -1175,7 +1259,7 @@ class ImportantDocumentViewSet(viewsets.ModelViewSet):
         )
 
 
-class InstructorDocumentViewSet(viewsets.ModelViewSet):
+class InstructorDocumentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ผู้สอนจัดการเอกสารของตัวเอง: /api/instructor/documents/
     """
@@ -1194,7 +1278,7 @@ class InstructorDocumentViewSet(viewsets.ModelViewSet):
         serializer.save()  # owner+original_filename เซตใน serializer.create แล้ว
 
 
-class ImportantDocumentReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+class ImportantDocumentReadOnlyViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     สำหรับนักศึกษา/ผู้ใช้ทั่วไป: อ่านรายการเอกสารเท่านั้น
     เงื่อนไขเริ่มต้น: เอกสารถูกอัปโดยผู้สอนหรือแอดมิน
@@ -1202,6 +1286,7 @@ class ImportantDocumentReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
 
     serializer_class = ImportantDocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         qs = ImportantDocument.objects.all()
@@ -1331,11 +1416,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
 
 
-class CourseMaterialViewSet(viewsets.ModelViewSet):
+class CourseMaterialViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = CourseMaterial.objects.all().order_by("-created_at")
     serializer_class = CourseMaterialSerializer
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    pagination_class = CreatedAtCursorPagination
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["chapter", "type"]  # ✅ ใช้ 'type' ให้ตรงกับโมเดล/serializer
@@ -1492,35 +1578,20 @@ class CourseCertificateViewSet(viewsets.GenericViewSet):
         payload.is_valid(raise_exception=True)
         data = payload.validated_data
 
-        created = []
-        
-        def _issue_for(student_id):
-            # กันออกซ้ำ
-            if Certificate.objects.filter(course=course, student_id=student_id).exists():
-                return None
-            try:
-                student_obj = User.objects.get(pk=student_id)
-            except User.DoesNotExist:
-                return None
-            return _create_and_render_certificate(course=course, student=student_obj, actor=request.user)
-
         if data.get("issue_for_student_ids"):
-            for sid in data["issue_for_student_ids"]:
-                c = _issue_for(sid)
-                if c:
-                    created.append(c.id)
+            student_ids = data["issue_for_student_ids"]
         elif data.get("issue_for_all_enrolled"):
             enrolled_qs = Enrollment.objects.filter(course=course)
             if data.get("issue_for_completed_only", True):
                 enrolled_qs = enrolled_qs.filter(status=EnrollmentStatus.COMPLETED)
-            for e in enrolled_qs.only("student_id"):
-                c = _issue_for(e.student_id)
-                if c:
-                    created.append(c.id)
+            student_ids = enrolled_qs.values_list("student_id", flat=True)
         else:
             return Response({"detail": "no target specified"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({"created": created}, status=status.HTTP_201_CREATED)
+        # ออกเฉพาะคนที่ยังไม่มีใบ (กันออกซ้ำ) แบบ bulk แล้วให้ worker render
+        job, created = bulk_issue_certificates(course, student_ids, actor=request.user)
+
+        return Response({"created": created, "job_id": str(job.id)}, status=status.HTTP_201_CREATED)
 
     # POST /api/courses/{course_id}/certificates/save-and-issue/
     @action(
@@ -1554,86 +1625,53 @@ class CourseCertificateViewSet(viewsets.GenericViewSet):
         payload.is_valid(raise_exception=True)
         data = payload.validated_data
 
-        def _issue_for(student_id):
-            if Certificate.objects.filter(course=course, student_id=student_id).exists():
-                return None
-            try:
-                student = User.objects.get(pk=student_id)
-            except User.DoesNotExist:
-                return None
-            return _create_and_render_certificate(course=course, student=student, actor=request.user)
-
+        student_ids = None
         if data.get("issue_for_student_ids"):
-            for sid in data["issue_for_student_ids"]:
-                _issue_for(sid)
+            student_ids = data["issue_for_student_ids"]
         elif data.get("issue_for_all_enrolled"):
             qs = Enrollment.objects.filter(course=course)
             if data.get("issue_for_completed_only", True):
                 qs = qs.filter(status=EnrollmentStatus.COMPLETED)
-            for sid in qs.values_list("student_id", flat=True):
-                _issue_for(sid)
+            student_ids = qs.values_list("student_id", flat=True)
         # else: ไม่ระบุ target -> เซฟเทมเพลตอย่างเดียว ไม่ออกใบ
 
+        if student_ids is not None:
+            bulk_issue_certificates(course, student_ids, actor=request.user)
+
         # (3) คืนลิสต์ certificate ปัจจุบันทั้งหมดของคอร์ส
         qs = Certificate.objects.filter(course=course).select_related("student", "course")
         return Response(CertificateSerializer(qs, many=True, context={"request": request}).data, status=status.HTTP_200_OK)
     
 class CertificateRenderAPIView(APIView):
+    """
+    ดาวน์โหลด PDF ที่เก็บไว้ (stream + ETag/Last-Modified/Range)
+    render ใหม่เฉพาะตอนยังไม่มีไฟล์ / ไฟล์หาย / ข้อมูลเปลี่ยนจากตอน render (fingerprint ไม่ตรง)
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, cert_id):
         try:
-            cert = Certificate.objects.get(id=cert_id)
+            cert = Certificate.objects.select_related("template").get(id=cert_id)
         except Certificate.DoesNotExist:
             return Response({"error": "Certificate not found"}, status=404)
 
-        pdf_bytes = render_certificate_pdf(cert)
-
-        filename = f"{cert.serial_no}.pdf"
-        response = HttpResponse(pdf_bytes, content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        return response
-
-def _gen_serial():
-    return f"WHP-{timezone.now():%Y}-{secrets.token_hex(3).upper()}"
-
-def _gen_verification_code():
-    return secrets.token_hex(16)
-
-def _create_and_render_certificate(course, student, actor):
-    # ป้องกันออกใบซ้ำ
-    if Certificate.objects.filter(course=course, student=student).exists():
-        return None
-
-    tpl = getattr(course, "certificate_template", None)
-
-    cert = Certificate.objects.create(
-        student=student,
-        course=course,
-        template=tpl,
-
-        serial_no=_gen_serial(),
-        verification_code=_gen_verification_code(),
-
-        instructor_name=(tpl.issuer_name if tpl and tpl.issuer_name else course.instructor.full_name),
-        student_name=student.full_name,
-        course_name=(tpl.course_title_override or course.title) if tpl else course.title,
-
-        completion_date=timezone.now().date(),
-        created_by=actor,
-        render_status="pending",
-    )
-
-    try:
-        render_and_attach_pdf(cert)
-        cert.render_status = "done"
-        cert.render_error = ""
-    except Exception as e:
-        cert.render_status = "failed"
-        cert.render_error = str(e)[:2000]
-
-    cert.save(update_fields=["file", "render_status", "render_error"])
-    return cert
+        # ปกติ: ไม่ render, stat ไฟล์ครั้งเดียวใน serve_file ; ไฟล์หายจาก storage -> render ใหม่แล้วส่ง
+        for missing in (False, True):
+            if not ensure_certificate_file(cert, missing=missing):
+                return Response(
+                    {"error": "Certificate render failed", "detail": cert.render_error},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+            try:
+                return serve_file(
+                    request,
+                    cert.file,
+                    filename=f"{cert.serial_no}.pdf",
+                    content_type="application/pdf",
+                )
+            except FileNotFoundError:
+                continue
+        raise Http404("Certificate file not found")
 
 class StudentListAPIView(APIView):
     permission_classes = [IsAuthenticated]  # ใครเรียกได้กำหนดตามต้องการ
@@ -1,24 +1,32 @@
 # lms_app/views_certificate_issue.py
-import random
-import string
-
 from django.utils import timezone
-from django.http import FileResponse, Http404
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.core.signing import BadSignature
+from django.utils.cache import get_conditional_response
 
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.negotiation import BaseContentNegotiation  # << เพิ่ม
+from rest_framework.renderers import JSONRenderer
+from rest_framework.throttling import ScopedRateThrottle
 # ^^^ อย่าใช้ IgnoreClientContentNegotiation (บางเวอร์ชันไม่มี)
 
 from .models import (
-    Course,
-    Enrollment,
     Certificate,
+    Course,
     CertificateTemplate,
-    EnrollmentStatus,
+    CertificateRenderJob,
 )
+from .cert_jobs import enqueue_course_certificates, job_progress
+from .cert_export import EXPORT_FORMATS, request_combined_pdf
+from .cert_images import VARIANTS, can_render, existing_variant, get_variant
+from .cert_preview import get_preview_pdf, preview_data, preview_etag, preview_key
+from .cert_verify import is_revoked, lookup_legacy, parse_verification_code
+from .utils.file_response import serve_file
 
 # ---------- content negotiation: เพิกเฉย Accept header ----------
 class IgnoreAcceptNegotiation(BaseContentNegotiation):
@@ -36,22 +44,6 @@ class IgnoreAcceptNegotiation(BaseContentNegotiation):
         return renderer, media_type
 
 
-# -- lazy import เพื่อหลีกเลี่ยงวงจร import --
-def _render_pdf(data: dict, filename: str):
-    from .cert_pdf_renderer import render_certificate_pdf
-    return render_certificate_pdf(data=data, filename=filename)
-
-
-# ---------- helpers ----------
-def _gen_serial_no() -> str:
-    today = timezone.now().strftime("%Y%m%d")
-    suffix = "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    return f"CERT-{today}-{suffix}"
-
-def _gen_verification_code() -> str:
-    return "".join(random.choices(string.ascii_uppercase + string.digits, k=12))
-
-
 # ---------- Template GET/PUT ----------
 class CertificateTemplateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -136,32 +128,30 @@ class CertificatePreviewAPIView(APIView):
             raise Http404("Course not found")
 
         tpl = CertificateTemplate.objects.filter(course=course).first()
-        style = tpl.style if tpl else "classic"
-        primary = tpl.primary_color if tpl else "#881337"
-        secondary = tpl.secondary_color if tpl else "#1f2937"
-        course_title = (tpl.course_title_override if (tpl and tpl.course_title_override) else course.title)
-        issuer = tpl.issuer_name if tpl else ""
-
-        data = {
-            "student_name": "ตัวอย่างผู้เรียน",
-            "course_name": course_title,
-            "instructor_name": issuer or (
-                course.instructor.full_name if getattr(course, "instructor", None) else ""
-            ),
-            "completion_date": timezone.now().strftime("%d/%m/%Y"),
-            "primary_color": primary,
-            "secondary_color": secondary,
-            "style": style,
-        }
-
-        content = _render_pdf(data, filename="preview.pdf")
-        resp = FileResponse(content, content_type="application/pdf")
+        data = preview_data(course, tpl)
+        key = preview_key(data)
+        etag = preview_etag(key)
+
+        # If-None-Match ตรง -> 304 โดยไม่ต้อง render/อ่าน cache
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        resp = HttpResponse(get_preview_pdf(data, key), content_type="application/pdf")
         resp["Content-Disposition"] = 'inline; filename="preview.pdf"'
+        resp["ETag"] = etag
+        # ให้ browser ถามทุกครั้ง (ได้ 304 ถ้าไม่เปลี่ยน)
+        resp["Cache-Control"] = "private, no-cache"
         return resp
 
 
 # ---------- Issue certificates ----------
 class IssueCertificates(APIView):
+    """
+    ไม่ render ใน request แล้ว: เตรียมใบเป็น pending + สร้าง job แล้วคืน job id ทันที
+    worker (manage.py run_certificate_jobs) จะเป็นคน render
+    FE โพลสถานะได้ที่ /courses/<course_id>/certificates/jobs/<job_id>/
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request, course_id):
@@ -170,71 +160,171 @@ class IssueCertificates(APIView):
         except Course.DoesNotExist:
             raise Http404("Course not found")
 
-        tpl = CertificateTemplate.objects.filter(course=course).first()
-        style = tpl.style if tpl else "classic"
-        primary = tpl.primary_color if tpl else "#881337"
-        secondary = tpl.secondary_color if tpl else "#1f2937"
-        course_title = (tpl.course_title_override if (tpl and tpl.course_title_override) else course.title)
-        issuer = (tpl.issuer_name if tpl else (
-            course.instructor.full_name if getattr(course, "instructor", None) else ""
-        ))
-
-        enrolls = Enrollment.objects.filter(course=course, status=EnrollmentStatus.COMPLETED)
-
-        output = []
-        for en in enrolls:
-            student = en.student
-
-            cert, created = Certificate.objects.get_or_create(
-                course=course,
-                student=student,
-                defaults={
-                    "serial_no": _gen_serial_no(),
-                    "verification_code": _gen_verification_code(),
-                    "instructor_name": issuer,
-                    "student_name": student.full_name,
-                    "course_name": course_title,
-                    "completion_date": timezone.now().date(),
-                    "render_status": "pending",
-                    "render_error": "",
-                    "created_by": request.user,
-                    "template": tpl if tpl else None,
-                },
-            )
-
-            if not created:
-                cert.instructor_name = issuer
-                cert.student_name = student.full_name
-                cert.course_name = course_title
-                cert.completion_date = timezone.now().date()
-                cert.render_status = "pending"
-                cert.render_error = ""
-                cert.template = tpl if tpl else None
-                cert.save()
-
-            data = {
-                "student_name": cert.student_name,
-                "course_name": cert.course_name,
-                "instructor_name": cert.instructor_name,
-                "completion_date": cert.completion_date.strftime("%d/%m/%Y"),
-                "primary_color": primary,
-                "secondary_color": secondary,
-                "style": style,
-            }
-
-            pdf_file = _render_pdf(data=data, filename=f"cert_{cert.id}.pdf")
-            cert.file.save(pdf_file.name, pdf_file)
-            cert.render_status = "done"
-            cert.render_error = ""
-            cert.save()
-
-            output.append({
-                "certificate_id": str(cert.id),
-                "pdf_url": cert.file.url if cert.file else None,
-                "created": created,
-            })
+        job = enqueue_course_certificates(course, actor=request.user)
+
+        return Response({
+            "job_id": str(job.id),
+            "status": job.status,
+            "total": job.total,
+            # rendered = ใบที่ข้อมูลเปลี่ยน/ยังไม่มีไฟล์ (worker จะ render), skipped = ไฟล์เดิมยังตรง
+            "rendered": job.total,
+            "skipped": job.skipped,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+# ---------- Job status (poll) ----------
+class CertificateRenderJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, course_id, job_id):
+        try:
+            job = CertificateRenderJob.objects.get(pk=job_id, course_id=course_id)
+        except CertificateRenderJob.DoesNotExist:
+            raise Http404("Job not found")
 
-        return Response(output, status=status.HTTP_201_CREATED)
+        counts = job_progress(job)
+        return Response({
+            "job_id": str(job.id),
+            "status": job.status,
+            "total": job.total,
+            "skipped": job.skipped,
+            "done": counts["done"],
+            "failed": counts["failed"],
+            "pending": counts["pending"] + counts["rendering"],
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+        })
+
+
+# ---------- Export (PDF รวม / ZIP / manifest CSV) ----------
+class CertificateExportView(APIView):
+    """
+    GET /courses/<course_id>/certificates/export/?format=pdf|zip|csv
+    zip/csv: ส่งแบบ StreamingHttpResponse ทีละ chunk (ไม่ buffer ทั้งคอร์สใน RAM)
+    pdf: worker render ไฟล์ให้ (cert_export.request_combined_pdf) -> 202 + สถานะจนกว่าจะเสร็จ
+         แล้ว GET เดิมได้ไฟล์ (ETag/Range) — ข้อมูลใบเปลี่ยน = งานใหม่
+    เฉพาะเจ้าของคอร์สหรือ staff
+    """
+    permission_classes = [IsAuthenticated]
+    # ?format=pdf ไม่ให้ DRF เอาไปเลือก renderer (จะได้ 404)
+    content_negotiation_class = IgnoreAcceptNegotiation
+
+    def get(self, request, course_id):
+        try:
+            course = Course.objects.get(pk=course_id)
+        except Course.DoesNotExist:
+            raise Http404("Course not found")
+
+        user = request.user
+        is_owner = getattr(course, "instructor_id", None) == getattr(user, "id", None)
+        if not (is_owner or user.is_staff):
+            raise PermissionDenied("You don't have permission to export certificates of this course.")
+
+        fmt = (request.query_params.get("format") or "zip").lower()
+        if fmt != "pdf" and fmt not in EXPORT_FORMATS:
+            raise ValidationError({"format": f"ต้องเป็นหนึ่งใน pdf, {', '.join(EXPORT_FORMATS)}"})
+
+        if fmt == "pdf":
+            return self.combined_pdf(request, course)
+
+        stream, content_type, ext = EXPORT_FORMATS[fmt]
+        filename = f"certificates_{course.id}_{timezone.now().strftime('%Y%m%d')}.{ext}"
+
+        resp = StreamingHttpResponse(stream(course), content_type=content_type)
+        resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+        # กัน nginx buffer ทั้งไฟล์ก่อนส่ง
+        resp["X-Accel-Buffering"] = "no"
+        return resp
+
+    def combined_pdf(self, request, course):
+        export = request_combined_pdf(course, request.user)
+        if export.status == "done" and export.file:
+            try:
+                return serve_file(
+                    request,
+                    export.file,
+                    filename=f"certificates_{course.id}_{export.finished_at.strftime('%Y%m%d')}.pdf",
+                    content_type="application/pdf",
+                )
+            except FileNotFoundError:
+                # ไฟล์หายจาก storage -> ให้ worker ทำใหม่
+                export.status, export.attempts = "queued", 0
+                export.save(update_fields=["status", "attempts", "updated_at"])
+
+        resp = Response(
+            {"id": str(export.id), "status": export.status, "error": export.error or None},
+            status=status.HTTP_202_ACCEPTED,
+        )
+        resp["Retry-After"] = "5"
+        return resp
+
+
+# ---------- PNG ของใบประกาศ (thumb / social / print) ----------
+class CertificateImageView(APIView):
+    """
+    GET /certificates/<cert_id>/images/<variant>/
+    redirect ไปไฟล์ PNG ใน MEDIA (path มี fingerprint -> cache ได้ยาว)
+    เปิดสาธารณะเหมือนไฟล์ PDF ใน /media/ (ใช้ใน <img> / og:image ที่ส่ง JWT ไม่ได้)
+    แต่ส่งได้เฉพาะไฟล์ที่ worker สร้างไว้แล้ว; ยังไม่มี -> ราสเตอร์ให้เฉพาะเจ้าของใบ/ผู้สอน/staff
+    (session/JWT) คนอื่นได้ 404 — กัน request นิรนามสั่งราสเตอร์ 300 dpi ใน process เว็บ
+    """
+    permission_classes = [AllowAny]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "cert_image"
+
+    def get(self, request, cert_id, variant):
+        if variant not in VARIANTS:
+            raise Http404("Unknown image variant")
+        try:
+            cert = Certificate.objects.select_related("template", "course").get(pk=cert_id)
+        except Certificate.DoesNotExist:
+            raise Http404("Certificate not found")
+
+        name = existing_variant(cert, variant)
+        if name is None:
+            if not can_render(request.user, cert):
+                raise Http404("Certificate image not available yet")
+            name = get_variant(cert, variant)
+        resp = HttpResponseRedirect(request.build_absolute_uri(default_storage.url(name)))
+        # fingerprint อาจเปลี่ยนเมื่อแก้ชื่อ/เทมเพลต -> ตัว redirect ห้าม cache นาน
+        resp["Cache-Control"] = "public, max-age=60"
+        return resp
+
+
+# ---------- ตรวจสอบรหัสใบประกาศ (สาธารณะ) ----------
+class CertificateVerifyView(APIView):
+    """
+    GET /certificates/verify/<code>/
+    รหัสแบบลงลายเซ็น: ตรวจ HMAC อย่างเดียว + ชุด id ที่ถูกเพิกถอน (cache) -> ไม่ query DB ต่อคำขอ
+    รหัสสุ่มแบบเดิม: ค้น DB ตาม verification_code
+    200 = ใช้ได้, 410 = ถูกเพิกถอน, 404 = ไม่พบ/ลายเซ็นไม่ตรง
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    renderer_classes = [JSONRenderer]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "cert_verify"
+
+    def get(self, request, code):
+        try:
+            info, revoked = parse_verification_code(code), None
+        except BadSignature:
+            info, revoked = lookup_legacy(code)
+
+        if info is None:
+            resp = Response({"valid": False}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            if revoked is None:
+                revoked = is_revoked(info.id)
+            body = {"valid": not revoked, "id": str(info.id), "serial_no": info.serial_no,
+                    "issued": info.issued.isoformat()}
+            if revoked:
+                body["revoked"] = True
+            resp = Response(body, status=status.HTTP_410_GONE if revoked else status.HTTP_200_OK)
+
+        # สั้นพอให้การเพิกถอนมีผลเร็ว แต่ช่วยลดโหลดเมื่อมีคนสแกน QR เดียวกันซ้ำ ๆ
+        resp["Cache-Control"] = "public, max-age=60"
+        return resp
 
 
 # ---------- Save template + issue ----------
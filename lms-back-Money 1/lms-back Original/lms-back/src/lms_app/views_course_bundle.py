@@ -0,0 +1,139 @@
+# lms_app/views_course_bundle.py
+"""
+GET /api/courses/<course_id>/bundle/ — โครงคอร์สทั้งต้นใน request เดียว
+(คอร์ส + บท -> สื่อ, ควิซ -> คำถาม -> ตัวเลือก, เกณฑ์คะแนน -> รายการ)
+
+จำนวน query คงที่ไม่ขึ้นกับขนาดคอร์ส:
+  1. bundle_version: aggregate เดียว (subquery ต่อตาราง) -> ETag; If-None-Match ตรง = 304 จบตรงนี้
+  2. คอร์ส + instructor/curriculum/category/stats/quiz/scoring (JOIN)
+  3-7. prefetch: บท, สื่อ, คำถาม, ตัวเลือก, รายการเกณฑ์
+
+ETag = updated_at ของคอร์ส/stats/ควิซ/เกณฑ์ + max(updated_at) ของบทและสื่อ
+     + จำนวนแถวทุกชั้น (จับการลบ และคำถาม/ตัวเลือก/รายการเกณฑ์ที่ไม่มี updated_at)
+"""
+import hashlib
+import json
+
+from django.db.models import Count, Max, OuterRef, Prefetch, Subquery
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from drf_spectacular.utils import extend_schema
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .chapter_rank import ORDERING, with_rank_position
+from .models import Course, CourseChapter, CourseMaterial, QuizChoice, QuizQuestion, ScoringItem
+from .serializers import (
+    COURSE_SERIALIZER_RELATED,
+    CourseChapterSerializer,
+    CourseMaterialSerializer,
+    CourseSerializer,
+    QuizSer,
+    ScoringSerializer,
+)
+
+
+def _per_course(model, path, expr):
+    """scalar subquery: aggregate ของแถวใน model ที่ผูกกับคอร์สนี้ (ผ่าน path)"""
+    rows = model.objects.filter(**{path: OuterRef("pk")}).order_by().values(path)
+    return Subquery(rows.annotate(v=expr).values("v")[:1])
+
+
+def bundle_version(course_id):
+    """ค่าที่เปลี่ยนทุกครั้งที่ต้นไม้ของคอร์สเปลี่ยน; None = ไม่มีคอร์สนี้"""
+    parts = {
+        "chapters_at": (CourseChapter, "course", Max("updated_at")),
+        "chapters": (CourseChapter, "course", Count("pk")),
+        "materials_at": (CourseMaterial, "chapter__course", Max("updated_at")),
+        "materials": (CourseMaterial, "chapter__course", Count("pk")),
+        "questions": (QuizQuestion, "quiz__course", Count("pk")),
+        "choices": (QuizChoice, "question__quiz__course", Count("pk")),
+        "scoring_items": (ScoringItem, "scoring__course", Count("pk")),
+    }
+    return (
+        Course.objects.filter(pk=course_id)
+        .annotate(**{name: _per_course(*spec) for name, spec in parts.items()})
+        .values(
+            "instructor_id", "updated_at", "stats__updated_at",
+            "quiz__updated_at", "scoring__updated_at", *parts,
+        )
+        .first()
+    )
+
+
+def bundle_etag(version: dict) -> str:
+    raw = json.dumps(version, sort_keys=True, default=str, separators=(",", ":"))
+    return quote_etag(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+
+class CourseBundleView(APIView):
+    """ผู้สอนของคอร์สหรือ staff เท่านั้น (เหมือน endpoint ควิซ/เกณฑ์ ที่มีเฉลยอยู่ในข้อมูล)"""
+    permission_classes = [IsAuthenticated]
+
+    def _assert_permission(self, instructor_id):
+        user = self.request.user
+        is_owner = instructor_id == user.id
+        if not (is_owner or user.is_staff):
+            raise PermissionDenied("You don't have permission to view this course bundle.")
+
+    def get_course(self, course_id):
+        chapters = with_rank_position(CourseChapter.objects.order_by(*ORDERING)).prefetch_related(
+            Prefetch("coursematerial_set", queryset=CourseMaterial.objects.order_by("created_at"))
+        )
+        qs = (
+            Course.objects.filter(pk=course_id)
+            .select_related(*COURSE_SERIALIZER_RELATED, "quiz", "scoring")
+            .defer("search_vector")
+            .prefetch_related(
+                Prefetch("coursechapter_set", queryset=chapters),
+                Prefetch("quiz__questions", queryset=QuizQuestion.objects.prefetch_related("choices")),
+                Prefetch("scoring__items", queryset=ScoringItem.objects.all()),
+            )
+        )
+        course = qs.first()
+        if course is None:
+            raise Http404("Course not found")
+        return course
+
+    @extend_schema(summary="Full course tree (chapters, materials, quiz, scoring) with ETag")
+    def get(self, request, course_id):
+        version = bundle_version(course_id)
+        if version is None:
+            raise Http404("Course not found")
+        self._assert_permission(version["instructor_id"])
+
+        # If-None-Match ตรง -> 304 โดยไม่ต้องโหลดต้นไม้
+        etag = bundle_etag(version)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag)
+
+        course = self.get_course(course_id)
+        ctx = {"request": request}
+        chapters = []
+        for chapter in course.coursechapter_set.all():
+            data = CourseChapterSerializer(chapter, context=ctx).data
+            data["materials"] = CourseMaterialSerializer(
+                chapter.coursematerial_set.all(), many=True, context=ctx
+            ).data
+            chapters.append(data)
+
+        quiz = getattr(course, "quiz", None)
+        scoring = getattr(course, "scoring", None)
+        resp = Response({
+            "course": CourseSerializer(course, context=ctx).data,
+            "chapters": chapters,
+            "quiz": QuizSer(quiz).data if quiz else None,
+            "scoring": ScoringSerializer(scoring).data if scoring else None,
+        })
+        return self._with_validators(resp, etag)
+
+    @staticmethod
+    def _with_validators(resp, etag):
+        resp["ETag"] = etag
+        # ให้ browser ถามทุกครั้ง (ได้ 304 ถ้าไม่เปลี่ยน)
+        resp["Cache-Control"] = "private, no-cache"
+        return resp